@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authentication.notifications import queue_digests
+from authentication.outbox import OutboxSender
+
+
+class Command(BaseCommand):
+    help = 'Queue due notification digests and deliver the outbox over one reused SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5,
+                            help='pause between two outbox checks, in seconds')
+        parser.add_argument('--once', action='store_true', help='send what is due and exit')
+
+    def handle(self, *args, **options):
+        sender = OutboxSender.from_settings()
+        try:
+            while True:
+                queue_digests()
+                sent = sender.send_pending()
+                if sent:
+                    self.stdout.write(f'sent {sent} emails')
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        finally:
+            sender.close()
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,57 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+EMAIL_PENDING = 'pending'
+EMAIL_SENT = 'sent'
+EMAIL_FAILED = 'failed'
+
+
+class EmailOutbox(models.Model):
+    """An email waiting for the outbox sender, request handlers only ever insert these."""
+    STATUS_CHOICES = [
+        (EMAIL_PENDING, 'Pending'),
+        (EMAIL_SENT, 'Sent'),
+        (EMAIL_FAILED, 'Failed'),
+    ]
+
+    receiver = models.EmailField()
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=EMAIL_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.receiver} ({self.status})'
+
+
+class Notification(models.Model):
+    """A device event for its owner, delivered with the other events of the digest window."""
+    user = models.ForeignKey('auth.User', related_name='notifications', on_delete=models.CASCADE)
+    device_id = models.CharField(max_length=50)
+    kind = models.CharField(max_length=20)
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+    digested_at = models.DateTimeField(null=True, blank=True)
+    # a rate limited follow-up of an event already sent is held back until then
+    not_before = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['user', 'device_id', 'kind', 'created_at']),
+            models.Index(fields=['digested_at', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} of {self.device_id} for {self.user_id}'
@@ -0,0 +1,97 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from authentication.models import EmailOutbox, Notification
+
+NOTIFY_CONNECTIVITY = 'connectivity'
+NOTIFY_STATUS = 'status'
+NOTIFY_PHOTO = 'photo'
+
+DEFAULT_DIGEST_WINDOW = 300
+DEFAULT_RATE_LIMITS = {NOTIFY_CONNECTIVITY: 3600}
+
+
+def notify_device_owner(device, kind, subject, message):
+    """
+    Record an event of the device for its owner, if they asked for emails.
+
+    NOTIFICATION_RATE_LIMITS maps a kind to the seconds between two emails of that kind for the
+    same device, further events are collapsed into the latest one, see collapse_notification.
+    Returns whether the event was recorded.
+    """
+    owner = device.owner
+    if not device.send_email or owner is None or not owner.email:
+        return False
+    now = timezone.now()
+    rate_limit = getattr(settings, 'NOTIFICATION_RATE_LIMITS', DEFAULT_RATE_LIMITS).get(kind)
+    if rate_limit:
+        rate_limit = datetime.timedelta(seconds=rate_limit)
+        latest = Notification.objects.filter(user=owner, device_id=device.device_id, kind=kind) \
+            .order_by('-created_at').first()
+        if latest is not None and (latest.digested_at is None or latest.digested_at > now - rate_limit):
+            return collapse_notification(latest, subject, message, now, rate_limit)
+    Notification.objects.create(user=owner, device_id=device.device_id, kind=kind, subject=subject, message=message,
+                                created_at=now)
+    return True
+
+
+def collapse_notification(latest, subject, message, now, rate_limit):
+    """
+    Fold a rate limited event into the latest one of its kind, so the owner always ends up with the
+    newest state, e.g. a reconnect right after a disconnect.
+
+    A repeat of the latest event is dropped. A pending one takes over the new subject and message,
+    one that already went out in a digest is followed by a new notification held back until
+    rate_limit after that digest, which later events of the hour are collapsed into in turn.
+    """
+    if latest.subject == subject and latest.message == message:
+        return False
+    if latest.digested_at is None and Notification.objects.filter(pk=latest.pk, digested_at__isnull=True) \
+            .update(subject=subject, message=message):
+        return True
+    # digested meanwhile when the update above found nothing to update
+    Notification.objects.create(user_id=latest.user_id, device_id=latest.device_id, kind=latest.kind,
+                                subject=subject, message=message, created_at=now,
+                                not_before=(latest.digested_at or now) + rate_limit)
+    return True
+
+
+def queue_digests(now=None):
+    """
+    Turn the pending notifications of every user whose oldest one is older than
+    NOTIFICATION_DIGEST_WINDOW into one outbox email per user, return how many were queued.
+    Notifications held back by not_before wait for a later digest.
+    """
+    now = now or timezone.now()
+    window = datetime.timedelta(seconds=getattr(settings, 'NOTIFICATION_DIGEST_WINDOW', DEFAULT_DIGEST_WINDOW))
+    pending = Notification.objects.filter(Q(not_before__isnull=True) | Q(not_before__lte=now),
+                                          digested_at__isnull=True)
+    due_users = pending.values('user').annotate(oldest=Min('created_at')).filter(oldest__lte=now - window) \
+        .values_list('user', flat=True)
+
+    with transaction.atomic():
+        notifications = list(pending.filter(user__in=list(due_users)).select_related('user')
+                             .select_for_update().order_by('user', 'created_at'))
+        if not notifications:
+            return 0
+        by_user = {}
+        for notification in notifications:
+            by_user.setdefault(notification.user, []).append(notification)
+        EmailOutbox.objects.bulk_create([build_digest(user, user_notifications)
+                                         for user, user_notifications in by_user.items()])
+        Notification.objects.filter(pk__in=[notification.pk for notification in notifications]) \
+            .update(digested_at=now)
+    return len(by_user)
+
+
+def build_digest(user, notifications):
+    if len(notifications) == 1:
+        notification = notifications[0]
+        return EmailOutbox(receiver=user.email, subject=notification.subject, message=notification.message)
+    lines = [f'{notification.subject}: {notification.message}' for notification in notifications]
+    return EmailOutbox(receiver=user.email, subject=f'{len(notifications)} updates from your devices',
+                       message='<br>'.join(lines))
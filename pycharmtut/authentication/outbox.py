@@ -0,0 +1,158 @@
+import datetime
+import logging
+import os
+import smtplib
+import ssl
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from dotenv import load_dotenv
+
+from authentication.models import EmailOutbox, EMAIL_PENDING, EMAIL_SENT, EMAIL_FAILED
+from gadget_communicator_pull.helpers.metrics import EMAILS_SENT, EMAILS_FAILED
+
+ROOT_DIR = Path(os.path.dirname(os.path.abspath(__file__))).parent
+LOGO_PATH = ROOT_DIR / 'images' / 'water.me.png'
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_logo_part():
+    """The logo attached to every email, read from disk once per process."""
+    with open(LOGO_PATH, 'rb') as logo:
+        image = MIMEImage(logo.read())
+    image.add_header('Content-ID', '<image1>')
+    return image
+
+
+def build_message(sender, email):
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = email.subject
+    msg['From'] = sender
+    msg['To'] = email.receiver
+    msg.attach(MIMEText(f'<h1>{email.message}</h1>.<br><img src="cid:image1"><br>', 'html'))
+    msg.attach(get_logo_part())
+    return msg.as_string()
+
+
+class OutboxSender:
+    """
+    Delivers queued EmailOutbox rows over one authenticated SMTP connection.
+
+    The connection is opened on the first email and reused until close(), a dropped connection
+    is reopened once. Each email is claimed with a conditional UPDATE so several senders can
+    share the outbox. Failed emails are retried after retry_delay, doubling on every attempt,
+    and given up after max_attempts.
+    """
+
+    def __init__(self, host, port, use_ssl, username, password, use_tls=False, max_attempts=5, retry_delay=30, batch_size=50,
+                 timeout=30):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._server = None
+
+    @classmethod
+    def from_settings(cls):
+        load_dotenv(dotenv_path=ROOT_DIR / 'secret.env')
+        return cls(
+            host=settings.EMAIL_HOST,
+            port=settings.EMAIL_PORT,
+            use_ssl=settings.EMAIL_USE_SSL,
+            use_tls=settings.EMAIL_USE_TLS,
+            username=settings.EMAIL_HOST_USER or os.environ.get('USERNAME'),
+            password=settings.EMAIL_HOST_PASSWORD or os.environ.get('PASSWORD'),
+            max_attempts=getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5),
+            retry_delay=getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 30),
+        )
+
+    def send_pending(self):
+        """Send every email that is due, return how many were sent."""
+        sent = 0
+        while True:
+            due_emails = list(EmailOutbox.objects.filter(status=EMAIL_PENDING, next_attempt_at__lte=timezone.now())
+                              .order_by('next_attempt_at', 'pk')[:self.batch_size])
+            for email in due_emails:
+                if self._claim(email) and self._send(email):
+                    sent += 1
+            if len(due_emails) < self.batch_size:
+                return sent
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except smtplib.SMTPException:
+            pass
+        finally:
+            self._server = None
+
+    def _claim(self, email):
+        # push the email out of the due window for as long as one SMTP attempt may take
+        lease = timezone.now() + datetime.timedelta(seconds=self.timeout * 2)
+        claimed = EmailOutbox.objects.filter(pk=email.pk, status=EMAIL_PENDING,
+                                             next_attempt_at=email.next_attempt_at).update(next_attempt_at=lease)
+        return claimed == 1
+
+    def _send(self, email):
+        try:
+            message = build_message(self.username, email)
+            try:
+                self._connection().sendmail(self.username, email.receiver, message)
+            except smtplib.SMTPServerDisconnected:
+                self._server = None
+                self._connection().sendmail(self.username, email.receiver, message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+            # the server rejected this email, the connection itself is still usable
+            self._failed(email, e)
+            return False
+        except (smtplib.SMTPException, OSError) as e:
+            self._server = None
+            self._failed(email, e)
+            return False
+        email.status = EMAIL_SENT
+        email.sent_at = timezone.now()
+        email.attempts += 1
+        email.save(update_fields=['status', 'sent_at', 'attempts'])
+        EMAILS_SENT.inc()
+        return True
+
+    def _failed(self, email, error):
+        email.attempts += 1
+        email.last_error = str(error)
+        if email.attempts >= self.max_attempts:
+            email.status = EMAIL_FAILED
+        else:
+            delay = self.retry_delay * 2 ** (email.attempts - 1)
+            email.next_attempt_at = timezone.now() + datetime.timedelta(seconds=delay)
+        email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+        EMAILS_FAILED.inc()
+        logger.warning('sending email %s to %s failed: %s', email.pk, email.receiver, error)
+
+    def _connection(self):
+        if self._server is None:
+            if self.use_ssl:
+                server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                          context=ssl.create_default_context())
+            else:
+                server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+                if self.use_tls:
+                    server.starttls(context=ssl.create_default_context())
+            if self.username and self.password:
+                server.login(self.username, self.password)
+            self._server = server
+        return self._server
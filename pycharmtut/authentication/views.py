@@ -5,8 +5,7 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.http import JsonResponse
 
-from gadget_communicator_pull.helpers import time_keeper
-from gadget_communicator_pull.models import Device
+from gadget_communicator_pull.helpers.liveness_monitor import DeviceLivenessMonitor, notify_disconnected_owners
 from .serializers import TokenSerializer, UserSerializer
 from .water_email import WaterEmail
 import re
@@ -60,8 +59,6 @@ class ProfilePasswordChangeView(generics.CreateAPIView):
         new_password = request.data.get("new_password", "")
         password_new_repeat = request.data.get("password_new_repeat", "")
         user = authenticate(request, username=username, password=password)
-        print(f'username: {username}')
-        print(f'password: {password}')
         if not username and not password and not new_password and not password_new_repeat:
             return Response(
                 data={
@@ -126,8 +123,6 @@ class ProfileView(generics.CreateAPIView):
         username = request.data.get("username", "")
         password = request.data.get("password", "")
         user = authenticate(request, username=username, password=password)
-        print(f'username: {username}')
-        print(f'password: {password}')
         if not username and not password and not email and not first_name and not last_name:
             return Response(
                 data={
@@ -151,7 +146,6 @@ class ProfileView(generics.CreateAPIView):
                 "token": str(RefreshToken.for_user(user).access_token)})
             serializer.is_valid()
             user_ = User.objects.filter(username=username).first()
-            print(user_.email)
             user_.first_name = first_name
             user_.last_name = last_name
             user_.username = username
@@ -184,17 +178,7 @@ class HealthCheck(generics.ListAPIView):
         return User.objects.all()
 
     def get(self, request, *args, **kwargs):
-        devices = Device.objects.all()
-        connected_devices = devices.filter(is_connected=True)
-        date_k = time_keeper.TimeKeeper(time_keeper.TimeKeeper.get_current_date())
-        for connected_device in connected_devices:
-            current_time_minus_delta = date_k.get_current_time_minus_delta_seconds(30)
-            device_last_check = connected_device.health_relation.all().first()
-            device_last_time_check = date_k.get_time_from_time_string(device_last_check.status_time)
-            if device_last_time_check < current_time_minus_delta:
-                connected_device.is_connected = False
-                connected_device.save()
-                self.send_email_to_user(connected_device, f'device: {connected_device.device_id} disconnected', 'Error')
+        DeviceLivenessMonitor(on_disconnected=notify_disconnected_owners).tick()
         return Response(
                 data={
                     "message": "There is no user with the registered username"
@@ -202,16 +186,6 @@ class HealthCheck(generics.ListAPIView):
                 status=status.HTTP_200_OK)
 
 
-    def send_email_to_user(self, device, execution_message, execution_status):
-        if device.send_email:
-            user_ = User.objects.filter(announces=device).first()
-            email_ = user_.email
-            email_sender = WaterEmail()
-            email_message = execution_message
-            email_subject = f'Device Operation: {execution_status}'
-            email_sender.send_email(email_receiver=email_, subject=email_subject, message=email_message)
-
-
 class RegisterUsersView(generics.CreateAPIView):
     """
     POST authentication/register/
@@ -349,7 +323,6 @@ class ForgotEmailView(generics.CreateAPIView):
                     "message": "There is no user with the registered email"
                 },
                 status=status.HTTP_400_BAD_REQUEST)
-        print(f'user: {user.username} and pass: {user.password}')
 
         x = str(uuid.uuid4().int)
         user.set_password(x[:10])
@@ -365,7 +338,6 @@ class ApiDeleteUser(generics.DestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         id_ = self.kwargs.get("id")
-        print(id_)
         users_obj = User.objects.all()
         for ct in User.objects.all():
             ct.delete()
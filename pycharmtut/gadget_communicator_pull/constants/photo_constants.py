@@ -2,4 +2,17 @@ PHOTO_CREATED='Created'
 PHOTO_FAILED='Failed'
 PHOTO_READY='Ready'
 PHOTO_INIT='Initialized'
-PHOTO_RUNNING='Running'
\ No newline at end of file
+PHOTO_RUNNING='Running'
+
+PHOTO_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+PHOTO_UPLOAD_CHUNK_SIZE = 256 * 1024
+PHOTO_UPLOAD_EXPIRY = 24 * 60 * 60
+PHOTO_UPLOAD_OFFSET = "offset"
+PHOTO_UPLOAD_SIZE = "size"
+PHOTO_UPLOAD_ID = "upload_id"
+
+PHOTO_VARIANT = "variant"
+PHOTO_VARIANT_THUMBNAIL = "thumbnail"
+PHOTO_VARIANT_MEDIUM = "medium"
+PHOTO_THUMBNAIL_SIZE = (320, 320)
+PHOTO_MEDIUM_SIZE = (1280, 1280)
@@ -21,3 +21,39 @@ PLAN_MOISTURE_WEEKDAY_TIMES = "weekday_times"
 PLAN_MOISTURE_CHECK_INTERVAL = "check_interval"
 STATUS_TIME = "status_time"
 
+SYNC_PLAN = "plan"
+SYNC_PHOTO = "photo"
+SYNC_WATER = "water"
+SYNC_NEXT_POLL = "next_poll"
+SYNC_NEXT_POLL_BUSY = 5
+SYNC_NEXT_POLL_IDLE = 30
+LONG_POLL_WAIT = "wait"
+LONG_POLL_MAX_WAIT = 60
+TELEMETRY_WATER = "water"
+TELEMETRY_MOISTURE = "moisture"
+TELEMETRY_MAX_BATCH = 1000
+HEARTBEAT_MIN_INTERVAL = 10
+DEVICE_OFFLINE_AFTER = 30
+DEVICE_LIVENESS_BATCH = 500
+TELEMETRY_RESOLUTION_RAW = "raw"
+TELEMETRY_RESOLUTION_HOUR = "hour"
+TELEMETRY_RESOLUTION_DAY = "day"
+TELEMETRY_RESOLUTION_AUTO = "auto"
+CHART_FROM = "from"
+CHART_TO = "to"
+CHART_RESOLUTION = "resolution"
+CHART_DEFAULT_SPAN_DAYS = 7
+CHART_RAW_MAX_SPAN_DAYS = 2
+CHART_HOURLY_MAX_SPAN_DAYS = 62
+CHART_POINTS = "points"
+CHART_MAX_POINTS = 2000
+CHART_PAD_SIZE = 10
+CHART_PAD_VALUE = 100
+PAGE_LIMIT = "limit"
+PAGE_CURSOR = "cursor"
+PAGE_MAX_LIMIT = 200
+PAGE_RESULTS = "results"
+PAGE_NEXT = "next"
+STATUS_SINCE = "since"
+STATUS_UNTIL = "until"
+STATUS_EXECUTION = "execution_status"
@@ -0,0 +1,95 @@
+from django.db import transaction
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_CREATED, PHOTO_RUNNING
+from gadget_communicator_pull.constants.water_constants import WATER_PLAN_BASIC, WATER_PLAN_MOISTURE, \
+    WATER_PLAN_TIME, DELETE_RUNNING_PLAN, PLAN_TYPE, SYNC_NEXT_POLL_BUSY, SYNC_NEXT_POLL_IDLE
+from gadget_communicator_pull.helpers.from_to_json_serializer import to_json_serializer, \
+    remove_device_field_from_json, remove_has_been_executed_field, remove_is_running_field
+from gadget_communicator_pull.models import BasicPlan, MoisturePlan, TimePlan
+from gadget_communicator_pull.models.photo_module import PhotoModule
+from gadget_communicator_pull.water_serializers.base_plan_serializer import BasePlanSerializer
+from gadget_communicator_pull.water_serializers.constants.water_constants import IS_RUNNING, HAS_BEEN_EXECUTED
+from gadget_communicator_pull.water_serializers.moisture_plan_serializer import MoisturePlanSerializer
+from gadget_communicator_pull.water_serializers.photo_serializer import PhotoSerializer
+from gadget_communicator_pull.water_serializers.time_plan_serializer import TimePlanSerializer
+
+PLAN_CLAIM_ORDER = (
+    (TimePlan, 'devices_t', TimePlanSerializer, WATER_PLAN_TIME),
+    (MoisturePlan, 'devices_m', MoisturePlanSerializer, WATER_PLAN_MOISTURE),
+    (BasicPlan, 'devices_b', BasePlanSerializer, WATER_PLAN_BASIC),
+)
+
+
+def claim_next_plan(device):
+    """
+    Hand out the next unexecuted plan of the device, or None when there is nothing to run.
+
+    A plan is claimed with a conditional UPDATE on has_been_executed, so concurrent polls of the
+    same device never receive the same plan. Time plans win over moisture plans and moisture
+    plans over basic ones.
+    """
+    for plan_model, devices_field, serializer_class, plan_type in PLAN_CLAIM_ORDER:
+        candidates = plan_model.objects.filter(**{devices_field: device}, has_been_executed=False).order_by('pk')
+        while True:
+            plan = candidates.first()
+            if plan is None:
+                break
+            if claim_plan(device, plan, plan_type):
+                plan_json = to_json_serializer(serializer_class(instance=plan))
+                if plan_model is not BasicPlan:
+                    plan_json = remove_is_running_field(json_obj=plan_json)
+                json_without_device_field = remove_device_field_from_json(plan_json)
+                return remove_has_been_executed_field(json_without_device_field)
+    return None
+
+
+def claim_plan(device, plan, plan_type):
+    """Mark the plan executed, and running unless it asks to stop the running one. False if already taken."""
+    updates = {HAS_BEEN_EXECUTED: True}
+    delete_plan = plan.plan_type == DELETE_RUNNING_PLAN
+    if not isinstance(plan, BasicPlan):
+        updates[IS_RUNNING] = not delete_plan
+        updates[PLAN_TYPE] = plan_type
+    with transaction.atomic():
+        claimed = type(plan).objects.filter(pk=plan.pk, has_been_executed=False).update(**updates)
+        if claimed and not isinstance(plan, BasicPlan):
+            clear_running_plans(device, keep=None if delete_plan else plan)
+    return claimed == 1
+
+
+def clear_running_plans(device, keep=None):
+    """Reset the running flag of every moisture and time plan of the device except keep."""
+    for plan_model, devices_field in ((MoisturePlan, 'devices_m'), (TimePlan, 'devices_t')):
+        running_plans = plan_model.objects.filter(**{devices_field: device}, is_running=True)
+        if isinstance(keep, plan_model):
+            running_plans = running_plans.exclude(pk=keep.pk)
+        running_plans.update(is_running=False)
+
+
+def claim_pending_photo(device):
+    """Hand out the oldest photo request that the device has not picked up yet."""
+    pending_photos = device.photos.filter(photo_status=PHOTO_CREATED).order_by('pk')
+    while True:
+        photo = pending_photos.first()
+        if photo is None:
+            return None
+        if PhotoModule.objects.filter(pk=photo.pk, photo_status=PHOTO_CREATED).update(photo_status=PHOTO_RUNNING):
+            break
+    photo_json = to_json_serializer(PhotoSerializer(instance=photo))
+    return remove_device_field_from_json(photo_json)
+
+
+def claim_water_reset(device):
+    """Return the container capacity once after the user refilled it, None otherwise."""
+    if not device.water_reset:
+        return None
+    device.water_reset = False
+    device.save(update_fields=['water_reset'])
+    return device.water_container_capacity
+
+
+def suggest_next_poll(*delivered):
+    """A device that just received work is likely to get more soon, an idle one can back off."""
+    if any(item is not None for item in delivered):
+        return SYNC_NEXT_POLL_BUSY
+    return SYNC_NEXT_POLL_IDLE
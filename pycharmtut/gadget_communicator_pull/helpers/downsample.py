@@ -0,0 +1,38 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the points kept when reducing a series to threshold points with
+    Largest-Triangle-Three-Buckets.
+
+    The first and last point are always kept. The inner points are split into threshold - 2
+    buckets, and each bucket keeps the point that forms the largest triangle with the point kept
+    before it and the average of the next bucket. Bucket averages are computed in one pass, only
+    the choice within a bucket depends on the previous one.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    # the bucket after the last one is the last point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = x[a], y[a]
+        areas = np.abs((ax - next_x[bucket]) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y[bucket] - ay))
+        a = start + int(areas.argmax())
+        selected[bucket + 1] = a
+    return selected
@@ -0,0 +1,115 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+STREAM_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(stat):
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def is_not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def parse_range(request, etag, size):
+    """
+    The (start, end) byte range asked for, None for the whole file and False if unsatisfiable.
+
+    Only single ranges are honoured, anything else is answered with the whole file.
+    """
+    header = request.headers.get('Range')
+    if header is None or size == 0:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if match is None or match.group(1) == match.group(2) == '':
+        return None
+    start, end = match.groups()
+    if start == '':
+        # suffix range, the last n bytes, of which there must be at least one
+        if int(end) == 0:
+            return False
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return False
+    return start, end
+
+
+def read_range(file_path, start, length, chunk_size=STREAM_CHUNK_SIZE):
+    with open(file_path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(chunk_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def sendfile_response(file_path, content_type):
+    """Let the front proxy send the file if PHOTO_SENDFILE_HEADER is configured, None otherwise."""
+    header = getattr(settings, 'PHOTO_SENDFILE_HEADER', None)
+    if not header:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if header == 'X-Accel-Redirect':
+        relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response[header] = f"{settings.PHOTO_SENDFILE_ROOT.rstrip('/')}/{relative_path}"
+    else:
+        response[header] = file_path
+    return response
+
+
+def stream_file(request, file_path, filename=None):
+    """
+    Serve a file from disk without loading it into memory.
+
+    Answers conditional requests with 304 and single byte ranges with 206, and leaves the
+    transfer to the front proxy when PHOTO_SENDFILE_HEADER is set.
+    """
+    stat = os.stat(file_path)
+    etag = file_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+    content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = sendfile_response(file_path, content_type) or range_response(request, file_path, etag, stat,
+                                                                                content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename or os.path.basename(file_path)}"'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
+
+
+def range_response(request, file_path, etag, stat, content_type):
+    byte_range = parse_range(request, etag, stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+    elif byte_range is None:
+        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(file_path, start, end - start + 1), status=206,
+                                         content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
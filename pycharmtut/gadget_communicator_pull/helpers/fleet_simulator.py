@@ -0,0 +1,266 @@
+import asyncio
+import io
+import json
+import math
+import random
+import time
+import uuid
+from collections import defaultdict, Counter
+from urllib.parse import urlsplit, urlencode
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from PIL import Image
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_CREATED
+from gadget_communicator_pull.constants.water_constants import DEVICE_ID, PHOTO_ID, IMAGE_FILE, WATER_PLAN_BASIC
+from gadget_communicator_pull.helpers.plan_lookup import index_plan, prune_plan_index
+from gadget_communicator_pull.models import Device, BasicPlan
+from gadget_communicator_pull.models.photo_module import PhotoModule
+from gadget_communicator_pull.water_serializers.constants.water_constants import DEVICE, WATER_LEVEL, \
+    MOISTURE_LEVEL, EXECUTION_STATUS, EXECUTION_MESSAGE, HEALTH_CHECK
+
+API_PREFIX = '/gadget_communicator_pull/'
+FLEET_OWNER = 'fleet-simulator'
+FLEET_DEVICE_PREFIX = 'FLEET-'
+FLEET_PLAN_PREFIX = 'fleet-'
+TRANSPORT_ERROR = 'transport'
+REQUEST_TIMEOUT = 30
+
+
+def remove_fleet():
+    """Delete the devices, plans and photos of an earlier run."""
+    owner = User.objects.filter(username=FLEET_OWNER).first()
+    if owner is None:
+        return
+    with transaction.atomic():
+        BasicPlan.objects.filter(devices_b__owner=owner, name__startswith=FLEET_PLAN_PREFIX).delete()
+        Device.objects.filter(owner=owner).delete()
+        prune_plan_index(owner)
+
+
+def seed_fleet(device_count, plans_per_device=1, photos_per_device=1):
+    """
+    Replace the simulated fleet with device_count fresh devices, each with plans_per_device basic
+    plans to execute and photos_per_device photo requests to answer. Returns their guids.
+    """
+    remove_fleet()
+    owner, _ = User.objects.get_or_create(username=FLEET_OWNER)
+    device_guids = [f'{FLEET_DEVICE_PREFIX}{number:05d}' for number in range(device_count)]
+    with transaction.atomic():
+        Device.objects.bulk_create(Device(device_id=guid, label=guid, owner=owner) for guid in device_guids)
+        for number, device in enumerate(Device.objects.filter(owner=owner).order_by('pk')):
+            for plan_number in range(plans_per_device):
+                plan = BasicPlan.objects.create(name=f'{FLEET_PLAN_PREFIX}{number:05d}-{plan_number:02d}',
+                                                plan_type=WATER_PLAN_BASIC, water_volume=100)
+                device.device_relation_b.add(plan)
+                index_plan(owner, plan)
+        PhotoModule.objects.bulk_create(
+            PhotoModule(device=device, photo_status=PHOTO_CREATED)
+            for device in Device.objects.filter(owner=owner) for _ in range(photos_per_device))
+    return device_guids
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class FleetStats:
+    """Latencies and response statuses of every request the fleet made, per endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, endpoint, status_code, seconds):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][str(status_code)] += 1
+        if status_code == TRANSPORT_ERROR or status_code >= 400:
+            self.errors[endpoint] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            latencies = sorted(self.latencies[endpoint])
+            endpoints[endpoint] = {
+                'requests': len(latencies),
+                'errors': self.errors[endpoint],
+                'error_rate': round(self.errors[endpoint] / len(latencies), 4),
+                'throughput_rps': round(len(latencies) / elapsed, 2),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2),
+                'statuses': dict(self.statuses[endpoint]),
+            }
+        requests = sum(endpoint['requests'] for endpoint in endpoints.values())
+        errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': requests,
+            'errors': errors,
+            'error_rate': round(errors / requests, 4) if requests else 0.0,
+            'throughput_rps': round(requests / elapsed, 2),
+            'endpoints': endpoints,
+        }
+
+
+class DeviceConnection:
+    """
+    A keep-alive HTTP/1.1 connection of one virtual device, reopened when the server closes it.
+
+    Written on asyncio streams so a thousand devices need neither a thread each nor an HTTP
+    client library on the machine running the benchmark.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=b'', content_type=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        headers = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        if content_type is not None:
+            headers.append(f'Content-Type: {content_type}')
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        try:
+            await self.writer.drain()
+            return await self.read_response(method)
+        except BaseException:
+            self.close()
+            raise
+
+    async def read_response(self, method):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('server closed the connection')
+        status_code = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if method == 'HEAD' or status_code in (204, 304):
+            body = b''
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status_code, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def make_photo_bytes(size=(64, 48)):
+    """A small JPEG standing in for a camera shot."""
+    output = io.BytesIO()
+    Image.new('RGB', size, (40, 140, 60)).save(output, 'JPEG')
+    return output.getvalue()
+
+
+def encode_multipart(fields, file_field, file_name, file_bytes):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{file_name}"\r\n'
+                 f'Content-Type: image/jpeg\r\n\r\n'.encode() + file_bytes + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class VirtualDevice:
+    """
+    Plays one WaterPlantOperator: every interval it polls for a plan and reports its execution,
+    posts water and moisture levels and a healthcheck, and takes a requested photo.
+    """
+
+    def __init__(self, device_guid, host, port, stats, interval, photo_bytes, rng):
+        self.device_guid = device_guid
+        self.connection = DeviceConnection(host, port)
+        self.stats = stats
+        self.interval = interval
+        self.photo_bytes = photo_bytes
+        self.rng = rng
+
+    async def call(self, endpoint, method, path, body=b'', content_type=None):
+        started = time.perf_counter()
+        try:
+            status_code, response_body = await asyncio.wait_for(
+                self.connection.request(method, path, body, content_type), REQUEST_TIMEOUT)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            self.stats.record(endpoint, TRANSPORT_ERROR, time.perf_counter() - started)
+            return None, None
+        self.stats.record(endpoint, status_code, time.perf_counter() - started)
+        return status_code, response_body
+
+    async def post_json(self, endpoint, data):
+        return await self.call(endpoint, 'POST', API_PREFIX + endpoint, json.dumps(data).encode(), 'application/json')
+
+    async def get(self, endpoint, path):
+        return await self.call(endpoint, 'GET', f'{API_PREFIX}{path}?{urlencode({DEVICE: self.device_guid})}')
+
+    async def cycle(self):
+        status_code, body = await self.get('getPlan', 'getPlan/')
+        if status_code == 200:
+            plan = json.loads(body)
+            await self.post_json('postStatus', {
+                DEVICE: self.device_guid, EXECUTION_STATUS: True,
+                EXECUTION_MESSAGE: f'plan {plan.get("name")} executed',
+            })
+        await self.post_json('postWater', {DEVICE: self.device_guid, WATER_LEVEL: self.rng.randint(0, 100)})
+        await self.post_json('postMoisture', {DEVICE: self.device_guid, MOISTURE_LEVEL: self.rng.randint(0, 100)})
+        await self.post_json('postStatus', {
+            DEVICE: self.device_guid, EXECUTION_STATUS: True, EXECUTION_MESSAGE: HEALTH_CHECK,
+        })
+        status_code, body = await self.get('getPhoto', 'getPhoto')
+        if status_code == 200:
+            photo = json.loads(body)
+            form, content_type = encode_multipart({DEVICE_ID: self.device_guid, PHOTO_ID: photo[PHOTO_ID]},
+                                                  IMAGE_FILE, f'{photo[PHOTO_ID]}.jpg', self.photo_bytes)
+            await self.call('postPhoto', 'POST', API_PREFIX + 'postPhoto', form, content_type)
+
+    async def run(self, deadline):
+        # spread the first polls over one interval like devices booting at different times
+        await asyncio.sleep(self.rng.uniform(0, self.interval))
+        try:
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                await self.cycle()
+                await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        finally:
+            self.connection.close()
+
+
+async def simulate_fleet(base_url, device_guids, duration, interval, seed=None):
+    """Run one virtual device per guid against base_url for duration seconds and return the report."""
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    stats = FleetStats()
+    photo_bytes = make_photo_bytes()
+    rng = random.Random(seed)
+    devices = [VirtualDevice(guid, host, port, stats, interval, photo_bytes, random.Random(rng.random()))
+               for guid in device_guids]
+
+    started = time.monotonic()
+    await asyncio.gather(*(device.run(started + duration) for device in devices))
+    report = stats.report(time.monotonic() - started)
+    report.update({'devices': len(devices), 'duration_s': duration, 'interval_s': interval})
+    return report
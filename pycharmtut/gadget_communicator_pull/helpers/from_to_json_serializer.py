@@ -23,5 +23,4 @@ def remove_is_running_field(json_obj):
 
 
 def dump_json(json_string):
-    print(f'dump_json func road: {json_string}')
     return simplejson.dumps(json_string)
@@ -0,0 +1,31 @@
+import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+from gadget_communicator_pull.constants.water_constants import HEARTBEAT_MIN_INTERVAL
+from gadget_communicator_pull.helpers.device_poll import clear_running_plans
+from gadget_communicator_pull.models import Device
+
+
+def record_heartbeat(device_guid):
+    """
+    Store the time the device was last seen, and return the devices that came back online.
+
+    A heartbeat within HEARTBEAT_MIN_INTERVAL of the previous one writes nothing, any other is a
+    single conditional UPDATE of last_seen. None means there is no such device.
+    """
+    now = timezone.now()
+    devices = Device.objects.filter(device_id=device_guid)
+    stale = Q(last_seen__isnull=True) | Q(last_seen__lt=now - datetime.timedelta(seconds=HEARTBEAT_MIN_INTERVAL))
+    if not devices.filter(stale).update(last_seen=now):
+        return [] if devices.exists() else None
+
+    reconnected_devices = [
+        device for device in devices.filter(is_connected=False)
+        if Device.objects.filter(pk=device.pk, is_connected=False).update(is_connected=True)
+    ]
+    for device in reconnected_devices:
+        device.is_connected = True
+        clear_running_plans(device)
+    return reconnected_devices
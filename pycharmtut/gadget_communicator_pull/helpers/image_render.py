@@ -0,0 +1,24 @@
+"""
+Pillow-only image rendering, kept free of Django so it can run in worker processes.
+"""
+from PIL import Image, ImageOps
+
+WEBP_QUALITY = 80
+
+
+def render_webp_variants(source_path, variants):
+    """
+    Write a downscaled WebP copy of the source image for every (target_path, (width, height)) in
+    variants, keeping the aspect ratio and the EXIF orientation. Returns the written paths.
+    """
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        written = []
+        for target_path, max_size in variants:
+            variant = image.copy()
+            variant.thumbnail(max_size, Image.LANCZOS)
+            variant.save(target_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+            written.append(target_path)
+        return written
@@ -0,0 +1,116 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+from gadget_communicator_pull.models import Device
+
+DEFAULT_FLUSH_INTERVAL = 5
+DEFAULT_FLUSH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceLevelBuffer:
+    """
+    Write-behind buffer for the water and moisture level of devices.
+
+    Only the latest value per device and field is kept. Dirty devices are written with one
+    bulk_update per set of changed fields once flush_size devices are pending or every
+    flush_interval seconds, so a crash loses at most flush_interval seconds of levels. With a
+    flush_interval of 0 every record is written through immediately. A flush failing on the
+    request thread is logged and retried by the next flush, it never fails the request.
+    """
+
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL, flush_size=DEFAULT_FLUSH_SIZE):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._stopped = threading.Event()
+        self._flusher = None
+
+    def record(self, device_pk, field, value):
+        self.record_many([(device_pk, field, value)])
+
+    def record_many(self, updates):
+        with self._lock:
+            for device_pk, field, value in updates:
+                self._pending.setdefault(device_pk, {})[field] = value
+            pending_count = len(self._pending)
+        if self.flush_interval <= 0 or pending_count >= self.flush_size:
+            try:
+                self.flush()
+            except Exception:
+                # called from device requests whose reading is already stored, failing them would
+                # only make the device retry; the levels stay buffered for the next flush
+                logger.exception('device level flush failed')
+        if self.flush_interval > 0:
+            self._ensure_flusher()
+
+    def flush(self):
+        # one flush at a time so an older batch can never overwrite a newer one
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            by_fields = {}
+            for device_pk, levels in pending.items():
+                by_fields.setdefault(tuple(sorted(levels)), []).append(Device(pk=device_pk, **levels))
+            try:
+                for fields, devices in by_fields.items():
+                    Device.objects.bulk_update(devices, list(fields), batch_size=self.flush_size)
+            except Exception:
+                self._restore(pending)
+                raise
+            return len(pending)
+
+    def _restore(self, pending):
+        # keep levels recorded while the failed flush was running, they are newer
+        with self._lock:
+            for device_pk, levels in pending.items():
+                self._pending[device_pk] = {**levels, **self._pending.get(device_pk, {})}
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run, name='device-level-flusher', daemon=True)
+            self._flusher.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('device level flush failed')
+            finally:
+                connection.close()
+
+
+def get_level_buffer():
+    global _level_buffer
+    if _level_buffer is None:
+        # sync views run on several threads, a second buffer would keep its levels to its own flusher
+        with _level_buffer_lock:
+            if _level_buffer is None:
+                _level_buffer = DeviceLevelBuffer(
+                    flush_interval=getattr(settings, 'DEVICE_LEVEL_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+                    flush_size=getattr(settings, 'DEVICE_LEVEL_FLUSH_SIZE', DEFAULT_FLUSH_SIZE),
+                )
+    return _level_buffer
+
+
+_level_buffer = None
+_level_buffer_lock = threading.Lock()
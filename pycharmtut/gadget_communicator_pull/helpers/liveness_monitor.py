@@ -0,0 +1,73 @@
+import datetime
+import heapq
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from gadget_communicator_pull.constants.water_constants import DEVICE_OFFLINE_AFTER, DEVICE_LIVENESS_BATCH
+from gadget_communicator_pull.models import Device
+from authentication.notifications import notify_device_owner, NOTIFY_CONNECTIVITY
+
+
+class DeviceLivenessMonitor:
+    """
+    Disconnects devices whose last heartbeat is older than offline_after.
+
+    The monitor keeps the connected devices with the oldest last_seen in a heap ordered by
+    their deadline, loaded batch_size at a time through the last_seen index. Every device
+    outside the heap was seen after every device in it, so only the top of the heap has to be
+    looked at. A tick disconnects the expired devices with one conditional UPDATE per batch and
+    costs nothing while no deadline has passed.
+    """
+
+    def __init__(self, offline_after=DEVICE_OFFLINE_AFTER, batch_size=DEVICE_LIVENESS_BATCH, on_disconnected=None):
+        self.offline_after = datetime.timedelta(seconds=offline_after)
+        self.batch_size = batch_size
+        self.on_disconnected = on_disconnected
+        self._deadlines = []
+
+    def tick(self, now=None):
+        """Disconnect the expired devices and return the seconds until the next deadline, None if there is none."""
+        now = now or timezone.now()
+        while True:
+            if not self._deadlines and not self._load():
+                return None
+            expired = []
+            while self._deadlines and self._deadlines[0][0] < now:
+                expired.append(heapq.heappop(self._deadlines)[1])
+            if expired:
+                self._disconnect(expired, now)
+            if self._deadlines:
+                return (self._deadlines[0][0] - now).total_seconds()
+
+    def _load(self):
+        devices = Device.objects.filter(is_connected=True) \
+            .order_by(F('last_seen').asc(nulls_first=True), 'pk') \
+            .values_list('pk', 'last_seen')[:self.batch_size]
+        for device_pk, last_seen in devices:
+            # devices that never sent a heartbeat are already overdue
+            deadline = last_seen + self.offline_after if last_seen is not None else datetime.datetime.min.replace(
+                tzinfo=datetime.timezone.utc)
+            heapq.heappush(self._deadlines, (deadline, device_pk))
+        return len(self._deadlines)
+
+    def _disconnect(self, device_pks, now):
+        # devices that sent a heartbeat since they were loaded are left alone
+        overdue = Q(last_seen__isnull=True) | Q(last_seen__lt=now - self.offline_after)
+        devices = list(Device.objects.filter(overdue, pk__in=device_pks, is_connected=True).select_related('owner'))
+        if not devices:
+            return []
+        Device.objects.filter(overdue, pk__in=[device.pk for device in devices]).update(is_connected=False)
+        for device in devices:
+            device.is_connected = False
+        if self.on_disconnected is not None:
+            self.on_disconnected(devices)
+        return devices
+
+
+
+def notify_disconnected_owners(devices):
+    """Tell the owners of the devices that asked for emails that their device went offline."""
+    for device in devices:
+        notify_device_owner(device, NOTIFY_CONNECTIVITY, 'Device Operation: Error',
+                            f'device: {device.device_id} disconnected')
@@ -0,0 +1,84 @@
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_CREATED
+from gadget_communicator_pull.helpers.plan_lookup import PLAN_KIND_MODELS
+from gadget_communicator_pull.models import Device
+from gadget_communicator_pull.models.photo_module import PhotoModule
+
+MULTIPROCESS_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+UNNAMED_URL = 'unnamed'
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+# long polls of getPlan stay open for up to LONG_POLL_MAX_WAIT seconds
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_LATENCY = Histogram('water_http_request_duration_seconds', 'Time to serve a request, by URL name',
+                            ['url_name', 'method'], buckets=REQUEST_LATENCY_BUCKETS)
+REQUESTS = Counter('water_http_requests', 'Requests served, by URL name and status class',
+                   ['url_name', 'method', 'status'])
+EMAILS_SENT = Counter('water_emails_sent', 'Outbox emails delivered')
+EMAILS_FAILED = Counter('water_emails_failed', 'Outbox email delivery attempts that failed')
+
+
+class DatabaseCollector:
+    """
+    Gauges counted in the database on every scrape.
+
+    They describe shared state rather than the work of one process, so every worker reports
+    the same values and nothing has to be aggregated across processes.
+    """
+
+    def collect(self):
+        connected = GaugeMetricFamily('water_devices_connected', 'Devices currently connected')
+        connected.add_metric([], Device.objects.filter(is_connected=True).count())
+        pending_plans = GaugeMetricFamily('water_plans_pending', 'Plans not yet picked up by their device',
+                                          labels=['kind'])
+        for plan_kind, (plan_model, _) in PLAN_KIND_MODELS.items():
+            pending_plans.add_metric([plan_kind], plan_model.objects.filter(has_been_executed=False).count())
+        pending_photos = GaugeMetricFamily('water_photos_pending', 'Photos requested but not yet picked up')
+        pending_photos.add_metric([], PhotoModule.objects.filter(photo_status=PHOTO_CREATED).count())
+        return [connected, pending_plans, pending_photos]
+
+
+# not auto-described, so registering it does not query the database at import time
+database_registry = CollectorRegistry(auto_describe=False)
+database_registry.register(DatabaseCollector())
+
+
+# labelled children by (url_name, method, status class), labels() costs more than the observation itself
+_request_children = {}
+
+
+def get_request_children(url_name, method, status_class):
+    key = (url_name, method, status_class)
+    children = _request_children.get(key)
+    if children is None:
+        children = (REQUEST_LATENCY.labels(url_name, method), REQUESTS.labels(url_name, method, status_class))
+        _request_children[key] = children
+    return children
+
+
+def observe_request(request, status_code, seconds):
+    match = getattr(request, 'resolver_match', None)
+    url_name = (match.url_name if match is not None else None) or UNNAMED_URL
+    method = request.method if request.method in KNOWN_METHODS else 'other'
+    latency, requests = get_request_children(url_name, method, f'{status_code // 100}xx')
+    latency.observe(seconds)
+    requests.inc()
+
+
+def render_metrics():
+    """
+    The text exposition of every metric.
+
+    With PROMETHEUS_MULTIPROC_DIR set, each worker writes its counters and histograms to files
+    in that directory and a scrape of any worker sums the files of all of them.
+    """
+    if os.environ.get(MULTIPROCESS_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(database_registry)
@@ -0,0 +1,66 @@
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from gadget_communicator_pull.constants.water_constants import PAGE_LIMIT, PAGE_CURSOR, PAGE_MAX_LIMIT
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Keeps microseconds, DjangoJSONEncoder cuts datetimes to milliseconds and rows would be skipped."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def is_paged_query(query_params):
+    return PAGE_LIMIT in query_params or PAGE_CURSOR in query_params
+
+
+def parse_page_params(query_params):
+    """Read limit and the decoded cursor of a list request, raises ValueError on bad input."""
+    limit = int(query_params.get(PAGE_LIMIT, PAGE_MAX_LIMIT))
+    if not 1 <= limit <= PAGE_MAX_LIMIT:
+        raise ValueError(f'{PAGE_LIMIT} must be between 1 and {PAGE_MAX_LIMIT}')
+    cursor = query_params.get(PAGE_CURSOR)
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=CursorEncoder).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f'invalid {PAGE_CURSOR}')
+
+
+def keyset_page(queryset, ordering, after, limit):
+    """
+    One page of queryset in ordering, starting after the key values of the last row seen.
+
+    ordering is a tuple of fields sharing one direction and ending in a unique one, e.g.
+    ('-pk',). Each page is a range scan on the index of those fields, so deep pages cost the same
+    as the first. Returns the rows and the key of the last one, None on the last page.
+    """
+    fields = [field.lstrip('-') for field in ordering]
+    lookup = 'lt' if ordering[0].startswith('-') else 'gt'
+    queryset = queryset.order_by(*ordering)
+    if after is not None:
+        if not isinstance(after, list) or len(after) != len(fields):
+            raise ValueError(f'invalid {PAGE_CURSOR}')
+        condition = Q()
+        for index, field in enumerate(fields):
+            condition |= Q(**dict(zip(fields[:index], after[:index])), **{f'{field}__{lookup}': after[index]})
+        queryset = queryset.filter(condition)
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, [getattr(rows[-1], field) for field in fields]
@@ -0,0 +1,123 @@
+import atexit
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_VARIANT_THUMBNAIL, PHOTO_VARIANT_MEDIUM, \
+    PHOTO_THUMBNAIL_SIZE, PHOTO_MEDIUM_SIZE
+from gadget_communicator_pull.helpers.image_render import render_webp_variants
+from gadget_communicator_pull.models.photo_module import PhotoModule
+from gadget_communicator_pull.models.photo_upload import PHOTO_UPLOAD_DIR
+from gadget_communicator_pull.storage import LocalFile, has_local_path
+
+PHOTO_VARIANT_SIZES = {
+    PHOTO_VARIANT_THUMBNAIL: PHOTO_THUMBNAIL_SIZE,
+    PHOTO_VARIANT_MEDIUM: PHOTO_MEDIUM_SIZE,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def get_render_pool():
+    """Worker processes for rendering, None when PHOTO_DERIVATIVE_WORKERS is 0 and rendering runs inline."""
+    global _pool
+    workers = getattr(settings, 'PHOTO_DERIVATIVE_WORKERS', 2)
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def variant_name(image_name, variant):
+    """images/photo.jpg -> images/photo.thumbnail.webp"""
+    return f'{os.path.splitext(image_name)[0]}.{variant}.webp'
+
+
+def make_work_file(suffix):
+    work_dir = os.path.join(settings.MEDIA_ROOT, PHOTO_UPLOAD_DIR)
+    os.makedirs(work_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=work_dir)
+    os.close(fd)
+    return path
+
+
+def local_source(photo):
+    """A path the renderer can read the image from, and whether it is a temporary copy."""
+    if has_local_path(photo.image):
+        return photo.image.path, False
+    path = make_work_file(os.path.splitext(photo.image.name)[1])
+    with photo.image.open('rb') as image, open(path, 'wb') as copy:
+        for chunk in image.chunks():
+            copy.write(chunk)
+    return path, True
+
+
+def schedule_derivatives(photo):
+    """
+    Render the thumbnail and medium WebP of a stored photo in the background.
+
+    The variants are rendered into work files by a process pool, so large images do not hold up
+    request workers, and then saved through the photo storage. The fields are set once the
+    files are stored, until then only the original is served.
+    """
+    if not photo.image:
+        return None
+    source_path, source_is_copy = local_source(photo)
+    work_files = {variant: make_work_file('.webp') for variant in PHOTO_VARIANT_SIZES}
+    variants = [(work_files[variant], size) for variant, size in PHOTO_VARIANT_SIZES.items()]
+    cleanup = [source_path] if source_is_copy else []
+
+    pool = get_render_pool()
+    if pool is None:
+        try:
+            render_webp_variants(source_path, variants)
+            store_derivatives(photo.pk, photo.image.name, work_files)
+        except Exception:
+            logger.exception('rendering variants of photo %s failed', photo.pk)
+        finally:
+            remove_work_files(cleanup + list(work_files.values()))
+        return None
+
+    future = pool.submit(render_webp_variants, source_path, variants)
+    future.add_done_callback(lambda done: _on_rendered(done, photo.pk, photo.image.name, work_files, cleanup))
+    return future
+
+
+def store_derivatives(photo_pk, image_name, work_files):
+    photo = PhotoModule.objects.filter(pk=photo_pk, image=image_name).first()
+    if photo is None:
+        # the photo got another image while the variants were rendered
+        return
+    names = {}
+    for variant, work_file in work_files.items():
+        with open(work_file, 'rb') as fh:
+            names[variant] = photo.image.storage.save(variant_name(image_name, variant), LocalFile(fh))
+    PhotoModule.objects.filter(pk=photo_pk, image=image_name).update(**names)
+
+
+def remove_work_files(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _on_rendered(future, photo_pk, image_name, work_files, cleanup):
+    try:
+        future.result()
+        store_derivatives(photo_pk, image_name, work_files)
+    except Exception:
+        logger.exception('rendering variants of photo %s failed', photo_pk)
+    finally:
+        remove_work_files(cleanup + list(work_files.values()))
+        connection.close()
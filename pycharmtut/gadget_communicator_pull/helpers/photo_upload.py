@@ -0,0 +1,118 @@
+import datetime
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_READY, PHOTO_UPLOAD_CHUNK_SIZE
+from gadget_communicator_pull.helpers.photo_derivatives import schedule_derivatives
+from gadget_communicator_pull.models import PhotoUpload
+from gadget_communicator_pull.models.photo_upload import PHOTO_UPLOAD_DIR
+from gadget_communicator_pull.storage import LocalFile
+
+
+def start_upload(photo, filename, size):
+    """Open an upload session for the photo, or return the unfinished one so the device can resume it."""
+    upload = photo.uploads.filter(size=size, filename=filename).first()
+    if upload is not None and os.path.exists(upload.temp_path):
+        return upload
+    discard_uploads(photo)
+    upload = PhotoUpload.objects.create(photo=photo, filename=filename, size=size)
+    os.makedirs(os.path.dirname(upload.temp_path), exist_ok=True)
+    open(upload.temp_path, 'wb').close()
+    return upload
+
+
+def append_chunk(upload, stream, length):
+    """
+    Write up to length bytes of stream at the offset of the upload.
+
+    The bytes are staged in a file of their own while they arrive and only spliced into the
+    upload file by the request that moves the offset, so a losing concurrent request never
+    overwrites what the winner stored. Whatever arrived is kept even if the connection broke
+    mid-chunk, so the device resumes from the returned offset. None means another request
+    moved the offset first.
+    """
+    staging_path = f'{upload.temp_path}.{uuid.uuid4().hex}'
+    try:
+        written = 0
+        with open(staging_path, 'wb') as staging:
+            while written < length:
+                chunk = stream.read(min(PHOTO_UPLOAD_CHUNK_SIZE, length - written))
+                if not chunk:
+                    break
+                staging.write(chunk)
+                written += len(chunk)
+        new_offset = upload.offset + written
+        with transaction.atomic():
+            # the row stays locked by the update until the splice is done
+            if not PhotoUpload.objects.filter(pk=upload.pk, offset=upload.offset).update(offset=new_offset):
+                return None
+            with open(staging_path, 'rb') as staging, open(upload.temp_path, 'r+b') as fh:
+                fh.seek(upload.offset)
+                shutil.copyfileobj(staging, fh, PHOTO_UPLOAD_CHUNK_SIZE)
+    finally:
+        remove_file(staging_path)
+    upload.offset = new_offset
+    return new_offset
+
+
+def finalize_upload(upload):
+    """
+    Hand the complete file to the photo storage and mark the photo Ready. None if another
+    request finalized the upload first.
+    """
+    photo = upload.photo
+    with transaction.atomic():
+        # deleting the row claims the upload, a concurrent finalize waits and then finds nothing
+        if not PhotoUpload.objects.filter(pk=upload.pk).delete()[0] or not os.path.exists(upload.temp_path):
+            return None
+        with open(upload.temp_path, 'rb') as fh:
+            # a file system storage moves the file into place instead of copying it
+            name = photo.image.storage.save(photo.image.field.generate_filename(photo, upload.filename),
+                                            LocalFile(fh))
+        remove_file(upload.temp_path)
+        photo.image.name = name
+        photo.thumbnail = None
+        photo.medium = None
+        photo.photo_status = PHOTO_READY
+        photo.save(update_fields=['image', 'thumbnail', 'medium', 'photo_status'])
+    schedule_derivatives(photo)
+    return photo
+
+
+def expire_uploads(max_age):
+    """
+    Delete uploads started more than max_age seconds ago and never finalized, together with any
+    file left in the upload directory for that long. Returns how many uploads were deleted.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=max_age)
+    expired = 0
+    for upload in PhotoUpload.objects.filter(created_at__lt=cutoff):
+        remove_file(upload.temp_path)
+        upload.delete()
+        expired += 1
+    upload_dir = os.path.join(settings.MEDIA_ROOT, PHOTO_UPLOAD_DIR)
+    if os.path.isdir(upload_dir):
+        live_uploads = {str(upload_id) for upload_id in PhotoUpload.objects.values_list('upload_id', flat=True)}
+        for entry in os.scandir(upload_dir):
+            # <upload_id>.part and the <upload_id>.part.<hex> chunks staged for it
+            if entry.name.split('.')[0] not in live_uploads and entry.stat().st_mtime < cutoff.timestamp():
+                remove_file(entry.path)
+    return expired
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard_uploads(photo):
+    for upload in photo.uploads.all():
+        remove_file(upload.temp_path)
+        upload.delete()
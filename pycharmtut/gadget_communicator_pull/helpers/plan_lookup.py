@@ -0,0 +1,78 @@
+from django.db import IntegrityError, transaction
+
+from gadget_communicator_pull.constants.water_constants import WATER_PLAN_BASIC, WATER_PLAN_TIME, \
+    WATER_PLAN_MOISTURE
+from gadget_communicator_pull.models import BasicPlan, TimePlan, MoisturePlan, PlanIndex
+
+PLAN_KIND_MODELS = {
+    WATER_PLAN_BASIC: (BasicPlan, 'devices_b'),
+    WATER_PLAN_TIME: (TimePlan, 'devices_t'),
+    WATER_PLAN_MOISTURE: (MoisturePlan, 'devices_m'),
+}
+
+
+def get_plan_kind(plan):
+    for plan_kind, (plan_model, _) in PLAN_KIND_MODELS.items():
+        if isinstance(plan, plan_model):
+            return plan_kind
+    raise TypeError(f'unsupported plan {plan}')
+
+
+def is_plan_name_taken(owner, name):
+    return PlanIndex.objects.filter(owner=owner, name=name).exists()
+
+
+def get_plan_for_name(owner, name):
+    """The basic, time or moisture plan of the owner called name, or None."""
+    entry = PlanIndex.objects.filter(owner=owner, name=name).first()
+    if entry is None:
+        return None
+    plan_model, _ = PLAN_KIND_MODELS[entry.plan_kind]
+    return plan_model.objects.filter(pk=entry.plan_id).first()
+
+
+def get_plan_device(owner, plan):
+    """One device of the owner the plan is attached to."""
+    _, devices_field = PLAN_KIND_MODELS[get_plan_kind(plan)]
+    return getattr(plan, devices_field).filter(owner=owner).first()
+
+
+def reserve_plan_name(owner, name, plan_kind, plan_id=0):
+    """
+    Claim name for a plan of the owner and return the index entry, whose plan_id is set once the
+    plan is saved. None if the owner already has a plan of that name.
+    """
+    try:
+        with transaction.atomic():
+            return PlanIndex.objects.create(owner=owner, name=name, plan_kind=plan_kind, plan_id=plan_id)
+    except IntegrityError:
+        return None
+
+
+def index_plan(owner, plan):
+    """Register the name of a new plan of the owner. False if the owner already has a plan of that name."""
+    return reserve_plan_name(owner, plan.name, get_plan_kind(plan), plan.pk) is not None
+
+
+def unindex_plan(plan):
+    PlanIndex.objects.filter(plan_kind=get_plan_kind(plan), plan_id=plan.pk).delete()
+
+
+def prune_plan_index(owner):
+    """Forget the names of plans no longer attached to any device of the owner, e.g. after a device is deleted."""
+    for plan_kind, (plan_model, devices_field) in PLAN_KIND_MODELS.items():
+        attached = plan_model.objects.filter(**{f'{devices_field}__owner': owner}).values('pk')
+        PlanIndex.objects.filter(owner=owner, plan_kind=plan_kind).exclude(plan_id__in=attached).delete()
+
+
+def get_device_plans(devices):
+    """
+    The basic, time and moisture plans attached to devices, ready for the plan serializers.
+
+    The devices of every plan and the weekday times of the time plans are prefetched, so
+    serializing any number of plans costs the same handful of queries.
+    """
+    basic_plans = BasicPlan.objects.filter(devices_b__in=devices).prefetch_related('devices_b')
+    time_plans = TimePlan.objects.filter(devices_t__in=devices).prefetch_related('devices_t', 'water_times')
+    moisture_plans = MoisturePlan.objects.filter(devices_m__in=devices).prefetch_related('devices_m')
+    return basic_plans, time_plans, moisture_plans
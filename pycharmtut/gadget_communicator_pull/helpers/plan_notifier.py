@@ -0,0 +1,184 @@
+import asyncio
+import atexit
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+
+from gadget_communicator_pull.models import BasicPlan, TimePlan, MoisturePlan
+
+FAN_OUT_SOCKET_SUFFIX = '.sock'
+# device ids per datagram, well below the datagram size limit of unix sockets
+FAN_OUT_BATCH = 500
+FAN_OUT_MAX_DATAGRAM = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class PlanWaiter:
+    """A parked long-poll request, woken from any thread once a plan for its device changes."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # the loop of the parked request is already gone
+            pass
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class PlanNotifier:
+    """
+    Registry of devices waiting for a plan.
+
+    Waiters live in the process serving the long poll. Without fan_out_dir only the waiters of
+    the notifying process are woken, a plan saved by another worker reaches the device when its
+    long poll times out. With fan_out_dir, a directory shared by the workers of one host, every
+    process parking long polls listens on a datagram socket in it and notify sends the device
+    ids to all of them, so a plan saved by any worker wakes the device at once.
+    """
+
+    def __init__(self, fan_out_dir=None):
+        self.fan_out_dir = fan_out_dir
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(set)
+        self._socket = None
+        self._socket_path = None
+        self._socket_pid = None
+
+    def subscribe(self, device_guid):
+        waiter = PlanWaiter(asyncio.get_running_loop())
+        if self.fan_out_dir:
+            self.listen()
+        with self._lock:
+            self._waiters[device_guid].add(waiter)
+        return waiter
+
+    def unsubscribe(self, device_guid, waiter):
+        with self._lock:
+            waiters = self._waiters.get(device_guid)
+            if waiters is None:
+                return
+            waiters.discard(waiter)
+            if not waiters:
+                del self._waiters[device_guid]
+
+    def has_waiters(self):
+        return bool(self._waiters)
+
+    def notify(self, device_guids):
+        self.wake(device_guids)
+        if self.fan_out_dir:
+            self.fan_out(device_guids)
+
+    def wake(self, device_guids):
+        with self._lock:
+            waiters = [waiter for device_guid in device_guids for waiter in self._waiters.get(device_guid, ())]
+        for waiter in waiters:
+            waiter.wake()
+
+    def listen(self):
+        """Bind the socket of this process in fan_out_dir once and read it on a daemon thread."""
+        with self._lock:
+            # a forked worker must not share the socket of its parent
+            if self._socket is not None and self._socket_pid == os.getpid():
+                return
+            os.makedirs(self.fan_out_dir, exist_ok=True)
+            path = os.path.join(self.fan_out_dir, f'{os.getpid()}-{uuid.uuid4().hex[:8]}{FAN_OUT_SOCKET_SUFFIX}')
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            listener.bind(path)
+            self._socket, self._socket_path, self._socket_pid = listener, path, os.getpid()
+        threading.Thread(target=self.receive, args=(listener,), name='plan-notifier', daemon=True).start()
+        atexit.register(self.close)
+
+    def receive(self, listener):
+        while True:
+            try:
+                payload = listener.recv(FAN_OUT_MAX_DATAGRAM)
+            except OSError:
+                return
+            if not payload:
+                # shut down by close
+                return
+            try:
+                self.wake(json.loads(payload))
+            except ValueError:
+                logger.warning('ignored a malformed plan notification')
+
+    def fan_out(self, device_guids):
+        """Send the device ids to the sockets of the other processes, never blocking on a slow one."""
+        paths = [path for path in glob.glob(os.path.join(self.fan_out_dir, f'*{FAN_OUT_SOCKET_SUFFIX}'))
+                 if path != self._socket_path]
+        if not paths or not device_guids:
+            return
+        payloads = [json.dumps(device_guids[start:start + FAN_OUT_BATCH]).encode()
+                    for start in range(0, len(device_guids), FAN_OUT_BATCH)]
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            sender.setblocking(False)
+            for path in paths:
+                try:
+                    for payload in payloads:
+                        sender.sendto(payload, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # left behind by a process that died without cleaning up
+                    remove_socket(path)
+                except BlockingIOError:
+                    # the device gets the plan when its long poll times out
+                    logger.warning('plan notification queue of %s is full', path)
+
+    def close(self):
+        with self._lock:
+            listener, path = self._socket, self._socket_path
+            if listener is None or self._socket_pid != os.getpid():
+                return
+            self._socket = self._socket_path = self._socket_pid = None
+        remove_socket(path)
+        try:
+            # wakes the receive thread, closing alone leaves it blocked
+            listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        listener.close()
+
+
+def remove_socket(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_plan_devices(plan):
+    if isinstance(plan, BasicPlan):
+        return plan.devices_b.all()
+    if isinstance(plan, TimePlan):
+        return plan.devices_t.all()
+    if isinstance(plan, MoisturePlan):
+        return plan.devices_m.all()
+    raise TypeError(f'unsupported plan {plan}')
+
+
+def notify_plan_devices(plan):
+    """Wake the long polls of every device the plan is attached to, in every worker with PLAN_NOTIFIER_DIR."""
+    if not plan_notifier.has_waiters() and not plan_notifier.fan_out_dir:
+        return
+    plan_notifier.notify(list(get_plan_devices(plan).values_list('device_id', flat=True)))
+
+
+plan_notifier = PlanNotifier(getattr(settings, 'PLAN_NOTIFIER_DIR', None))
@@ -0,0 +1,203 @@
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+DEFAULT_SAMPLE_RATE = 0.0
+DEFAULT_SUMMARY_INTERVAL = 60
+UNRESOLVED_ENDPOINT = 'unresolved'
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimer:
+    """Counts the queries run for one request and the time spent in them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries += 1
+
+
+current_timer = contextvars.ContextVar('query_timer', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection, timing the query for the request of the current
+    context. Async views run their queries on worker threads, which get a copy of that context.
+    """
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+connection_created.connect(install_query_counter)
+
+
+class RequestSample:
+    def __init__(self, endpoint, method, status_code, queries, db_ms, view_ms, size):
+        self.endpoint = endpoint
+        self.method = method
+        self.status_code = status_code
+        self.queries = queries
+        self.db_ms = db_ms
+        self.view_ms = view_ms
+        self.size = size
+
+    def server_timing(self):
+        timings = [f'db;dur={self.db_ms:.2f};desc="{self.queries} queries"', f'view;dur={self.view_ms:.2f}']
+        if self.size is not None:
+            timings.append(f'size;desc="{self.size} bytes"')
+        return ', '.join(timings)
+
+    def as_dict(self):
+        return {
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'status': self.status_code,
+            'queries': self.queries,
+            'db_ms': round(self.db_ms, 2),
+            'view_ms': round(self.view_ms, 2),
+            'bytes': self.size,
+        }
+
+
+class EndpointStats:
+    """
+    Per-endpoint totals of the requests served by this process since the last summary.
+
+    Every request is counted whether or not its own log line was sampled, so the summary
+    gives the real request rate and averages of each endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._since = time.monotonic()
+
+    def add(self, sample):
+        with self._lock:
+            stats = self._stats.get(sample.endpoint)
+            if stats is None:
+                stats = self._stats[sample.endpoint] = {
+                    'requests': 0, 'errors': 0, 'queries': 0, 'max_queries': 0,
+                    'db_ms': 0.0, 'view_ms': 0.0, 'max_view_ms': 0.0, 'bytes': 0,
+                }
+            stats['requests'] += 1
+            stats['errors'] += sample.status_code >= 500
+            stats['queries'] += sample.queries
+            stats['max_queries'] = max(stats['max_queries'], sample.queries)
+            stats['db_ms'] += sample.db_ms
+            stats['view_ms'] += sample.view_ms
+            stats['max_view_ms'] = max(stats['max_view_ms'], sample.view_ms)
+            stats['bytes'] += sample.size or 0
+
+    def pop_summary(self, interval):
+        """The averages per endpoint once interval seconds passed since the last summary, None before."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._since < interval:
+                return None
+            stats, self._stats, self._since = self._stats, {}, now
+        return {endpoint: summarize(endpoint_stats) for endpoint, endpoint_stats in stats.items()}
+
+
+def summarize(stats):
+    requests = stats['requests']
+    return {
+        'requests': requests,
+        'errors': stats['errors'],
+        'avg_queries': round(stats['queries'] / requests, 2),
+        'max_queries': stats['max_queries'],
+        'avg_db_ms': round(stats['db_ms'] / requests, 2),
+        'avg_view_ms': round(stats['view_ms'] / requests, 2),
+        'max_view_ms': round(stats['max_view_ms'], 2),
+        'avg_bytes': round(stats['bytes'] / requests),
+    }
+
+
+def get_endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_ENDPOINT
+    return match.view_name
+
+
+def get_response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+def start_timer():
+    # connections opened before this module was loaded did not get the counter yet
+    for connection in connections.all():
+        install_query_counter(connection)
+    timer = QueryTimer()
+    return timer, current_timer.set(timer)
+
+
+def make_sample(request, response, timer, start):
+    view_ms = (time.perf_counter() - start) * 1000
+    return RequestSample(get_endpoint(request), request.method, response.status_code, timer.queries,
+                         timer.duration * 1000, view_ms, get_response_size(response))
+
+
+def measure(request, get_response):
+    """Serve the request and return the response with a RequestSample of its queries, timing and size."""
+    timer, token = start_timer()
+    start = time.perf_counter()
+    try:
+        response = get_response(request)
+    finally:
+        current_timer.reset(token)
+    return response, make_sample(request, response, timer, start)
+
+
+async def measure_async(request, get_response):
+    """Like measure, awaiting the response of an async middleware chain."""
+    timer, token = start_timer()
+    start = time.perf_counter()
+    try:
+        response = await get_response(request)
+    finally:
+        current_timer.reset(token)
+    return response, make_sample(request, response, timer, start)
+
+
+def is_sampled():
+    sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def log_sample(sample):
+    logger.info('request %s', json.dumps(sample.as_dict()))
+
+
+def log_summary(summary):
+    for endpoint, stats in summary.items():
+        logger.info('summary %s', json.dumps({'endpoint': endpoint, **stats}))
+
+
+endpoint_stats = EndpointStats()
@@ -0,0 +1,144 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+
+NO_CONTEXT = '-'
+
+request_id_var = contextvars.ContextVar('request_id', default=NO_CONTEXT)
+device_id_var = contextvars.ContextVar('device_id', default=NO_CONTEXT)
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+def bind_device(device_guid):
+    """Tag every log record of the current request with the device it is serving."""
+    if device_guid is not None:
+        device_id_var.set(str(device_guid))
+
+
+class CorrelationFilter(logging.Filter):
+    """Copies the request and device id of the current context onto the record."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.device_id = device_id_var.get()
+        return True
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """
+    Lets at most burst debug records of each call site through per interval seconds.
+
+    Records are keyed by logger and unformatted message, so a debug line inside a device poll
+    cannot flood the log however many devices poll. Info and above always pass.
+    """
+
+    def __init__(self, burst=10, interval=60):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count = self._windows.get(key, (now, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+            self._windows[key] = (window_start, count + 1)
+        return count < self.burst
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the level, logger, message and correlation ids."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', NO_CONTEXT),
+            'device_id': getattr(record, 'device_id', NO_CONTEXT),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry)
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a background thread that formats and writes them to stream.
+
+    The request thread only puts the record on a bounded queue. When the writer falls behind
+    and the queue is full, records are dropped and counted instead of blocking the request;
+    the count is reported with the next record written.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.dropped = 0
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def setFormatter(self, fmt):
+        # formatting happens on the writer thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """
+        Resolve the message and the traceback before the record is queued, like the stdlib
+        QueueHandler does: the arguments may change and the traceback may be gone by the time
+        the writer thread formats the record. The JSON itself is still built on that thread.
+        """
+        message = record.getMessage()
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = (self.target.formatter or logging.Formatter()).formatException(record.exc_info)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            logging.getLogger(__name__).warning('dropped %d log records, the log writer fell behind', dropped)
+
+    def stop(self):
+        if self.listener is None:
+            return
+        try:
+            self.listener.stop()
+        except queue.Full:
+            # no room for the stop sentinel, the writer thread is a daemon and dies with the process
+            pass
+        self.listener = None
+
+    def close(self):
+        self.stop()
+        self.target.close()
+        super().close()
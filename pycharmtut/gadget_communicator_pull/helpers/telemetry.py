@@ -0,0 +1,49 @@
+from django.db import transaction
+
+from gadget_communicator_pull.constants.water_constants import TELEMETRY_WATER, TELEMETRY_MOISTURE
+from gadget_communicator_pull.helpers.level_buffer import get_level_buffer
+from gadget_communicator_pull.models import Device, WaterChart, MoistureChart
+from gadget_communicator_pull.water_serializers.constants.water_constants import WATER_LEVEL, MOISTURE_LEVEL
+
+TELEMETRY_LEVEL_FIELDS = {
+    TELEMETRY_WATER: WATER_LEVEL,
+    TELEMETRY_MOISTURE: MOISTURE_LEVEL,
+}
+
+
+def get_devices_by_guid(device_guids):
+    """Resolve all device guids of a batch with one query, the first device wins like in get_device."""
+    devices = {}
+    for device in Device.objects.filter(device_id__in=set(device_guids)):
+        devices.setdefault(device.device_id, device)
+    return devices
+
+
+def store_readings(readings, devices):
+    """
+    Store a validated batch of readings.
+
+    Water and moisture readings are appended to their charts with bulk_create, and the newest
+    reading of each kind per device goes to the level buffer.
+    """
+    latest_readings = {}
+    for reading in readings:
+        key = (reading['device'], reading['kind'])
+        if key not in latest_readings or reading['measured_at'] >= latest_readings[key]['measured_at']:
+            latest_readings[key] = reading
+
+    with transaction.atomic():
+        WaterChart.objects.bulk_create([
+            WaterChart(water_chart=reading['value'], device_relation=devices[reading['device']],
+                       measured_at=reading['measured_at'])
+            for reading in readings if reading['kind'] == TELEMETRY_WATER
+        ])
+        MoistureChart.objects.bulk_create([
+            MoistureChart(moisture=reading['value'], device_relation=devices[reading['device']],
+                          measured_at=reading['measured_at'])
+            for reading in readings if reading['kind'] == TELEMETRY_MOISTURE
+        ])
+    get_level_buffer().record_many(
+        (devices[device_guid].pk, TELEMETRY_LEVEL_FIELDS[kind], reading['value'])
+        for (device_guid, kind), reading in latest_readings.items()
+    )
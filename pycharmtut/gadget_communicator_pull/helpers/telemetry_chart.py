@@ -0,0 +1,100 @@
+from datetime import timedelta, datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from gadget_communicator_pull.constants.water_constants import TELEMETRY_RESOLUTION_RAW, TELEMETRY_RESOLUTION_HOUR, \
+    TELEMETRY_RESOLUTION_DAY, TELEMETRY_RESOLUTION_AUTO, CHART_FROM, CHART_TO, CHART_RESOLUTION, \
+    CHART_DEFAULT_SPAN_DAYS, CHART_RAW_MAX_SPAN_DAYS, CHART_HOURLY_MAX_SPAN_DAYS, CHART_POINTS, CHART_MAX_POINTS, \
+    CHART_PAD_SIZE, CHART_PAD_VALUE
+from gadget_communicator_pull.helpers.downsample import lttb
+from gadget_communicator_pull.helpers.telemetry_rollup import TELEMETRY_SOURCES, truncate_hour, truncate_day
+from gadget_communicator_pull.models import TelemetryRollup
+
+CHART_RESOLUTIONS = (TELEMETRY_RESOLUTION_RAW, TELEMETRY_RESOLUTION_HOUR, TELEMETRY_RESOLUTION_DAY,
+                     TELEMETRY_RESOLUTION_AUTO)
+
+
+def is_range_query(query_params):
+    return any(param in query_params for param in (CHART_FROM, CHART_TO, CHART_RESOLUTION, CHART_POINTS))
+
+
+def parse_moment(value):
+    """ISO datetime or date, naive values are taken in the current time zone."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'invalid date {value}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_chart_range(query_params):
+    """Read from, to and resolution of a chart request, raises ValueError on bad input."""
+    end = parse_moment(query_params[CHART_TO]) if query_params.get(CHART_TO) else timezone.now()
+    if query_params.get(CHART_FROM):
+        start = parse_moment(query_params[CHART_FROM])
+    else:
+        start = end - timedelta(days=CHART_DEFAULT_SPAN_DAYS)
+    if start >= end:
+        raise ValueError(f'{CHART_FROM} must be before {CHART_TO}')
+    resolution = query_params.get(CHART_RESOLUTION, TELEMETRY_RESOLUTION_AUTO)
+    if resolution not in CHART_RESOLUTIONS:
+        raise ValueError(f'unknown resolution {resolution}')
+    if resolution == TELEMETRY_RESOLUTION_AUTO:
+        resolution = pick_resolution(start, end)
+    max_points = int(query_params.get(CHART_POINTS, CHART_MAX_POINTS))
+    if not 3 <= max_points <= CHART_MAX_POINTS:
+        raise ValueError(f'{CHART_POINTS} must be between 3 and {CHART_MAX_POINTS}')
+    return start, end, resolution, max_points
+
+
+def pick_resolution(start, end):
+    """The coarsest tier that still gives a useful number of points for the range."""
+    span = end - start
+    if span <= timedelta(days=CHART_RAW_MAX_SPAN_DAYS):
+        return TELEMETRY_RESOLUTION_RAW
+    if span <= timedelta(days=CHART_HOURLY_MAX_SPAN_DAYS):
+        return TELEMETRY_RESOLUTION_HOUR
+    return TELEMETRY_RESOLUTION_DAY
+
+
+def get_chart_points(device, metric, start, end, resolution, max_points=CHART_MAX_POINTS):
+    """
+    Readings of the device between start and end, oldest first, reduced to max_points with LTTB.
+
+    Raw points carry the reading under the name of its column, rollup points carry the
+    average there and add min, max and samples. Rollups trail the raw readings by one run of
+    rollup_telemetry.
+    """
+    model, value_field = TELEMETRY_SOURCES[metric]
+    if resolution == TELEMETRY_RESOLUTION_RAW:
+        readings = downsample(list(
+            model.objects.filter(device_relation=device, measured_at__gte=start, measured_at__lt=end)
+            .order_by('measured_at', 'pk').values_list('measured_at', value_field)), max_points)
+        return [{'measured_at': measured_at.isoformat(), value_field: value} for measured_at, value in readings]
+    # the bucket holding start overlaps the range
+    start = truncate_hour(start) if resolution == TELEMETRY_RESOLUTION_HOUR else truncate_day(start)
+    rollups = downsample(list(
+        TelemetryRollup.objects.filter(device=device, metric=metric, resolution=resolution,
+                                       bucket_start__gte=start, bucket_start__lt=end)
+        .order_by('bucket_start').values_list('bucket_start', 'avg_value', 'min_value', 'max_value', 'samples')),
+        max_points)
+    return [{'measured_at': bucket_start.isoformat(), value_field: avg_value, 'min': min_value, 'max': max_value,
+             'samples': samples} for bucket_start, avg_value, min_value, max_value, samples in rollups]
+
+
+def downsample(rows, max_points):
+    """Keep the rows of (moment, value, ...) that LTTB picks to preserve the shape of the series."""
+    if len(rows) <= max_points:
+        return rows
+    indices = lttb([row[0].timestamp() for row in rows], [row[1] for row in rows], max_points)
+    return [rows[index] for index in indices]
+
+
+def pad_latest_readings(values, size=CHART_PAD_SIZE):
+    """Fill a short history up to size points with a full container in front of the oldest reading."""
+    return [CHART_PAD_VALUE] * (size - len(values)) + values
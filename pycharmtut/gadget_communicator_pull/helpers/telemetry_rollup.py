@@ -0,0 +1,146 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Min, Max, Avg, Count, Sum, F, FloatField
+from django.db.models.functions import TruncHour, TruncDay
+
+from gadget_communicator_pull.constants.water_constants import TELEMETRY_WATER, TELEMETRY_MOISTURE, \
+    TELEMETRY_RESOLUTION_HOUR, TELEMETRY_RESOLUTION_DAY
+from gadget_communicator_pull.models import WaterChart, MoistureChart, TelemetryRollup, TelemetryRollupCursor
+
+# raw reading model and value column of every metric that is rolled up
+TELEMETRY_SOURCES = {
+    TELEMETRY_WATER: (WaterChart, 'water_chart'),
+    TELEMETRY_MOISTURE: (MoistureChart, 'moisture'),
+}
+
+ROLLUP_BATCH_SIZE = 5000
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+
+def truncate_hour(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def truncate_day(moment):
+    return truncate_hour(moment).replace(hour=0)
+
+
+def roll_up(metric, batch_size=ROLLUP_BATCH_SIZE):
+    """
+    Fold the raw readings added since the last run into the hourly and daily rollups.
+
+    Only the hours and days that received readings are recomputed, so readings delivered late
+    with an old measured_at still land in the right bucket. Readings older than the raw
+    retention are skipped, their hour was already rolled up and its raw rows pruned. Returns the
+    number of raw rows read.
+    """
+    model, value_field = TELEMETRY_SOURCES[metric]
+    cutoff = retention_cutoff('TELEMETRY_RAW_RETENTION_DAYS')
+    with transaction.atomic():
+        cursor, _ = TelemetryRollupCursor.objects.select_for_update().get_or_create(metric=metric)
+        new_rows = list(model.objects.filter(pk__gt=cursor.last_id, pk__lte=cursor.seen_id)
+                        .order_by('pk').values_list('pk', 'device_relation_id', 'measured_at')[:batch_size])
+
+        spans = {}
+        for _, device_pk, measured_at in new_rows:
+            if device_pk is None or (cutoff is not None and measured_at < cutoff):
+                continue
+            hour = truncate_hour(measured_at)
+            first, last = spans.get(device_pk, (hour, hour))
+            spans[device_pk] = (min(first, hour), max(last, hour))
+        for device_pk, (first, last) in spans.items():
+            roll_up_hours(metric, model, value_field, device_pk, first, last + HOUR)
+            roll_up_days(metric, device_pk, truncate_day(first), truncate_day(last) + DAY)
+
+        if new_rows:
+            cursor.last_id = new_rows[-1][0]
+        if cursor.last_id >= cursor.seen_id:
+            # caught up, rows committed since the last run are rolled up by the next one
+            newest = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+            cursor.seen_id = newest or cursor.last_id
+        cursor.save(update_fields=['last_id', 'seen_id'])
+    return len(new_rows)
+
+
+def roll_up_hours(metric, model, value_field, device_pk, start, end):
+    buckets = (model.objects.filter(device_relation_id=device_pk, measured_at__gte=start, measured_at__lt=end)
+               .annotate(bucket=TruncHour('measured_at', tzinfo=dt_timezone.utc)).values('bucket')
+               .annotate(min_value=Min(value_field), max_value=Max(value_field), avg_value=Avg(value_field),
+                         samples=Count('pk')).order_by('bucket'))
+    store_buckets(device_pk, metric, TELEMETRY_RESOLUTION_HOUR, buckets)
+
+
+def roll_up_days(metric, device_pk, start, end):
+    buckets = (TelemetryRollup.objects.filter(device_id=device_pk, metric=metric,
+                                              resolution=TELEMETRY_RESOLUTION_HOUR,
+                                              bucket_start__gte=start, bucket_start__lt=end)
+               .annotate(bucket=TruncDay('bucket_start', tzinfo=dt_timezone.utc)).values('bucket')
+               .annotate(min_value=Min('min_value'), max_value=Max('max_value'),
+                         weighted_sum=Sum(F('avg_value') * F('samples'), output_field=FloatField()),
+                         samples=Sum('samples')).order_by('bucket'))
+    for bucket in buckets:
+        bucket['avg_value'] = bucket.pop('weighted_sum') / bucket['samples']
+    store_buckets(device_pk, metric, TELEMETRY_RESOLUTION_DAY, buckets)
+
+
+def store_buckets(device_pk, metric, resolution, buckets):
+    """Insert or update the rollup rows, Django 3.2 has no bulk upsert so existing rows are read first."""
+    buckets = {bucket['bucket']: bucket for bucket in buckets}
+    if not buckets:
+        return
+    existing = {rollup.bucket_start: rollup for rollup in TelemetryRollup.objects.filter(
+        device_id=device_pk, metric=metric, resolution=resolution, bucket_start__in=list(buckets))}
+    new_rollups = []
+    for bucket_start, bucket in buckets.items():
+        rollup = existing.get(bucket_start)
+        if rollup is None:
+            rollup = TelemetryRollup(device_id=device_pk, metric=metric, resolution=resolution,
+                                     bucket_start=bucket_start)
+            new_rollups.append(rollup)
+        rollup.min_value = bucket['min_value']
+        rollup.max_value = bucket['max_value']
+        rollup.avg_value = bucket['avg_value']
+        rollup.samples = bucket['samples']
+    TelemetryRollup.objects.bulk_update(existing.values(), ['min_value', 'max_value', 'avg_value', 'samples'])
+    TelemetryRollup.objects.bulk_create(new_rollups)
+
+
+def retention_cutoff(setting_name):
+    days = getattr(settings, setting_name, None)
+    if not days:
+        return None
+    return timezone.now() - timedelta(days=days)
+
+
+def prune_telemetry(metric, batch_size=ROLLUP_BATCH_SIZE):
+    """
+    Delete raw readings and hourly rollups past TELEMETRY_RAW_RETENTION_DAYS and
+    TELEMETRY_HOURLY_RETENTION_DAYS, raw readings only once they are rolled up. Daily rollups
+    are kept. Returns the number of deleted rows.
+    """
+    model, _ = TELEMETRY_SOURCES[metric]
+    deleted = 0
+    raw_cutoff = retention_cutoff('TELEMETRY_RAW_RETENTION_DAYS')
+    if raw_cutoff is not None:
+        last_id = TelemetryRollupCursor.objects.filter(metric=metric).values_list('last_id', flat=True).first()
+        deleted += delete_in_batches(model.objects.filter(pk__lte=last_id or 0, measured_at__lt=raw_cutoff),
+                                     batch_size)
+    hourly_cutoff = retention_cutoff('TELEMETRY_HOURLY_RETENTION_DAYS')
+    if hourly_cutoff is not None:
+        deleted += delete_in_batches(TelemetryRollup.objects.filter(
+            metric=metric, resolution=TELEMETRY_RESOLUTION_HOUR, bucket_start__lt=hourly_cutoff), batch_size)
+    return deleted
+
+
+def delete_in_batches(queryset, batch_size):
+    """Short deletes so devices posting readings are not blocked behind one long one."""
+    deleted = 0
+    while True:
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += queryset.model.objects.filter(pk__in=pks).delete()[0]
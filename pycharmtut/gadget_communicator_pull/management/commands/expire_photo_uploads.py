@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_UPLOAD_EXPIRY
+from gadget_communicator_pull.helpers.photo_upload import expire_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked photo uploads that were never finalized, and their temporary files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='seconds after which an unfinished upload is deleted, PHOTO_UPLOAD_EXPIRY by default')
+
+    def handle(self, *args, **options):
+        max_age = options['max_age']
+        if max_age is None:
+            max_age = getattr(settings, 'PHOTO_UPLOAD_EXPIRY', PHOTO_UPLOAD_EXPIRY)
+        self.stdout.write(f'expired {expire_uploads(max_age)} uploads')
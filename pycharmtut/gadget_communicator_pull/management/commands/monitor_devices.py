@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gadget_communicator_pull.helpers.liveness_monitor import DeviceLivenessMonitor, notify_disconnected_owners
+
+
+class Command(BaseCommand):
+    help = 'Disconnect devices that stopped sending heartbeats and email their owners'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-sleep', type=float, default=5,
+                            help='longest pause between two ticks, in seconds')
+        parser.add_argument('--once', action='store_true', help='run a single tick and exit')
+
+    def handle(self, *args, **options):
+        monitor = DeviceLivenessMonitor(on_disconnected=self.on_disconnected)
+        while True:
+            next_deadline = monitor.tick()
+            if options['once']:
+                return
+            if next_deadline is None:
+                next_deadline = options['max_sleep']
+            time.sleep(min(max(next_deadline, 0), options['max_sleep']))
+
+    def on_disconnected(self, devices):
+        self.stdout.write(f'disconnected {", ".join(device.device_id for device in devices)}')
+        notify_disconnected_owners(devices)
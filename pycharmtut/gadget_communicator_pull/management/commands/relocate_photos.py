@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from gadget_communicator_pull.models.photo_module import PhotoModule
+from gadget_communicator_pull.storage import is_content_addressed
+
+PHOTO_FILE_FIELDS = ('image', 'thumbnail', 'medium')
+
+
+class Command(BaseCommand):
+    help = 'Move photos stored under their upload names into the content-addressed photos/ layout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='photos loaded per query')
+        parser.add_argument('--dry-run', action='store_true', help='only list the files that would move')
+
+    def handle(self, *args, **options):
+        photos = PhotoModule.objects.only('pk', *PHOTO_FILE_FIELDS).order_by('pk')
+        last_pk = 0
+        moved = 0
+        while True:
+            batch = list(photos.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for photo in batch:
+                moved += self.relocate(photo, options['dry_run'])
+        self.stdout.write(f'{"would move" if options["dry_run"] else "moved"} {moved} files')
+
+    def relocate(self, photo, dry_run):
+        updates = {}
+        old_names = []
+        for field in PHOTO_FILE_FIELDS:
+            field_file = getattr(photo, field)
+            if not field_file or is_content_addressed(field_file.name):
+                continue
+            storage = field_file.storage
+            if not storage.exists(field_file.name):
+                self.stderr.write(f'photo {photo.pk}: {field_file.name} is missing')
+                continue
+            if dry_run:
+                self.stdout.write(f'photo {photo.pk}: {field_file.name}')
+                updates[field] = field_file.name
+                continue
+            with storage.open(field_file.name, 'rb') as content:
+                updates[field] = storage.save(field_file.name, content)
+            old_names.append((storage, field_file.name))
+        if updates and not dry_run:
+            PhotoModule.objects.filter(pk=photo.pk).update(**updates)
+            for storage, name in old_names:
+                storage.delete(name)
+        return len(updates)
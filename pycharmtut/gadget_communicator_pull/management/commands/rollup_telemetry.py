@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gadget_communicator_pull.helpers.telemetry_rollup import TELEMETRY_SOURCES, ROLLUP_BATCH_SIZE, roll_up, \
+    prune_telemetry
+
+
+class Command(BaseCommand):
+    help = 'Fold new device readings into the hourly and daily chart rollups and prune old readings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=60,
+                            help='pause between two runs once all readings are rolled up, in seconds')
+        parser.add_argument('--batch-size', type=int, default=ROLLUP_BATCH_SIZE, help='raw readings read per query')
+        parser.add_argument('--prune-interval', type=float, default=3600,
+                            help='pause between two retention prunes, in seconds')
+        parser.add_argument('--once', action='store_true', help='roll up what is there, prune and exit')
+
+    def handle(self, *args, **options):
+        idle_runs = 0
+        next_prune = 0
+        while True:
+            if time.monotonic() >= next_prune:
+                self.prune(options['batch_size'])
+                next_prune = time.monotonic() + options['prune_interval']
+            rolled_up = 0
+            for metric in TELEMETRY_SOURCES:
+                rolled_up += roll_up(metric, options['batch_size'])
+            if rolled_up:
+                self.stdout.write(f'rolled up {rolled_up} readings')
+                idle_runs = 0
+                continue
+            idle_runs += 1
+            if options['once']:
+                # the first idle run only moves the watermark up to the newest reading
+                if idle_runs > 1:
+                    return
+                continue
+            time.sleep(options['interval'])
+
+    def prune(self, batch_size):
+        for metric in TELEMETRY_SOURCES:
+            deleted = prune_telemetry(metric, batch_size)
+            if deleted:
+                self.stdout.write(f'pruned {deleted} {metric} rows')
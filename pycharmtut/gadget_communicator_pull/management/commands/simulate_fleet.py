@@ -0,0 +1,90 @@
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gadget_communicator_pull.helpers.fleet_simulator import seed_fleet, remove_fleet, simulate_fleet
+
+SERVER_START_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = 'Load test the device endpoints with a fleet of simulated WaterPlantOperator clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=100, help='number of simulated devices')
+        parser.add_argument('--duration', type=float, default=60, help='length of the run, in seconds')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='pause between two polls of one device, in seconds')
+        parser.add_argument('--plans', type=int, default=1, help='basic plans queued per device')
+        parser.add_argument('--photos', type=int, default=1, help='photo requests queued per device')
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='server to load, it must use the same database as this command')
+        parser.add_argument('--serve', action='store_true',
+                            help='start runserver on a free local port for the run instead of using --url')
+        parser.add_argument('--label', default=None, help='name of the run in the report, the git commit by default')
+        parser.add_argument('--seed', type=int, default=None, help='seed of the simulated readings and start times')
+        parser.add_argument('--output', default=None, help='write the JSON report to this file instead of stdout')
+        parser.add_argument('--keep', action='store_true', help='keep the simulated devices after the run')
+
+    def handle(self, *args, **options):
+        device_guids = seed_fleet(options['devices'], options['plans'], options['photos'])
+        server = None
+        try:
+            url = options['url']
+            if options['serve']:
+                server, url = start_server()
+            report = asyncio.run(simulate_fleet(url, device_guids, options['duration'], options['interval'],
+                                                seed=options['seed']))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            if not options['keep']:
+                remove_fleet()
+
+        report = {'label': options['label'] or get_git_commit(), **report}
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output + '\n')
+        else:
+            self.stdout.write(output)
+
+
+def get_free_port():
+    with socket.socket() as free_socket:
+        free_socket.bind(('127.0.0.1', 0))
+        return free_socket.getsockname()[1]
+
+
+def start_server():
+    """Start runserver on a free port and wait until it accepts connections."""
+    port = get_free_port()
+    server = subprocess.Popen(
+        [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver', '--noreload', f'127.0.0.1:{port}'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError('runserver exited before accepting connections')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise CommandError(f'runserver did not accept connections within {SERVER_START_TIMEOUT} seconds')
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
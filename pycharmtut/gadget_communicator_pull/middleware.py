@@ -0,0 +1,103 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from gadget_communicator_pull.helpers.metrics import observe_request
+from gadget_communicator_pull.helpers.request_metrics import measure, measure_async, is_sampled, log_sample, \
+    log_summary, endpoint_stats, DEFAULT_SUMMARY_INTERVAL
+from gadget_communicator_pull.helpers.structured_logging import request_id_var, device_id_var, new_request_id, \
+    NO_CONTEXT
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+MAX_REQUEST_ID_LENGTH = 64
+
+
+class RequestContextMiddleware:
+    """
+    Gives every request an id that is attached to all its log records and returned in X-Request-ID.
+
+    An X-Request-ID sent by the client or the proxy is kept, so log lines can be matched with
+    the ones of the proxy. Views serving a device add the device id with bind_device.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # under ASGI stay async, so the long poll is not moved onto a worker thread
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request_id, tokens = self.bind_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.unbind_request(tokens)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+    async def __acall__(self, request):
+        request_id, tokens = self.bind_request(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.unbind_request(tokens)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+    def bind_request(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')[:MAX_REQUEST_ID_LENGTH] or new_request_id()
+        return request_id, (request_id_var.set(request_id), device_id_var.set(NO_CONTEXT))
+
+    def unbind_request(self, tokens):
+        request_token, device_token = tokens
+        device_id_var.reset(device_token)
+        request_id_var.reset(request_token)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records the query count, database time, view time and response size of every request.
+
+    With REQUEST_METRICS_SERVER_TIMING (DEBUG by default) they are returned in a Server-Timing
+    header for the browser dev tools. A REQUEST_METRICS_SAMPLE_RATE share of the requests is logged
+    as one JSON line each, and the totals of every endpoint are logged as one summary line per
+    endpoint every REQUEST_METRICS_SUMMARY_INTERVAL seconds. The latency of every request also
+    goes into the histograms served by /metrics. Put it first in MIDDLEWARE so the session and
+    authentication queries are counted too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response, sample = measure(request, self.get_response)
+        return self.record(request, response, sample)
+
+    async def __acall__(self, request):
+        response, sample = await measure_async(request, self.get_response)
+        return self.record(request, response, sample)
+
+    def record(self, request, response, sample):
+        if getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = sample.server_timing()
+        if is_sampled():
+            log_sample(sample)
+        endpoint_stats.add(sample)
+        observe_request(request, sample.status_code, sample.view_ms / 1000)
+        summary_interval = getattr(settings, 'REQUEST_METRICS_SUMMARY_INTERVAL', DEFAULT_SUMMARY_INTERVAL)
+        if summary_interval is not None:
+            summary = endpoint_stats.pop_summary(summary_interval)
+            if summary:
+                log_summary(summary)
+        return response
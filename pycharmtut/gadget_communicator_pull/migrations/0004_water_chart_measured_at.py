@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gadget_communicator_pull', '0003_alter_status_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waterchart',
+            name='measured_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='waterchart',
+            index=models.Index(fields=['device_relation', 'measured_at'], name='gadget_comm_device__cec925_idx'),
+        ),
+    ]
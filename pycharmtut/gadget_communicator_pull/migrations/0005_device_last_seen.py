@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:33
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_last_seen(apps, schema_editor):
+    # HealthCheck only kept an HH:MM string, treat connected devices as just seen
+    Device = apps.get_model('gadget_communicator_pull', 'Device')
+    Device.objects.filter(is_connected=True).update(last_seen=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gadget_communicator_pull', '0004_water_chart_measured_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_seen, migrations.RunPython.noop),
+    ]
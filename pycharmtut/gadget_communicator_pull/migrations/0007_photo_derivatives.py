@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gadget_communicator_pull', '0006_photo_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photomodule',
+            name='medium',
+            field=models.ImageField(blank=True, null=True, upload_to='images/'),
+        ),
+        migrations.AddField(
+            model_name='photomodule',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='images/'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:42
+
+from django.db import migrations, models
+import gadget_communicator_pull.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gadget_communicator_pull', '0007_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photomodule',
+            name='image',
+            field=models.ImageField(null=True, storage=gadget_communicator_pull.storage.get_photo_storage, upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='photomodule',
+            name='medium',
+            field=models.ImageField(blank=True, null=True, storage=gadget_communicator_pull.storage.get_photo_storage, upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='photomodule',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=gadget_communicator_pull.storage.get_photo_storage, upload_to='images/'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gadget_communicator_pull', '0008_content_addressed_photo_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelemetryRollupCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('water', 'Water level'), ('moisture', 'Moisture level')], max_length=20, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('seen_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TelemetryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('water', 'Water level'), ('moisture', 'Moisture level')], max_length=20)),
+                ('resolution', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('min_value', models.FloatField()),
+                ('max_value', models.FloatField()),
+                ('avg_value', models.FloatField()),
+                ('samples', models.PositiveIntegerField()),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_rollups', to='gadget_communicator_pull.device')),
+            ],
+            options={
+                'unique_together': {('device', 'metric', 'resolution', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gadget_communicator_pull', '0009_telemetry_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoistureChart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moisture', models.IntegerField(default=0)),
+                ('measured_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('device_relation', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='moisture_charts', to='gadget_communicator_pull.device')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='moisturechart',
+            index=models.Index(fields=['device_relation', 'measured_at'], name='gadget_comm_device__327f24_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:52
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.utils.timezone
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def reconstruct_created_at(rows, now):
+    """
+    Timestamps for the (pk, HH:MM) rows of statuses ordered newest first.
+
+    The strings carry no date, so the newest status is placed on today and every status whose
+    time is later than the one of the status after it moves back a day. Gaps longer than a day
+    cannot be seen and are collapsed. Unreadable strings take the time of the status after them.
+    """
+    day = timezone.localtime(now).date()
+    later = now
+    for pk, status_time in rows:
+        try:
+            clock = datetime.strptime(status_time, '%H:%M').time()
+        except ValueError:
+            yield pk, later
+            continue
+        moment = timezone.make_aware(datetime.combine(day, clock), is_dst=False)
+        if moment > later:
+            day -= timedelta(days=1)
+            moment = timezone.make_aware(datetime.combine(day, clock), is_dst=False)
+        later = moment
+        yield pk, moment
+
+
+def backfill_created_at(apps, schema_editor):
+    Status = apps.get_model('gadget_communicator_pull', 'Status')
+    rows = Status.objects.order_by('-pk').values_list('pk', 'status_time').iterator(chunk_size=BACKFILL_BATCH_SIZE)
+    batch = []
+    for pk, created_at in reconstruct_created_at(rows, timezone.now()):
+        batch.append(Status(pk=pk, created_at=created_at))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            Status.objects.bulk_update(batch, ['created_at'])
+            batch = []
+    Status.objects.bulk_update(batch, ['created_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gadget_communicator_pull', '0010_moisture_chart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='status',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='status',
+            index=models.Index(fields=['created_at', 'id'], name='gadget_comm_created_06cb92_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='status',
+            index=models.Index(fields=['execution_status', 'created_at'], name='gadget_comm_executi_ffd06b_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+COPY_BATCH_SIZE = 1000
+
+# child model, former many-to-many field on Device and the child column of its through table
+DEVICE_RELATIONS = (
+    ('Status', 'status_relation', 'status_id'),
+    ('HealthCheck', 'health_relation', 'healthcheck_id'),
+    ('PhotoModule', 'photo_relation', 'photomodule_id'),
+)
+
+
+def copy_links_to_foreign_keys(apps, schema_editor):
+    """Set the device of every child from the through table, a child linked twice keeps its first device."""
+    Device = apps.get_model('gadget_communicator_pull', 'Device')
+    for model_name, field_name, child_column in DEVICE_RELATIONS:
+        child_model = apps.get_model('gadget_communicator_pull', model_name)
+        through = Device._meta.get_field(field_name).remote_field.through
+        last_pk = 0
+        while True:
+            links = list(through.objects.filter(pk__gt=last_pk).order_by('pk')
+                         .values_list('pk', child_column, 'device_id')[:COPY_BATCH_SIZE])
+            if not links:
+                break
+            last_pk = links[-1][0]
+            devices = {}
+            for _, child_pk, device_pk in links:
+                devices.setdefault(child_pk, device_pk)
+            unset = child_model.objects.filter(pk__in=list(devices), device__isnull=True).values_list('pk', flat=True)
+            child_model.objects.bulk_update([child_model(pk=child_pk, device_id=devices[child_pk])
+                                             for child_pk in unset], ['device'])
+
+
+def copy_foreign_keys_to_links(apps, schema_editor):
+    Device = apps.get_model('gadget_communicator_pull', 'Device')
+    for model_name, field_name, child_column in DEVICE_RELATIONS:
+        child_model = apps.get_model('gadget_communicator_pull', model_name)
+        through = Device._meta.get_field(field_name).remote_field.through
+        last_pk = 0
+        while True:
+            children = list(child_model.objects.filter(pk__gt=last_pk, device__isnull=False).order_by('pk')
+                            .values_list('pk', 'device_id')[:COPY_BATCH_SIZE])
+            if not children:
+                break
+            last_pk = children[-1][0]
+            through.objects.bulk_create([through(**{child_column: child_pk, 'device_id': device_pk})
+                                         for child_pk, device_pk in children])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gadget_communicator_pull', '0011_status_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healthcheck',
+            name='device',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='health_checks', to='gadget_communicator_pull.device'),
+        ),
+        migrations.AddField(
+            model_name='photomodule',
+            name='device',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='gadget_communicator_pull.device'),
+        ),
+        migrations.AddField(
+            model_name='status',
+            name='device',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='statuses', to='gadget_communicator_pull.device'),
+        ),
+        migrations.RunPython(copy_links_to_foreign_keys, copy_foreign_keys_to_links),
+        migrations.RemoveField(
+            model_name='device',
+            name='health_relation',
+        ),
+        migrations.RemoveField(
+            model_name='device',
+            name='photo_relation',
+        ),
+        migrations.RemoveField(
+            model_name='device',
+            name='status_relation',
+        ),
+        migrations.AddIndex(
+            model_name='healthcheck',
+            index=models.Index(fields=['device', 'id'], name='gadget_comm_device__837a4d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photomodule',
+            index=models.Index(fields=['device', 'id'], name='gadget_comm_device__dce40a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='status',
+            index=models.Index(fields=['device', 'created_at', 'id'], name='gadget_comm_device__e7cd36_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.2.25 on 2026-10-17 02:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+INDEX_BATCH_SIZE = 1000
+
+PLAN_RELATIONS = (
+    ('basic', 'device_relation_b', 'basicplan'),
+    ('time_based', 'device_relation_t', 'timeplan'),
+    ('moisture', 'device_relation_m', 'moistureplan'),
+)
+
+
+def index_existing_plans(apps, schema_editor):
+    """
+    Register every plan attached to an owned device under the owner of the device.
+
+    A name shared by plans of different kinds of one owner keeps the first one indexed.
+    """
+    Device = apps.get_model('gadget_communicator_pull', 'Device')
+    PlanIndex = apps.get_model('gadget_communicator_pull', 'PlanIndex')
+    for plan_kind, relation, plan_field in PLAN_RELATIONS:
+        through = getattr(Device, relation).through
+        rows = through.objects.filter(device__owner__isnull=False) \
+            .values_list('device__owner_id', f'{plan_field}__name', f'{plan_field}_id') \
+            .order_by(f'{plan_field}_id').distinct().iterator(chunk_size=INDEX_BATCH_SIZE)
+        batch = []
+        for owner_id, name, plan_id in rows:
+            batch.append(PlanIndex(owner_id=owner_id, name=name, plan_kind=plan_kind, plan_id=plan_id))
+            if len(batch) >= INDEX_BATCH_SIZE:
+                PlanIndex.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        PlanIndex.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gadget_communicator_pull', '0012_device_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+                ('plan_kind', models.CharField(choices=[('basic', 'Basic plan'), ('time_based', 'Time plan'), ('moisture', 'Moisture plan')], max_length=20)),
+                ('plan_id', models.BigIntegerField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_names', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='planindex',
+            index=models.Index(fields=['plan_kind', 'plan_id'], name='gadget_comm_plan_ki_152152_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='planindex',
+            unique_together={('owner', 'name')},
+        ),
+        migrations.RunPython(index_existing_plans, migrations.RunPython.noop),
+    ]
@@ -3,14 +3,22 @@ from .moisture_plan_module import MoisturePlan
 from .status_module import Status
 from .time_plan_module import TimePlan
 from .water_time_module import WaterTime
-from .device_module import Device, WaterChart
+from .device_module import Device, WaterChart, MoistureChart
+from .photo_upload import PhotoUpload
+from .plan_index import PlanIndex
+from .telemetry_rollup import TelemetryRollup, TelemetryRollupCursor
 
 __all__ = [
     'Device',
     'WaterChart',
+    'MoistureChart',
     'BasicPlan',
     'MoisturePlan',
     'Status',
     'TimePlan',
     'WaterTime',
+    'PhotoUpload',
+    'PlanIndex',
+    'TelemetryRollup',
+    'TelemetryRollupCursor',
 ]
\ No newline at end of file
@@ -1,11 +1,9 @@
 from django.db import models
+from django.utils import timezone
 from django.urls import reverse
 from gadget_communicator_pull.models.basic_plan_module import BasicPlan
-from gadget_communicator_pull.models.health_check import HealthCheck
-from gadget_communicator_pull.models.photo_module import PhotoModule
 from gadget_communicator_pull.models.time_plan_module import TimePlan
 from gadget_communicator_pull.models.moisture_plan_module import MoisturePlan
-from gadget_communicator_pull.models.status_module import Status
 
 
 class Device(models.Model):
@@ -13,9 +11,6 @@ class Device(models.Model):
     device_relation_b = models.ManyToManyField(BasicPlan, related_name='devices_b')
     device_relation_t = models.ManyToManyField(TimePlan, related_name='devices_t')
     device_relation_m = models.ManyToManyField(MoisturePlan, related_name='devices_m')
-    status_relation = models.ManyToManyField(Status, related_name='statuses')
-    health_relation = models.ManyToManyField(HealthCheck, related_name='health_check')
-    photo_relation = models.ManyToManyField(PhotoModule, related_name='photos')
 
     device_id = models.CharField(max_length=50)
     label = models.CharField(max_length=50)
@@ -25,6 +20,7 @@ class Device(models.Model):
     water_reset = models.BooleanField(default=False)
     send_email = models.BooleanField(default=False)
     is_connected = models.BooleanField(default=False)
+    last_seen = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def get_absolute_url(self):
         return reverse("gadget_communicator_pull:device-info", kwargs={"id": self.id})
@@ -37,3 +33,20 @@ class Device(models.Model):
 class WaterChart(models.Model):
     water_chart = models.IntegerField(default=100)
     device_relation = models.ForeignKey(Device, related_name='water_charts', on_delete=models.CASCADE, null=True)
+    measured_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['device_relation', 'measured_at']),
+        ]
+
+
+class MoistureChart(models.Model):
+    moisture = models.IntegerField(default=0)
+    device_relation = models.ForeignKey(Device, related_name='moisture_charts', on_delete=models.CASCADE, null=True)
+    measured_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['device_relation', 'measured_at']),
+        ]
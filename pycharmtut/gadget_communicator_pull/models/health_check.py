@@ -9,10 +9,17 @@ class HealthCheck(models.Model):
     message = models.CharField(max_length=120)
     status_id = models.UUIDField(default=uuid.uuid4, editable=False)
     status_time = models.CharField(max_length=40, default="")
+    device = models.ForeignKey('gadget_communicator_pull.Device', related_name='health_checks',
+                               on_delete=models.CASCADE, null=True)
 
     def get_absolute_url(self):
         return reverse("gadget_communicator_pull:water-status", kwargs={"id": self.id})
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['device', 'id']),
+        ]
+
     # def save(self):
     #     count = HealthCheck.objects.all().count()
     #     save_permission = HealthCheck.has_add_permission(self)
@@ -2,9 +2,19 @@ import uuid
 from django.db import models
 
 from gadget_communicator_pull.constants.photo_constants import PHOTO_INIT
+from gadget_communicator_pull.storage import get_photo_storage
 
 
 class PhotoModule(models.Model):
     photo_id = models.UUIDField(default=uuid.uuid4, editable=False)
-    image = models.ImageField(upload_to='images/', null=True)
+    image = models.ImageField(upload_to='images/', storage=get_photo_storage, null=True)
+    thumbnail = models.ImageField(upload_to='images/', storage=get_photo_storage, null=True, blank=True)
+    medium = models.ImageField(upload_to='images/', storage=get_photo_storage, null=True, blank=True)
     photo_status = models.CharField(max_length=20, default=PHOTO_INIT)
+    device = models.ForeignKey('gadget_communicator_pull.Device', related_name='photos', on_delete=models.CASCADE,
+                               null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['device', 'id']),
+        ]
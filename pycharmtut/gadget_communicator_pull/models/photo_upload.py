@@ -0,0 +1,23 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+from gadget_communicator_pull.models.photo_module import PhotoModule
+
+PHOTO_UPLOAD_DIR = 'uploads'
+
+
+class PhotoUpload(models.Model):
+    """A resumable upload of the image of a photo, received chunk by chunk into a temporary file."""
+    upload_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    photo = models.ForeignKey(PhotoModule, related_name='uploads', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.MEDIA_ROOT, PHOTO_UPLOAD_DIR, f'{self.upload_id}.part')
@@ -0,0 +1,29 @@
+from django.db import models
+
+from gadget_communicator_pull.constants.water_constants import WATER_PLAN_BASIC, WATER_PLAN_TIME, \
+    WATER_PLAN_MOISTURE
+
+PLAN_KINDS = [
+    (WATER_PLAN_BASIC, 'Basic plan'),
+    (WATER_PLAN_TIME, 'Time plan'),
+    (WATER_PLAN_MOISTURE, 'Moisture plan'),
+]
+
+
+class PlanIndex(models.Model):
+    """
+    The name of a plan of a user, pointing at the basic, time or moisture plan carrying it.
+
+    Plan names are unique per owner across the three plan tables, so looking a plan up by name
+    or checking a new name for duplicates is one lookup on (owner, name).
+    """
+    owner = models.ForeignKey('auth.User', related_name='plan_names', on_delete=models.CASCADE)
+    name = models.CharField(max_length=20)
+    plan_kind = models.CharField(max_length=20, choices=PLAN_KINDS)
+    plan_id = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ['owner', 'name']
+        indexes = [
+            models.Index(fields=['plan_kind', 'plan_id']),
+        ]
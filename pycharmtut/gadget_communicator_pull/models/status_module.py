@@ -1,6 +1,7 @@
 import uuid
 
 from django.db import models
+from django.utils import timezone
 from django.urls import reverse
 
 
@@ -9,6 +10,16 @@ class Status(models.Model):
     message = models.CharField(max_length=120)
     status_id = models.UUIDField(default=uuid.uuid4, editable=False)
     status_time = models.CharField(max_length=40, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    device = models.ForeignKey('gadget_communicator_pull.Device', related_name='statuses', on_delete=models.CASCADE,
+                               null=True)
 
     def get_absolute_url(self):
-        return reverse("gadget_communicator_pull:water-status", kwargs={"id": self.id})
\ No newline at end of file
+        return reverse("gadget_communicator_pull:water-status", kwargs={"id": self.id})
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['execution_status', 'created_at']),
+            models.Index(fields=['device', 'created_at', 'id']),
+        ]
\ No newline at end of file
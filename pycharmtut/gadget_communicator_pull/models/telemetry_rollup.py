@@ -0,0 +1,42 @@
+from django.db import models
+
+from gadget_communicator_pull.constants.water_constants import TELEMETRY_WATER, TELEMETRY_MOISTURE, \
+    TELEMETRY_RESOLUTION_HOUR, TELEMETRY_RESOLUTION_DAY
+from gadget_communicator_pull.models.device_module import Device
+
+TELEMETRY_METRICS = [
+    (TELEMETRY_WATER, 'Water level'),
+    (TELEMETRY_MOISTURE, 'Moisture level'),
+]
+
+TELEMETRY_RESOLUTIONS = [
+    (TELEMETRY_RESOLUTION_HOUR, 'Hourly'),
+    (TELEMETRY_RESOLUTION_DAY, 'Daily'),
+]
+
+
+class TelemetryRollup(models.Model):
+    """Min, average and max of the readings of one device and metric within an hour or a day."""
+    device = models.ForeignKey(Device, related_name='telemetry_rollups', on_delete=models.CASCADE)
+    metric = models.CharField(max_length=20, choices=TELEMETRY_METRICS)
+    resolution = models.CharField(max_length=10, choices=TELEMETRY_RESOLUTIONS)
+    bucket_start = models.DateTimeField()
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    avg_value = models.FloatField()
+    samples = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ['device', 'metric', 'resolution', 'bucket_start']
+
+
+class TelemetryRollupCursor(models.Model):
+    """
+    How far the raw readings of a metric have been rolled up.
+
+    Rows up to last_id are included in the rollups. seen_id is the newest row id of the previous
+    run, rows above it may still belong to transactions that were not committed back then.
+    """
+    metric = models.CharField(max_length=20, choices=TELEMETRY_METRICS, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    seen_id = models.BigIntegerField(default=0)
@@ -0,0 +1,98 @@
+"""
+Content-addressed storage for photos.
+
+Files are named by the SHA-256 of their content and spread over two levels of fan-out
+directories, photos/ab/cd/abcd...<ext>, so no directory grows with the number of photos and
+identical uploads are stored once.
+"""
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+
+CONTENT_ADDRESSED_PREFIX = 'photos'
+CONTENT_ADDRESSED_NAME_RE = re.compile(rf'^{CONTENT_ADDRESSED_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}')
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+def content_addressed_name(digest, name):
+    extension = os.path.splitext(name)[1].lower()
+    return f'{CONTENT_ADDRESSED_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_NAME_RE.match(name or ''))
+
+
+class ContentAddressedMixin:
+    """
+    Storage mixin that ignores the requested name and stores the file under its content hash.
+
+    Saving content that is already stored returns the existing name without writing anything.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        if is_content_addressed(name) and self.exists(name):
+            # an identical file was stored while this one was written, _save keeps that one
+            raise FileExistsError(name)
+        # the final name is only known once the content is hashed in _save
+        return name
+
+    def _save(self, name, content):
+        target = content_addressed_name(content_hash(content), name)
+        if self.exists(target):
+            return target
+        try:
+            return super()._save(target, content)
+        except FileExistsError:
+            return target
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedMixin, FileSystemStorage):
+    pass
+
+
+try:
+    from storages.backends.s3boto3 import S3Boto3Storage
+except ImportError:
+    S3Boto3Storage = None
+
+if S3Boto3Storage is not None:
+    class ContentAddressedS3Storage(ContentAddressedMixin, S3Boto3Storage):
+        """For S3 and S3-compatible servers such as MinIO, configured with the AWS_* settings of django-storages."""
+
+        def __init__(self, **kwargs):
+            kwargs.setdefault('file_overwrite', True)
+            super().__init__(**kwargs)
+
+
+class LocalFile(File):
+    """A file on the local disk that a file system storage may move into place instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def get_photo_storage():
+    return import_string(getattr(settings, 'PHOTO_STORAGE',
+                                 'gadget_communicator_pull.storage.ContentAddressedFileSystemStorage'))()
+
+
+def has_local_path(field_file):
+    try:
+        field_file.path
+    except NotImplementedError:
+        return False
+    return True
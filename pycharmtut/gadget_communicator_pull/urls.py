@@ -7,6 +7,7 @@ from gadget_communicator_pull.views.api.camera.list_photos import ApiListPhotos
 from gadget_communicator_pull.views.api.camera.take_photo_async import ApiTakePhotoAsync
 from gadget_communicator_pull.views.api.camera.test_camera import ApiCreatePhoto
 from gadget_communicator_pull.views.api.device.device_water_chart import ApiDeviceWaterChart
+from gadget_communicator_pull.views.api.device.device_moisture_chart import ApiDeviceMoistureChart
 from gadget_communicator_pull.views.api.plan.create_plan import ApiCreatePlan
 from gadget_communicator_pull.views.api.plan.delete_plan import ApiDeletePlan
 from gadget_communicator_pull.views.api.plan.get_plans_by_device import ApiGetPlansByDeviceId
@@ -17,6 +18,9 @@ from gadget_communicator_pull.views.api.status.delete_status import ApiDeleteSta
 from gadget_communicator_pull.views.api.status.get_status import ApiGetStatus
 from gadget_communicator_pull.views.api.status.list_status import ApiListStatus
 from gadget_communicator_pull.views.devicecom.device_views import *
+from gadget_communicator_pull.views.devicecom.long_poll_views import get_plan_long_poll
+from gadget_communicator_pull.views.devicecom.photo_upload_views import StartPhotoUpload, PhotoUploadChunk, \
+    FinalizePhotoUpload
 from gadget_communicator_pull.views.ui.ui_device_view import *
 from gadget_communicator_pull.views.ui.ui_basic_plan_view import *
 from gadget_communicator_pull.views.ui.ui_moisture_plan_view import *
@@ -45,13 +49,19 @@ urlpatterns = [
 
     path('create_moisture_plan/', AddMoistureTime.as_view(), name='list-moisture-create'),
 
-    path('getPlan/', GetPlan.as_view(), name='get-plan'),
+    path('getPlan/', get_plan_long_poll, name='get-plan'),
     path('postWater', PostWater.as_view(), name='post-water'),
     path('postMoisture', PostMoisture.as_view(), name='post-moisture'),
+    path('postReadings', PostReadings.as_view(), name='post-readings'),
     path('postStatus', PostPlanExecution.as_view(), name='post-execution'),
+    path('postHeartbeat', PostHeartbeat.as_view(), name='post-heartbeat'),
     path('postPhoto', PostPhoto.as_view(), name='post-photo'),
+    path('photoUpload', StartPhotoUpload.as_view(), name='photo-upload-start'),
+    path('photoUpload/<uuid:upload_id>', PhotoUploadChunk.as_view(), name='photo-upload-chunk'),
+    path('photoUpload/<uuid:upload_id>/finalize', FinalizePhotoUpload.as_view(), name='photo-upload-finalize'),
     path('getPhoto', GetPhoto.as_view(), name='get-photo'),
     path('getWaterLevel', GetWaterLevel.as_view(), name='get-water-level'),
+    path('sync', DeviceSync.as_view(), name='device-sync'),
 
     path('api/create_device', ApiCreateDevice.as_view(), name='api_create_device'),
     path('api/list_devices', ApiListDevices.as_view(), name='api_list_devices'),
@@ -59,6 +69,7 @@ urlpatterns = [
     path('api/delete_device/<str:id>', ApiDeleteDevice.as_view(), name='api_delete_device'),
     path('api/get_device/<str:id>', ApiGetDevice.as_view(), name='api_get_device'),
     path('api/list_device_charts/<str:id>', ApiDeviceWaterChart.as_view(), name='api_get_device_charts'),
+    path('api/list_device_moisture/<str:id>', ApiDeviceMoistureChart.as_view(), name='api_get_device_moisture'),
 
     path('api/create_plan', ApiCreatePlan.as_view(), name='api_create_plan'),
     path('api/list_plans', ApiListPlans.as_view(), name='api_list_plans'),
@@ -10,7 +10,10 @@ __all__ = [
     'GetPlan',
     'PostWater',
     'PostMoisture',
+    'PostReadings',
     'PostPlanExecution',
+    'PostHeartbeat',
+    'DeviceSync',
     # ui_device_view
     'AddPlan',
     'ListPlan',
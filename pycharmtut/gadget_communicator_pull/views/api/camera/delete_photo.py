@@ -11,9 +11,8 @@ class ApiDeletePhoto(generics.DestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         id_ = self.kwargs.get("id")
-        print(id_)
         devices = Device.objects.filter(owner=request.user)
-        pictures_for_user = PhotoModule.objects.filter(photos__in=devices)
+        pictures_for_user = PhotoModule.objects.filter(device__in=devices)
         if not pictures_for_user:
             return JsonResponse(status=status.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                             'message': "No such status for user"})
@@ -12,7 +12,7 @@ class ApiGetPhoto(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         id_ = self.kwargs.get("id")
         devices = Device.objects.filter(owner=request.user)
-        pictures_for_user = PhotoModule.objects.filter(photos__in=devices)
+        pictures_for_user = PhotoModule.objects.filter(device__in=devices).select_related('device')
         if not pictures_for_user:
             return JsonResponse(status=status.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                         'message': "No photos for user"})
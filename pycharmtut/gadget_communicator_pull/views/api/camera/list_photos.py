@@ -2,10 +2,15 @@ from django.http import JsonResponse
 from rest_framework import generics, permissions, status
 from rest_framework.generics import get_object_or_404
 
+from gadget_communicator_pull.helpers.pagination import is_paged_query
 from gadget_communicator_pull.models import Device
 from gadget_communicator_pull.models.photo_module import PhotoModule
+from gadget_communicator_pull.views.api.pagination import keyset_page_response
 from gadget_communicator_pull.water_serializers.photo_serializer import PhotoSerializer
 
+# newest first
+PHOTO_ORDERING = ('-pk',)
+
 
 class ApiListPhotos(generics.ListAPIView):
     permission_classes = (permissions.IsAuthenticated,)
@@ -17,7 +22,9 @@ class ApiListPhotos(generics.ListAPIView):
         if device is None:
             return JsonResponse(status=status.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                         'message': "photo not found for user"})
-        photos = PhotoModule.objects.filter(photos=device)
+        photos = PhotoModule.objects.filter(device=device).select_related('device')
+        if is_paged_query(request.GET):
+            return keyset_page_response(request, photos, PHOTO_ORDERING, PhotoSerializer)
         serializer = PhotoSerializer(photos, many=True)
 
         return JsonResponse(serializer.data, safe=False)
@@ -16,8 +16,6 @@ class ApiTakePhotoAsync(generics.ListAPIView):
         if device is None:
             return JsonResponse(status=status.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                         'message': "photo not found for user"})
-        photo = PhotoModule.objects.create(photo_status=PHOTO_CREATED)
-        photo.photos.add(device)
-        photo.save()
+        photo = PhotoModule.objects.create(photo_status=PHOTO_CREATED, device=device)
         return JsonResponse(status=status.HTTP_201_CREATED,
                             data={'status': 'success', 'id': photo.photo_id})
@@ -1,3 +1,5 @@
+import logging
+
 from django.http import JsonResponse
 from rest_framework import generics, status, permissions
 import json
@@ -5,6 +7,8 @@ import json
 from gadget_communicator_pull.models import Device
 from gadget_communicator_pull.water_serializers.device_serializer import DeviceSerializer
 
+logger = logging.getLogger(__name__)
+
 
 class ApiCreateDevice(generics.CreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
@@ -12,7 +16,7 @@ class ApiCreateDevice(generics.CreateAPIView):
     def post(self, request, *args, **kwargs):
         body_unicode = request.body.decode('utf-8')
         body_data = json.loads(body_unicode)
-        print(body_data)
+        logger.debug('create device %s', body_data)
         device_id = body_data['device_id']
         device = Device.objects.filter(device_id=device_id).first()
         if device is not None:
@@ -26,11 +30,10 @@ class ApiCreateDevice(generics.CreateAPIView):
             status_el.owner = request.user
             status_el.save()
         else:
-            print(serializer.errors)
+            logger.info('invalid device %s', serializer.errors)
             return JsonResponse(status=status.HTTP_400_BAD_REQUEST,
                                 data={'status': 'false',
                                       'unsupported_format': 'Form is not valid'})
-        print(type(status_el))
         return JsonResponse(body_data)
 
     def return_bad_response(self, message):
@@ -3,6 +3,7 @@ from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions
 from rest_framework import status
 
+from gadget_communicator_pull.helpers.plan_lookup import prune_plan_index
 from gadget_communicator_pull.models import Device
 
 
@@ -17,4 +18,5 @@ class ApiDeleteDevice(generics.DestroyAPIView):
             return JsonResponse(status=status.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                         'message': "No such device for user"})
         Device.objects.get(device_id=id_).delete()
+        prune_plan_index(owner)
         return JsonResponse(status=status.HTTP_200_OK, data={'status': 'success'})
@@ -0,0 +1,19 @@
+from django.http import JsonResponse
+from rest_framework.generics import get_object_or_404
+
+from gadget_communicator_pull.constants.water_constants import TELEMETRY_MOISTURE
+from gadget_communicator_pull.models import Device
+from gadget_communicator_pull.views.api.device.device_water_chart import ApiDeviceWaterChart
+from rest_framework import status as status_ext
+
+
+class ApiDeviceMoistureChart(ApiDeviceWaterChart):
+    metric = TELEMETRY_MOISTURE
+
+    def get(self, request, *args, **kwargs):
+        id_ = self.kwargs.get("id")
+        device = get_object_or_404(Device, device_id=id_)
+        if device.owner != request.user:
+            return JsonResponse(status=status_ext.HTTP_404_NOT_FOUND, data={'status': 'false',
+                                                                            'message': "No such device for user"})
+        return self.get_range(request, device)
@@ -2,15 +2,18 @@ from django.http import JsonResponse
 from rest_framework import generics, permissions
 from rest_framework.generics import get_object_or_404
 
+from gadget_communicator_pull.constants.water_constants import TELEMETRY_WATER, CHART_PAD_SIZE
 from gadget_communicator_pull.helpers.from_to_json_serializer import to_json_serializer, dump_json
+from gadget_communicator_pull.helpers.telemetry_chart import is_range_query, parse_chart_range, get_chart_points, \
+    pad_latest_readings
 from gadget_communicator_pull.models import Device
 from gadget_communicator_pull.models.device_module import WaterChart
-from gadget_communicator_pull.water_serializers.device_serializer import WaterChartSerializer
 from rest_framework import status as status_ext
 
 
 class ApiDeviceWaterChart(generics.ListAPIView):
     permission_classes = (permissions.IsAuthenticated,)
+    metric = TELEMETRY_WATER
 
     def get(self, request, *args, **kwargs):
         id_ = self.kwargs.get("id")
@@ -19,16 +22,22 @@ class ApiDeviceWaterChart(generics.ListAPIView):
         if device.owner != owner:
             return JsonResponse(status=status_ext.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                             'message': "No such device for user"})
-        count = WaterChart.objects.filter(device_relation=device).count()
-        print(type(count))
-        if count < 10:
-            size_for_add = 10 - count
-            for x in range(size_for_add):
-                water_chart_obj = WaterChart(water_chart=100)
-                water_chart_obj.save()
-                device.water_charts.add(water_chart_obj)
-            device.save()
-        water_charts = WaterChart.objects.filter(device_relation=device).order_by('-id')[:10]
-        water_charts_rev = reversed(water_charts)
-        serializer = WaterChartSerializer(water_charts_rev, many=True)
-        return JsonResponse(serializer.data,  safe=False)
+        if is_range_query(request.GET):
+            return self.get_range(request, device)
+        latest = WaterChart.objects.filter(device_relation=device).order_by('-measured_at', '-pk')
+        values = list(latest.values_list('water_chart', flat=True)[:CHART_PAD_SIZE])
+        values.reverse()
+        return JsonResponse([{'water_chart': value} for value in pad_latest_readings(values)], safe=False)
+
+    def get_range(self, request, device):
+        """
+        GET ?from=<iso>&to=<iso>&resolution=raw|hour|day|auto&points=<n>
+
+        auto picks the cheapest tier for the range, longer series are reduced to points with LTTB.
+        """
+        try:
+            start, end, resolution, max_points = parse_chart_range(request.GET)
+        except ValueError as e:
+            return JsonResponse(status=status_ext.HTTP_400_BAD_REQUEST, data={'status': 'false', 'message': str(e)})
+        points = get_chart_points(device, self.metric, start, end, resolution, max_points)
+        return JsonResponse({'resolution': resolution, 'points': points})
@@ -12,8 +12,6 @@ class ApiGetDevice(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         id_ = self.kwargs.get("id")
         device = get_object_or_404(Device, device_id=id_)
-        print(f'owner {request.user}')
-        print(f'owner1 {device.owner}')
         if device.owner != request.user:
             return JsonResponse(status=status.HTTP_404_NOT_FOUND, data={'status': 'false', 'message': "No such device for user"})
         serializer = DeviceSerializer(device)
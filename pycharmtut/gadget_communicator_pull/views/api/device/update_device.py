@@ -1,4 +1,5 @@
 import json
+import logging
 
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
@@ -7,6 +8,8 @@ from rest_framework import status
 
 from gadget_communicator_pull.models import Device
 
+logger = logging.getLogger(__name__)
+
 
 class ApiUpdateDevice(generics.CreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
@@ -14,14 +17,13 @@ class ApiUpdateDevice(generics.CreateAPIView):
     def post(self, request, *args, **kwargs):
         body_unicode = request.body.decode('utf-8')
         body_data = json.loads(body_unicode)
-        print(body_data)
+        logger.debug('update device %s', body_data)
         device = get_object_or_404(Device, device_id=body_data['device_id'])
         owner = request.user
         if device.owner != owner:
             return JsonResponse(status=status.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                         'message': "No such device for user"})
         for key in body_data:
-            print(type(key))
             if key == 'label':
                 device.label = body_data[key]
                 device.save(update_fields=['label'])
@@ -55,7 +57,6 @@ class ApiUpdateDevice(generics.CreateAPIView):
             elif key == 'device_id':
                 continue
             else:
-                print("in")
                 return JsonResponse(status=status.HTTP_404_NOT_FOUND, data={'status': 'false', 'unsupported_field': key})
         return JsonResponse(body_data)
 
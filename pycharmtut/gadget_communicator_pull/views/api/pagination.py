@@ -0,0 +1,60 @@
+from django.http import JsonResponse
+from rest_framework import status
+
+from gadget_communicator_pull.constants.water_constants import PAGE_RESULTS, PAGE_NEXT
+from gadget_communicator_pull.helpers.pagination import parse_page_params, keyset_page, encode_cursor
+from gadget_communicator_pull.water_serializers.base_plan_serializer import BasePlanSerializer
+from gadget_communicator_pull.water_serializers.moisture_plan_serializer import MoisturePlanSerializer
+from gadget_communicator_pull.water_serializers.time_plan_serializer import TimePlanSerializer
+
+# oldest first, like the unpaged plan lists
+PLAN_ORDERING = ('pk',)
+
+
+def page_error(message):
+    return JsonResponse(status=status.HTTP_400_BAD_REQUEST, data={'status': 'false', 'message': message})
+
+
+def keyset_page_response(request, queryset, ordering, serializer_class):
+    """{"results": [...], "next": <cursor or null>} for ?limit=<n>&cursor=<next of the previous page>"""
+    try:
+        limit, after = parse_page_params(request.GET)
+        rows, last_key = keyset_page(queryset, ordering, after, limit)
+    except ValueError as e:
+        return page_error(str(e))
+    return JsonResponse({
+        PAGE_RESULTS: serializer_class(rows, many=True).data,
+        PAGE_NEXT: encode_cursor(last_key) if last_key is not None else None,
+    })
+
+
+def plan_page_response(request, basic_plans, time_plans, moisture_plans):
+    """
+    Page through the basic, time and moisture plans side by side, limit applies to each kind.
+
+    results keeps the [basic, time, moisture] shape of the unpaged lists. The cursor holds the
+    last key of every kind, an empty key marks a kind that has no more pages.
+    """
+    try:
+        limit, after = parse_page_params(request.GET)
+        after = after or [None, None, None]
+        if not isinstance(after, list) or len(after) != 3:
+            raise ValueError('invalid cursor')
+        results = []
+        next_keys = []
+        for queryset, serializer_class, kind_after in zip(
+                (basic_plans, time_plans, moisture_plans),
+                (BasePlanSerializer, TimePlanSerializer, MoisturePlanSerializer), after):
+            if kind_after == []:
+                results.append([])
+                next_keys.append([])
+                continue
+            rows, last_key = keyset_page(queryset, PLAN_ORDERING, kind_after, limit)
+            results.append(serializer_class(rows, many=True).data)
+            next_keys.append(last_key if last_key is not None else [])
+    except ValueError as e:
+        return page_error(str(e))
+    return JsonResponse({
+        PAGE_RESULTS: results,
+        PAGE_NEXT: encode_cursor(next_keys) if any(next_keys) else None,
+    })
@@ -1,4 +1,7 @@
-from django.http import JsonResponse
+import logging
+
+from django.db import transaction
+from django.http import JsonResponse, HttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions
 from rest_framework import status
@@ -8,28 +11,15 @@ from gadget_communicator_pull.constants.water_constants import PLAN_TYPE, WATER_
     WATER_PLAN_MOISTURE, DEVICE_ID, DEVISES, PLAN_NAME, TIME_PLAN_TIMES, TIME_WEEKDAY, TIME_WATER, EXECUTION_PROPERTY
 from gadget_communicator_pull.helpers.from_to_json_serializer import remove_device_field_from_json
 from gadget_communicator_pull.helpers.helper import WEEKDAYS_NUMERIC
-from gadget_communicator_pull.models import Device, BasicPlan, TimePlan, MoisturePlan, WaterTime
+from gadget_communicator_pull.helpers.plan_lookup import is_plan_name_taken, reserve_plan_name
+from gadget_communicator_pull.helpers.plan_notifier import notify_plan_devices
+from gadget_communicator_pull.models import Device, WaterTime
 
 from gadget_communicator_pull.water_serializers.base_plan_serializer import BasePlanSerializer
 from gadget_communicator_pull.water_serializers.time_plan_serializer import TimePlanSerializer, WaterTimeSerializer
 from gadget_communicator_pull.water_serializers.moisture_plan_serializer import MoisturePlanSerializer
 
-
-def validate_for_duplicate(name, devices):
-    for device in devices:
-        plans_b = device.device_relation_b.all()
-        plans_t = device.device_relation_t.all()
-        plans_m = device.device_relation_m.all()
-        basic_plan = plans_b.filter(name=name).first()
-        time_plan = plans_t.filter(name=name).first()
-        moisture_plan = plans_m.filter(name=name).first()
-        if basic_plan is not None:
-            return True
-        if time_plan is not None:
-            return True
-        if moisture_plan is not None:
-            return True
-    return False
+logger = logging.getLogger(__name__)
 
 
 class ApiCreatePlan(generics.CreateAPIView):
@@ -39,10 +29,9 @@ class ApiCreatePlan(generics.CreateAPIView):
         body_unicode = request.body.decode('utf-8')
         body_data = json.loads(body_unicode)
         name = body_data.get(PLAN_NAME)
-        devices = Device.objects.filter(owner=request.user)
-        print(body_data)
-        if validate_for_duplicate(name=name, devices=devices):
-            return JsonResponse(status=status.HTTP_403_FORBIDDEN, data={'status': 'false', 'duplicate_plan': name})
+        logger.debug('create plan %s', body_data)
+        if is_plan_name_taken(request.user, name):
+            return self.return_duplicate_response(name)
 
         if PLAN_TYPE not in body_data:
             return JsonResponse(status=status.HTTP_404_NOT_FOUND,
@@ -52,6 +41,23 @@ class ApiCreatePlan(generics.CreateAPIView):
             return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                 data={'status': 'false', 'plan_key_not_found': DEVICE_ID})
 
+        with transaction.atomic():
+            # the name is reserved before the plan exists, so a plan losing a race for its name is
+            # never visible to device polls
+            entry = reserve_plan_name(request.user, name, body_data[PLAN_TYPE])
+            if entry is None:
+                return JsonResponse(status=status.HTTP_409_CONFLICT, data={'status': 'false', 'duplicate_plan': name})
+            plan = self.create_plan(request, body_data)
+            if isinstance(plan, HttpResponse):
+                transaction.set_rollback(True)
+                return plan
+            entry.plan_id = plan.pk
+            entry.save(update_fields=['plan_id'])
+            transaction.on_commit(lambda: notify_plan_devices(plan))
+        return JsonResponse(body_data)
+
+    def create_plan(self, request, body_data):
+        """The new plan attached to the devices of the request, or the response refusing it."""
         plan_type = body_data[PLAN_TYPE]
         if WATER_PLAN_BASIC == plan_type:
             body_data_copy = body_data.copy()
@@ -60,7 +66,7 @@ class ApiCreatePlan(generics.CreateAPIView):
             if serializer.is_valid():
                 status_el = serializer.save()
             else:
-                print(serializer.errors)
+                logger.info('invalid plan %s', serializer.errors)
                 return JsonResponse(status=status.HTTP_400_BAD_REQUEST,
                                     data={'status': 'false',
                                           'unsupported_format': 'Form is not valid'})
@@ -69,13 +75,11 @@ class ApiCreatePlan(generics.CreateAPIView):
             for id in range(devices_len):
                 device_obj = get_object_or_404(Device, device_id=body_data[DEVISES][id][DEVICE_ID])
                 if device_obj.owner != request.user:
-                    status_el.delete()
                     return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                         data={'status': 'false', 'message': "No such device for user"})
 
                 value_ = body_data['water_volume']
                 if device_obj.water_container_capacity < value_ or value_ < 10:
-                    status_el.delete()
                     return self.return_bad_response(
                         f'water_volume outside accepted boundaries: '
                         f'{device_obj.water_container_capacity} < {value_} > 10')
@@ -90,7 +94,7 @@ class ApiCreatePlan(generics.CreateAPIView):
             if serializer.is_valid():
                 status_el = serializer.save()
             else:
-                print(serializer.errors)
+                logger.info('invalid plan %s', serializer.errors)
                 return JsonResponse(status=status.HTTP_400_BAD_REQUEST,
                                     data={'status': 'false',
                                           'unsupported_format': 'Form is not valid'})
@@ -99,13 +103,11 @@ class ApiCreatePlan(generics.CreateAPIView):
             for id in range(devices_len):
                 device_obj = get_object_or_404(Device, device_id=body_data[DEVISES][id][DEVICE_ID])
                 if device_obj.owner != request.user:
-                    status_el.delete()
                     return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                         data={'status': 'false', 'message': "No such device for user"})
                 key_ = 'water_volume'
                 value_ = body_data[key_]
                 if device_obj.water_container_capacity < value_ or value_  < 10:
-                    status_el.delete()
                     return self.return_bad_response(
                         f'{key_} outside accepted boundaries: '
                         f'{device_obj.water_container_capacity} < {value_} > 10')
@@ -113,7 +115,6 @@ class ApiCreatePlan(generics.CreateAPIView):
                 key_ = 'moisture_threshold'
                 value_ = body_data[key_]
                 if 100 < value_ or value_ < 0:
-                    status_el.delete()
                     return self.return_bad_response(
                         f'{key_} outside accepted boundaries: '
                         f'100 < {value_} > 10')
@@ -122,7 +123,6 @@ class ApiCreatePlan(generics.CreateAPIView):
                 value_ = body_data[key_]
                 one_day_in_minutes = 1440
                 if one_day_in_minutes < value_ or value_ < 1:
-                    status_el.delete()
                     return self.return_bad_response(
                         f'{key_} outside accepted boundaries: '
                         f'{one_day_in_minutes} < {value_} > 1')
@@ -132,7 +132,6 @@ class ApiCreatePlan(generics.CreateAPIView):
 
         elif WATER_PLAN_TIME == plan_type:
             if 'weekday_times' not in body_data:
-                print("key not in found in json")
                 return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                     data={'status': 'false', 'plan_key_not_found': 'weekday_times'})
 
@@ -151,27 +150,23 @@ class ApiCreatePlan(generics.CreateAPIView):
 
             body_data_copy = body_data.copy()
             json_without_device_field = remove_device_field_from_json(body_data_copy)
-            print(f'[time_plan] json for save: {json_without_device_field}')
             serializer = TimePlanSerializer(data=json_without_device_field)
             if serializer.is_valid():
                 status_el = serializer.save()
             else:
-                print(serializer.errors)
+                logger.info('invalid plan %s', serializer.errors)
                 return JsonResponse(status=status.HTTP_400_BAD_REQUEST,
                                     data={'status': 'false',
                                           'unsupported_format': 'Form is not valid'})
             weekday_times_len = len(body_data[TIME_PLAN_TIMES])
-            print(f'weekday_times {weekday_times_len}')
             for id in range(weekday_times_len):
-                print(json_without_device_field[TIME_PLAN_TIMES][id])
 
                 weekday = json_without_device_field[TIME_PLAN_TIMES][id][TIME_WEEKDAY]
                 time_water = json_without_device_field[TIME_PLAN_TIMES][id][TIME_WATER]
                 if weekday in WEEKDAYS_NUMERIC.keys():
-                    print(f"Key exists {weekday}")
                     weekday_num = WEEKDAYS_NUMERIC[weekday]
                 else:
-                    print(f"Key does not exist {weekday}")
+                    logger.info('unsupported weekday %s', weekday)
                     return JsonResponse(status=status.HTTP_400_BAD_REQUEST,
                                         data={'status': 'false', 'unsupported_weekday_field': weekday})
                 water_time_obj = WaterTime(weekday=weekday_num, time_water=time_water)
@@ -180,16 +175,13 @@ class ApiCreatePlan(generics.CreateAPIView):
             status_el.save()
 
             devices_len = len(body_data[DEVISES])
-            print(f'devices_len {devices_len}')
             for id in range(devices_len):
                 device_obj = get_object_or_404(Device, device_id=body_data[DEVISES][id][DEVICE_ID])
                 if device_obj.owner != request.user:
-                    status_el.delete()
                     return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                         data={'status': 'false', 'message': "No such device for user"})
                 value_ = body_data['water_volume']
                 if device_obj.water_container_capacity < value_ or value_ < 10:
-                    status_el.delete()
                     return self.return_bad_response(
                         f'water_volume outside accepted boundaries: '
                         f'{device_obj.water_container_capacity} < {value_} > 10')
@@ -202,8 +194,10 @@ class ApiCreatePlan(generics.CreateAPIView):
         else:
             return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                 data={'status': 'false', 'unsupported_plan': plan_type})
-        return JsonResponse(body_data)
+        return status_el
 
+    def return_duplicate_response(self, name):
+        return JsonResponse(status=status.HTTP_403_FORBIDDEN, data={'status': 'false', 'duplicate_plan': name})
 
     def return_bad_response(self, message):
         return JsonResponse(status=status.HTTP_400_BAD_REQUEST,
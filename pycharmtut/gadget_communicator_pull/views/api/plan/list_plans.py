@@ -1,7 +1,10 @@
 from django.http import JsonResponse
 from rest_framework import generics, permissions
 
-from gadget_communicator_pull.models import Device, BasicPlan, TimePlan, MoisturePlan
+from gadget_communicator_pull.helpers.pagination import is_paged_query
+from gadget_communicator_pull.helpers.plan_lookup import get_device_plans
+from gadget_communicator_pull.models import Device
+from gadget_communicator_pull.views.api.pagination import plan_page_response
 from gadget_communicator_pull.water_serializers.base_plan_serializer import BasePlanSerializer
 from gadget_communicator_pull.water_serializers.moisture_plan_serializer import MoisturePlanSerializer
 from gadget_communicator_pull.water_serializers.time_plan_serializer import TimePlanSerializer
@@ -12,9 +15,10 @@ class ApiListPlans(generics.ListAPIView):
 
     def get(self, request, *args, **kwargs):
         devices = Device.objects.filter(owner=request.user)
-        basic_plans = BasicPlan.objects.filter(devices_b__in=devices)
-        time_plans = TimePlan.objects.filter(devices_t__in=devices)
-        moisture_plans = MoisturePlan.objects.filter(devices_m__in=devices)
+        basic_plans, time_plans, moisture_plans = get_device_plans(devices)
+
+        if is_paged_query(request.GET):
+            return plan_page_response(request, basic_plans, time_plans, moisture_plans)
 
         basic_plans_json = BasePlanSerializer(basic_plans, many=True)
         time_plans_json = TimePlanSerializer(time_plans, many=True)
@@ -1,4 +1,5 @@
 import json
+import logging
 
 from django.http import JsonResponse
 from rest_framework import generics, permissions
@@ -9,43 +10,11 @@ from gadget_communicator_pull.constants.water_constants import WATER_PLAN_MOISTU
     PLAN_NAME, PLAN_TYPE, PLAN_MOISTURE_CHECK_INTERVAL, PLAN_MOISTURE_WEEKDAY_TIMES, \
     TIME_PLAN_TIMES, TIME_WEEKDAY, TIME_WATER, IS_RUNNING, PLAN_TO_STOP
 from gadget_communicator_pull.helpers.helper import WEEKDAYS_NUMERIC
-from gadget_communicator_pull.models import WaterTime, Device
+from gadget_communicator_pull.helpers.plan_lookup import get_plan_for_name, get_plan_device
+from gadget_communicator_pull.helpers.plan_notifier import notify_plan_devices
+from gadget_communicator_pull.models import WaterTime
 
-
-def get_plan_for_name(name, devices):
-    for device in devices:
-        plans_b = device.device_relation_b.all()
-        plans_t = device.device_relation_t.all()
-        plans_m = device.device_relation_m.all()
-        basic_plan = plans_b.filter(name=name).first()
-        time_plan = plans_t.filter(name=name).first()
-        moisture_plan = plans_m.filter(name=name).first()
-
-        if basic_plan is not None:
-            return basic_plan
-        elif time_plan is not None:
-            return time_plan
-        elif moisture_plan is not None:
-            return moisture_plan
-    return None
-
-
-def get_device_for_name(name, devices):
-    for device in devices:
-        plans_b = device.device_relation_b.all()
-        plans_t = device.device_relation_t.all()
-        plans_m = device.device_relation_m.all()
-        basic_plan = plans_b.filter(name=name).first()
-        time_plan = plans_t.filter(name=name).first()
-        moisture_plan = plans_m.filter(name=name).first()
-
-        if basic_plan is not None:
-            return device
-        elif time_plan is not None:
-            return device
-        elif moisture_plan is not None:
-            return device
-    return None
+logger = logging.getLogger(__name__)
 
 
 def return_bad_response(message):
@@ -63,24 +32,22 @@ class ApiUpdatePlan(generics.CreateAPIView):
             return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                 data={'status': 'false', 'key_not_found': PLAN_NAME})
         body_data = json.loads(body_unicode)
-        print(body_data)
+        logger.debug('update plan %s', body_data)
         name = body_data[PLAN_NAME]
-        devices = Device.objects.filter(owner=request.user)
-        plan = get_plan_for_name(name, devices=devices)
+        plan = get_plan_for_name(request.user, name)
 
         if name == 'default_stop' and body_data[PLAN_TYPE] == DELETE_RUNNING_PLAN and plan is None:
             plan_to_stop = body_data[PLAN_TO_STOP]
-            plan = get_plan_for_name(plan_to_stop, devices=devices)
+            plan = get_plan_for_name(request.user, plan_to_stop)
         if plan is None:
-            print(f'plan {plan}')
+            logger.info('no plan named %s', name)
             return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                 data={'status': 'false', 'unsupported_field1': name})
         if body_data[PLAN_TYPE] == DELETE_RUNNING_PLAN:
             if plan.plan_type == WATER_PLAN_MOISTURE or plan.plan_type == WATER_PLAN_TIME \
                     or plan.plan_type == DELETE_RUNNING_PLAN:
-                print(f"is running {plan.is_running}")
                 if plan.is_running:
-                    print("plan is currently running")
+                    logger.debug('stopping running plan %s', plan.name)
                     plan.is_running = False
                     plan.save(update_fields=[IS_RUNNING])
                     plan.has_been_executed = False
@@ -88,29 +55,25 @@ class ApiUpdatePlan(generics.CreateAPIView):
                     plan.plan_type = DELETE_RUNNING_PLAN
                     plan.save(update_fields=[PLAN_TYPE])
                 else:
-                    print("plan is not currently running")
                     return JsonResponse(status=status.HTTP_403_FORBIDDEN,
                                         data={'status': 'false', 'message': 'plan is not currently running'})
             else:
-                print("basic plan does not have such field")
                 return JsonResponse(status=status.HTTP_403_FORBIDDEN,
                                     data={'status': 'true', 'message': 'basic plan does not have such field'})
-        plan_name = body_data[PLAN_NAME]
-        device_obj = get_device_for_name(plan_name, devices=devices)
+        device_obj = get_plan_device(request.user, plan)
         for key in body_data:
             if key == PLAN_TO_STOP:
-                print("true..")
+                continue
             elif key == PLAN_WATER_VOLUME:
                 key_ = PLAN_WATER_VOLUME
                 value_ = body_data[key_]
-                if device_obj.water_container_capacity < value_ < 10:
+                if device_obj is not None and device_obj.water_container_capacity < value_ < 10:
                     return return_bad_response(
                         f'{key_} outside accepted boundaries: '
                         f'{device_obj.water_container_capacity} < {value_} < 10')
                 plan.water_volume = body_data[key]
                 plan.save(update_fields=[PLAN_WATER_VOLUME])
             elif key == PLAN_MOISTURE_THRESHOLD and plan.plan_type == WATER_PLAN_MOISTURE:
-                print('moist plan')
                 key_ = 'moisture_threshold'
                 value_ = body_data[key_]
                 if 100 < value_ or value_ < 0:
@@ -130,17 +93,15 @@ class ApiUpdatePlan(generics.CreateAPIView):
                 plan.check_interval = body_data[key]
                 plan.save(update_fields=[PLAN_MOISTURE_CHECK_INTERVAL])
             elif key == PLAN_MOISTURE_WEEKDAY_TIMES and plan.plan_type == WATER_PLAN_TIME:
-                print(PLAN_MOISTURE_WEEKDAY_TIMES)
                 water_times_len = len(body_data[PLAN_MOISTURE_WEEKDAY_TIMES])
                 water_times_list = []
                 for id in range(water_times_len):
                     weekday = body_data[TIME_PLAN_TIMES][id][TIME_WEEKDAY]
                     time_water = body_data[TIME_PLAN_TIMES][id][TIME_WATER]
                     if weekday in WEEKDAYS_NUMERIC.keys():
-                        print(f"Key exists {weekday}")
                         weekday_num = WEEKDAYS_NUMERIC[weekday]
                     else:
-                        print(f"Key does not exist {weekday}")
+                        logger.info('unsupported weekday %s', weekday)
                         return JsonResponse(status=status.HTTP_400_BAD_REQUEST,
                                             data={'status': 'false', 'unsupported_weekday_field': weekday})
                     water_time_obj = WaterTime(weekday=weekday_num, time_water=time_water, is_in_use=True)
@@ -167,7 +128,8 @@ class ApiUpdatePlan(generics.CreateAPIView):
             elif key == PLAN_TYPE:
                 continue
             else:
-                print(f'unsupported_field: {key}')
+                logger.info('unsupported plan field %s', key)
                 return JsonResponse(status=status.HTTP_404_NOT_FOUND,
                                     data={'status': 'false', 'unsupported_field': key})
+        notify_plan_devices(plan)
         return JsonResponse(body_data)
@@ -13,7 +13,7 @@ class ApiDeleteStatus(generics.DestroyAPIView):
     def delete(self, request, *args, **kwargs):
         id_ = self.kwargs.get("id")
         devices = Device.objects.filter(owner=request.user)
-        status_for_user = Status.objects.filter(statuses__in=devices)
+        status_for_user = Status.objects.filter(device__in=devices)
         if not status_for_user:
             return JsonResponse(status=status_ext.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                             'message': "No such status for user"})
@@ -25,7 +25,7 @@ class ApiGetStatus(generics.ListAPIView):
             return JsonResponse(status=status_ext.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                         'message': "uuid is not valid"})
         devices = Device.objects.filter(owner=request.user)
-        status_for_user = Status.objects.filter(statuses__in=devices)
+        status_for_user = Status.objects.filter(device__in=devices)
         if not status_for_user:
             return JsonResponse(status=status_ext.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                         'message': "No such status for user"})
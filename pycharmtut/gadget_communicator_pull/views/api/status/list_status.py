@@ -2,10 +2,32 @@ from django.http import JsonResponse
 from rest_framework import generics, permissions
 from rest_framework.generics import get_object_or_404
 
+from gadget_communicator_pull.constants.water_constants import STATUS_SINCE, STATUS_UNTIL, STATUS_EXECUTION
+from gadget_communicator_pull.helpers.pagination import is_paged_query
+from gadget_communicator_pull.helpers.telemetry_chart import parse_moment
 from gadget_communicator_pull.models import Device, Status
+from gadget_communicator_pull.views.api.pagination import keyset_page_response
 from gadget_communicator_pull.water_serializers.status_serializer import StatusSerializer
 from rest_framework import status as status_ext
 
+# newest first
+STATUS_ORDERING = ('-created_at', '-pk')
+STATUS_FLAGS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+def filter_statuses(statuses, query_params):
+    """Apply ?since=<iso>&until=<iso>&execution_status=true|false, raises ValueError on bad input."""
+    if query_params.get(STATUS_SINCE):
+        statuses = statuses.filter(created_at__gte=parse_moment(query_params[STATUS_SINCE]))
+    if query_params.get(STATUS_UNTIL):
+        statuses = statuses.filter(created_at__lt=parse_moment(query_params[STATUS_UNTIL]))
+    if query_params.get(STATUS_EXECUTION):
+        execution_status = STATUS_FLAGS.get(query_params[STATUS_EXECUTION].lower())
+        if execution_status is None:
+            raise ValueError(f'{STATUS_EXECUTION} must be true or false')
+        statuses = statuses.filter(execution_status=execution_status)
+    return statuses
+
 
 class ApiListStatus(generics.ListAPIView):
     permission_classes = (permissions.IsAuthenticated,)
@@ -18,6 +40,11 @@ class ApiListStatus(generics.ListAPIView):
             return JsonResponse(status=status_ext.HTTP_404_NOT_FOUND, data={'status': 'false',
                                                                             'message': "No such device for user"})
 
-        status = Status.objects.filter(statuses=device)
+        try:
+            status = filter_statuses(Status.objects.filter(device=device), request.GET)
+        except ValueError as e:
+            return JsonResponse(status=status_ext.HTTP_400_BAD_REQUEST, data={'status': 'false', 'message': str(e)})
+        if is_paged_query(request.GET):
+            return keyset_page_response(request, status, STATUS_ORDERING, StatusSerializer)
         serializer = StatusSerializer(status, many=True)
         return JsonResponse(serializer.data, safe=False)
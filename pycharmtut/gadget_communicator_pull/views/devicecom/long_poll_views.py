@@ -0,0 +1,58 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse
+from rest_framework import status
+
+from gadget_communicator_pull.constants.water_constants import LONG_POLL_WAIT, LONG_POLL_MAX_WAIT
+from gadget_communicator_pull.helpers.device_poll import claim_next_plan
+from gadget_communicator_pull.helpers.plan_notifier import plan_notifier
+from gadget_communicator_pull.models import Device
+from gadget_communicator_pull.views.devicecom.device_views import GetPlan
+from gadget_communicator_pull.water_serializers.constants.water_constants import DEVICE
+
+get_plan_view = GetPlan.as_view()
+
+
+def get_wait_seconds(query_params):
+    try:
+        wait = int(query_params.get(LONG_POLL_WAIT, 0))
+    except ValueError:
+        return 0
+    return max(0, min(wait, LONG_POLL_MAX_WAIT))
+
+
+async def get_plan_long_poll(request, *args, **kwargs):
+    """
+    GET getPlan/?device=<guid>&wait=<seconds>
+
+    Without wait, or when not served through ASGI, this is the plain GetPlan poll. With wait the
+    request stays parked until ApiCreatePlan/ApiUpdatePlan touch a plan of the device or the
+    timeout ends, so an idle device costs one lookup per wait period.
+
+    Plans saved in another process only wake the request when PLAN_NOTIFIER_DIR is set, see
+    PlanNotifier. Without it the project must run as a single ASGI process that also serves the
+    plan API, or the device waits out the whole wait period.
+    """
+    wait = get_wait_seconds(request.GET)
+    if wait == 0 or not isinstance(request, ASGIRequest):
+        return await sync_to_async(get_plan_view)(request, *args, **kwargs)
+
+    device_guid = request.GET.get(DEVICE)
+    if device_guid is None:
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    device = await sync_to_async(Device.objects.filter(device_id=device_guid).first)()
+    if device is None:
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+
+    # subscribe before looking for a plan so a plan created in between still wakes us up
+    waiter = plan_notifier.subscribe(device.device_id)
+    try:
+        plan_json = await sync_to_async(claim_next_plan)(device)
+        if plan_json is None and await waiter.wait(wait):
+            plan_json = await sync_to_async(claim_next_plan)(device)
+    finally:
+        plan_notifier.unsubscribe(device.device_id, waiter)
+
+    if plan_json is None:
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+    return JsonResponse(plan_json, safe=False)
@@ -0,0 +1,126 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse, HttpResponse
+from rest_framework import generics, permissions, status
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_UPLOAD_MAX_SIZE, PHOTO_UPLOAD_OFFSET, \
+    PHOTO_UPLOAD_SIZE, PHOTO_UPLOAD_ID, PHOTO_READY
+from gadget_communicator_pull.constants.water_constants import DEVICE_ID, PHOTO_ID
+from gadget_communicator_pull.helpers.photo_upload import start_upload, append_chunk, finalize_upload
+from gadget_communicator_pull.models import PhotoUpload
+from gadget_communicator_pull.models.photo_module import PhotoModule
+from authentication.notifications import notify_device_owner, NOTIFY_PHOTO
+
+UPLOAD_FILENAME = 'filename'
+
+
+def get_upload_max_size():
+    return getattr(settings, 'PHOTO_UPLOAD_MAX_SIZE', PHOTO_UPLOAD_MAX_SIZE)
+
+
+class UploadObjectMixin(object):
+    def get_upload(self):
+        return PhotoUpload.objects.select_related('photo__device__owner').filter(upload_id=self.kwargs.get('upload_id')).first()
+
+    def upload_state(self, upload, status_code=status.HTTP_200_OK):
+        return JsonResponse(status=status_code, data={PHOTO_UPLOAD_ID: upload.upload_id,
+                                                      PHOTO_UPLOAD_OFFSET: upload.offset,
+                                                      PHOTO_UPLOAD_SIZE: upload.size})
+
+
+class StartPhotoUpload(generics.CreateAPIView, UploadObjectMixin):
+    """
+    POST photoUpload  {"device_id", "photo_id", "size", "filename"}
+
+    Opens a resumable upload for a photo requested from the device. Posting the same photo,
+    size and filename again returns the unfinished session with its offset.
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    def post(self, request, *args, **kwargs):
+        body_data = json.loads(request.body.decode('utf-8'))
+        try:
+            photo = PhotoModule.objects.filter(photo_id=body_data.get(PHOTO_ID),
+                                               device__device_id=body_data.get(DEVICE_ID)).first()
+        except ValidationError:
+            photo = None
+        if photo is None:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+        size = body_data.get(PHOTO_UPLOAD_SIZE)
+        if not isinstance(size, int) or size <= 0:
+            return JsonResponse(status=status.HTTP_400_BAD_REQUEST,
+                                data={'status': 'false', 'message': 'size must be a positive integer'})
+        if size > get_upload_max_size():
+            return JsonResponse(status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                data={'status': 'false', 'message': f'at most {get_upload_max_size()} bytes'})
+
+        filename = body_data.get(UPLOAD_FILENAME) or f'{photo.photo_id}.jpg'
+        upload = start_upload(photo, filename, size)
+        return self.upload_state(upload, status.HTTP_201_CREATED)
+
+
+class PhotoUploadChunk(generics.GenericAPIView, UploadObjectMixin):
+    """
+    PUT photoUpload/<upload_id>?offset=<n>  raw bytes of the next chunk
+    GET photoUpload/<upload_id>  current offset, to resume after a broken connection
+
+    A chunk must start at the current offset, otherwise 409 tells the device where to continue.
+    The chunk is written to disk as it arrives.
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request, *args, **kwargs):
+        upload = self.get_upload()
+        if upload is None:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        return self.upload_state(upload)
+
+    def put(self, request, *args, **kwargs):
+        upload = self.get_upload()
+        if upload is None:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.query_params.get(PHOTO_UPLOAD_OFFSET, ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+        if offset != upload.offset:
+            return self.upload_state(upload, status.HTTP_409_CONFLICT)
+        if offset + length > upload.size:
+            return self.upload_state(upload, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        if append_chunk(upload, request.stream, length) is None:
+            upload.refresh_from_db()
+            return self.upload_state(upload, status.HTTP_409_CONFLICT)
+        return self.upload_state(upload)
+
+
+class FinalizePhotoUpload(generics.CreateAPIView, UploadObjectMixin):
+    """
+    POST photoUpload/<upload_id>/finalize
+
+    Moves the complete file into place and flips the photo to Ready.
+    """
+    permission_classes = (permissions.AllowAny,)
+
+    def post(self, request, *args, **kwargs):
+        upload = self.get_upload()
+        if upload is None:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        if upload.offset != upload.size:
+            return self.upload_state(upload, status.HTTP_409_CONFLICT)
+
+        photo = finalize_upload(upload)
+        if photo is None:
+            # a retried finalize whose first attempt went through
+            upload.photo.refresh_from_db()
+            if upload.photo.photo_status != PHOTO_READY:
+                return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+            return JsonResponse(status=status.HTTP_200_OK, data={'status': 'success', PHOTO_ID: upload.photo.photo_id})
+        if photo.device is not None:
+            notify_device_owner(photo.device, NOTIFY_PHOTO, f'Photo with id: {photo.photo_id}',
+                                'Photo taken successfully')
+        return JsonResponse(status=status.HTTP_200_OK, data={'status': 'success', PHOTO_ID: photo.photo_id})
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotFound
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from gadget_communicator_pull.helpers.metrics import render_metrics
+
+DEFAULT_METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+
+def is_scraper(request):
+    """A request from an address in METRICS_ALLOWED_IPS or carrying the METRICS_TOKEN bearer token."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and constant_time_compare(credentials.strip(), token):
+            return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', DEFAULT_METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request):
+    """
+    GET /metrics
+
+    Prometheus text exposition of the request latency histograms, device gauges and email
+    counters. It needs no login but answers only the scraper, see is_scraper; anyone else gets
+    a 404 so the endpoint is not advertised.
+    """
+    if not is_scraper(request):
+        return HttpResponseNotFound()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from gadget_communicator_pull.forms.device_form import DeviceForm
+from gadget_communicator_pull.helpers.plan_lookup import prune_plan_index
 from gadget_communicator_pull.models.device_module import Device
 
 
@@ -82,6 +83,8 @@ class DeviceDeleteView(DeviceMixin, View):
         obj = self.get_object()
         if obj is not None:
             obj.delete()
+            if obj.owner is not None:
+                prune_plan_index(obj.owner)
             context['object'] = None
             return redirect('/gadget_communicator_pull/list')
         return render(request, self.template_name, context)
@@ -12,6 +12,7 @@ from .plans_serializer import PlansSerializer
 from .status_serializer import StatusSerializer
 from .photo_serializer import PhotoSerializer, DeviceSerializerForId
 from .health_check import HealthCheckSerializer
+from .telemetry_serializer import TelemetryReadingSerializer
 
 __all__ = [
     'BasePlanSerializer',
@@ -25,4 +26,5 @@ __all__ = [
     'PhotoSerializer',
     'DeviceSerializerForId',
     'HealthCheckSerializer',
+    'TelemetryReadingSerializer',
 ]
@@ -1,5 +1,8 @@
+from django.urls import reverse
 from rest_framework import serializers
 
+from gadget_communicator_pull.constants.photo_constants import PHOTO_VARIANT, PHOTO_VARIANT_THUMBNAIL, \
+    PHOTO_VARIANT_MEDIUM
 from gadget_communicator_pull.models import Device
 from gadget_communicator_pull.models.photo_module import PhotoModule
 
@@ -11,8 +14,29 @@ class DeviceSerializerForId(serializers.ModelSerializer):
 
 
 class PhotoSerializer(serializers.ModelSerializer):
-    devices = DeviceSerializerForId(many=True, read_only=True, source='photos')
+    devices = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    medium_url = serializers.SerializerMethodField()
 
     class Meta:
         model = PhotoModule
-        fields = ['photo_id', 'photo_status', 'devices']
+        fields = ['photo_id', 'photo_status', 'devices', 'thumbnail_url', 'medium_url']
+
+    def get_devices(self, photo):
+        # a photo belongs to one device, the list keeps the shape clients already parse
+        if photo.device is None:
+            return []
+        return DeviceSerializerForId([photo.device], many=True).data
+
+    def get_thumbnail_url(self, photo):
+        return self.get_variant_url(photo, PHOTO_VARIANT_THUMBNAIL)
+
+    def get_medium_url(self, photo):
+        return self.get_variant_url(photo, PHOTO_VARIANT_MEDIUM)
+
+    def get_variant_url(self, photo, variant):
+        """Download URL of a rendered variant, None until it exists."""
+        if not getattr(photo, variant):
+            return None
+        url = reverse('gadget_communicator_pull:api_download_photo_id', kwargs={'id': photo.photo_id})
+        return f'{url}?{PHOTO_VARIANT}={variant}'
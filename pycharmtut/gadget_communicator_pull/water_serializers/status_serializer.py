@@ -6,7 +6,8 @@ from gadget_communicator_pull.models import Status
 class StatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Status
-        fields = ['status_id', 'execution_status', 'message', 'status_time']
+        fields = ['status_id', 'execution_status', 'message', 'status_time', 'created_at']
+        read_only_fields = ['created_at']
 
     def create(self, validated_data):
         status_t = Status.objects.create(**validated_data)
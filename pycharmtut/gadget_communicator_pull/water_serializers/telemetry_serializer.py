@@ -0,0 +1,17 @@
+from django.utils import timezone
+from rest_framework import serializers
+
+from gadget_communicator_pull.constants.water_constants import TELEMETRY_WATER, TELEMETRY_MOISTURE
+
+
+class TelemetryReadingSerializer(serializers.Serializer):
+    """A single water or moisture reading, validated as part of a postReadings batch."""
+    device = serializers.CharField(max_length=50)
+    kind = serializers.ChoiceField(choices=[TELEMETRY_WATER, TELEMETRY_MOISTURE])
+    value = serializers.IntegerField()
+    measured_at = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        attrs.setdefault('measured_at', timezone.now())
+        return attrs
+
@@ -0,0 +1,26 @@
+"""
+gunicorn settings, read from the working directory: cd pycharmtut && gunicorn pycharmtut.wsgi
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker leaves metric files behind. The live gauges
+of a worker that exited have to be marked dead, or /metrics keeps adding them up. With
+PLAN_NOTIFIER_DIR set, the plan notification socket of a killed worker is removed as well.
+"""
+import glob
+import os
+
+MULTIPROCESS_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+PLAN_NOTIFIER_DIR_ENV = 'PLAN_NOTIFIER_DIR'
+
+
+def child_exit(server, worker):
+    if os.environ.get(MULTIPROCESS_DIR_ENV):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+    if os.environ.get(PLAN_NOTIFIER_DIR_ENV):
+        # named <pid>-<random>.sock by PlanNotifier.listen, Django is not loaded in the master
+        for path in glob.glob(os.path.join(os.environ[PLAN_NOTIFIER_DIR_ENV], f'{worker.pid}-*.sock')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
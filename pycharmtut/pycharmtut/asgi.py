@@ -3,12 +3,20 @@ ASGI config for pycharmtut project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Long-polling device requests (``getPlan/?wait=<seconds>``) are only parked when the
+project is served through this entry point, under WSGI they fall back to a plain poll.
+A parked poll is woken by plans saved in its own process. With several workers, or plans
+saved by WSGI workers or management commands, set PLAN_NOTIFIER_DIR so every process is
+reached; without it those polls only end when their wait period is over.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 """
 
 import os
+from dotenv import load_dotenv
 
+load_dotenv()
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pycharmtut.settings')
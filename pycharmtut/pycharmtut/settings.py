@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'gadget_communicator_pull.middleware.RequestContextMiddleware',
+    'gadget_communicator_pull.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -230,3 +232,124 @@ CORS_ALLOWED_ORIGINS = [
     'https://wmeautomation.de:444',
     'http://wmeautomation.de',
 ]
+
+# Water and moisture levels reported by devices are buffered in memory and written in bulk every
+# DEVICE_LEVEL_FLUSH_INTERVAL seconds, or as soon as DEVICE_LEVEL_FLUSH_SIZE devices are pending.
+# The interval bounds how many seconds of levels a crash can lose, 0 writes every level through.
+DEVICE_LEVEL_FLUSH_INTERVAL = 5
+DEVICE_LEVEL_FLUSH_SIZE = 500
+
+# Emails are queued in the authentication EmailOutbox table and delivered by
+# `python manage.py send_outbox_emails`. Without EMAIL_HOST_USER/EMAIL_HOST_PASSWORD the
+# USERNAME/PASSWORD entries of secret.env are used.
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 465))
+EMAIL_USE_SSL = os.environ.get('EMAIL_USE_SSL', 'True') == 'True'
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
+
+# Long polls of getPlan/?wait= are parked in the ASGI process serving them. A plan saved in another
+# process only wakes them when PLAN_NOTIFIER_DIR names a directory shared by all workers of the host
+# (keep the path short, it holds unix sockets). Leave it unset only when a single ASGI process serves
+# the devices and creates the plans, otherwise those polls wait out their whole wait period.
+PLAN_NOTIFIER_DIR = os.environ.get('PLAN_NOTIFIER_DIR') or None
+
+# Device notifications are collected per user and sent as one digest once the oldest of them is
+# NOTIFICATION_DIGEST_WINDOW seconds old. NOTIFICATION_RATE_LIMITS sends at most one email of a kind
+# per device in the given seconds and collapses the events in between into the latest state, e.g. a
+# flapping connection is reported once an hour with whether the device is up or down at the end.
+NOTIFICATION_DIGEST_WINDOW = 300
+NOTIFICATION_RATE_LIMITS = {
+    'connectivity': 3600,
+}
+
+# Photo downloads are streamed by Django unless the front proxy serves them. Set the header to
+# 'X-Accel-Redirect' (nginx, files exposed under the internal PHOTO_SENDFILE_ROOT location that
+# aliases MEDIA_ROOT) or 'X-Sendfile' (Apache/lighttpd, absolute paths).
+PHOTO_SENDFILE_HEADER = None
+PHOTO_SENDFILE_ROOT = '/protected-media/'
+
+# Largest photo a device may send through the chunked photoUpload endpoints, in bytes
+PHOTO_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+# Seconds after which expire_photo_uploads deletes an upload that was never finalized
+PHOTO_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Processes rendering photo thumbnails and medium-size WebP copies, 0 renders inside the request
+PHOTO_DERIVATIVE_WORKERS = 2
+
+# Storage class of photo files. Photos are stored under the SHA-256 of their content in
+# photos/ab/cd/ directories; 'gadget_communicator_pull.storage.ContentAddressedS3Storage' keeps
+# them in S3 or MinIO (django-storages, AWS_* settings). `python manage.py relocate_photos` moves
+# photos stored before the switch into this layout.
+PHOTO_STORAGE = 'gadget_communicator_pull.storage.ContentAddressedFileSystemStorage'
+
+# Raw water and moisture readings are deleted by rollup_telemetry once they are older than
+# TELEMETRY_RAW_RETENTION_DAYS and rolled up, hourly rollups after TELEMETRY_HOURLY_RETENTION_DAYS.
+# Daily rollups are kept. None keeps the rows forever.
+TELEMETRY_RAW_RETENTION_DAYS = 90
+TELEMETRY_HOURLY_RETENTION_DAYS = 730
+
+# RequestMetricsMiddleware measures the queries, database time, view time and response size of each
+# request. REQUEST_METRICS_SERVER_TIMING returns them in a Server-Timing header (keep it off in
+# production), REQUEST_METRICS_SAMPLE_RATE is the share of requests logged as one JSON line each and
+# every REQUEST_METRICS_SUMMARY_INTERVAL seconds the per-endpoint averages are logged, None disables.
+REQUEST_METRICS_SERVER_TIMING = DEBUG
+REQUEST_METRICS_SAMPLE_RATE = 0.0 if DEBUG else 0.05
+REQUEST_METRICS_SUMMARY_INTERVAL = 60
+
+# /metrics answers requests from METRICS_ALLOWED_IPS (the address of the last hop, so the proxy's
+# when there is one) and requests sending "Authorization: Bearer <METRICS_TOKEN>", others get a 404.
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Application logs are written as JSON lines by a background thread, a request only queues its
+# records and drops them when LOG_QUEUE_SIZE records are waiting. Every record carries the id of
+# its request (X-Request-ID) and of the device served. Debug lines are limited per call site to
+# LOG_DEBUG_BURST per LOG_DEBUG_INTERVAL seconds.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO')
+LOG_QUEUE_SIZE = 10000
+LOG_DEBUG_BURST = 10
+LOG_DEBUG_INTERVAL = 60
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'correlation': {
+            '()': 'gadget_communicator_pull.helpers.structured_logging.CorrelationFilter',
+        },
+        'debug_rate_limit': {
+            '()': 'gadget_communicator_pull.helpers.structured_logging.DebugRateLimitFilter',
+            'burst': LOG_DEBUG_BURST,
+            'interval': LOG_DEBUG_INTERVAL,
+        },
+    },
+    'formatters': {
+        'json': {
+            '()': 'gadget_communicator_pull.helpers.structured_logging.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'async_json': {
+            'class': 'gadget_communicator_pull.helpers.structured_logging.AsyncQueueHandler',
+            'stream': 'ext://sys.stdout',
+            'maxsize': LOG_QUEUE_SIZE,
+            'formatter': 'json',
+            'filters': ['correlation', 'debug_rate_limit'],
+        },
+    },
+    'loggers': {
+        'gadget_communicator_pull': {
+            'handlers': ['async_json'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'authentication': {
+            'handlers': ['async_json'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
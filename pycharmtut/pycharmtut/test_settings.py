@@ -62,10 +62,18 @@ TEMPLATES = [
 WSGI_APPLICATION = 'pycharmtut.wsgi.application'
 
 # Database - Use SQLite for testing
+# The test database is a file rather than in-memory, so threads of concurrency tests get their
+# own connections and wait for each other's writes instead of failing with a locked table.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'test_db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'NAME': BASE_DIR / 'test_run_db.sqlite3',
+        },
     }
 }
 
@@ -174,5 +182,11 @@ PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
 ]
 
+# Write device levels through so tests see them immediately
+DEVICE_LEVEL_FLUSH_INTERVAL = 0
+
+# Render photo variants inline so tests see them immediately
+PHOTO_DERIVATIVE_WORKERS = 0
+
 # Enable migrations for proper database setup
 # MIGRATION_MODULES = {}
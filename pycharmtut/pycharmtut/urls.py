@@ -18,12 +18,14 @@ from django.urls import path, include, re_path
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 from gadget_communicator_pull import views as v
+from gadget_communicator_pull.views.monitoring.metrics_view import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api-token-auth/', TokenObtainPairView.as_view(), name='create-token'),
     path('api/', include('authentication.urls')),
     path('gadget_communicator_pull/', include('gadget_communicator_pull.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 
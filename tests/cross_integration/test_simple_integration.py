@@ -229,15 +229,13 @@ class TestModelIntegration(TestCase):
         """Test device and status relationship."""
         status = Status.objects.create(
             message='Test status message',
-            execution_status=True
+            execution_status=True,
+            device=self.device
         )
         
-        # Test the relationship
-        self.device.status_relation.add(status)
-        
         # Check if the relationship works
-        self.assertIn(status, self.device.status_relation.all())
-        self.assertIn(self.device, status.statuses.all())
+        self.assertIn(status, self.device.statuses.all())
+        self.assertEqual(status.device, self.device)
 
     def test_water_chart_relationship(self):
         """Test water chart and device relationship."""
@@ -0,0 +1,498 @@
+"""
+Unit tests for the endpoints polled by WaterPlantOperator devices.
+"""
+import asyncio
+import datetime
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.core.handlers.asgi import ASGIHandler
+from django.test import TestCase, TransactionTestCase, AsyncClient, Client, modify_settings, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_CREATED, PHOTO_RUNNING
+from gadget_communicator_pull.constants.water_constants import SYNC_NEXT_POLL_BUSY, SYNC_NEXT_POLL_IDLE, \
+    TELEMETRY_MAX_BATCH
+from gadget_communicator_pull.helpers.device_poll import claim_plan
+from gadget_communicator_pull.helpers.plan_notifier import PlanNotifier, notify_plan_devices, plan_notifier
+from gadget_communicator_pull.middleware import RequestContextMiddleware
+from gadget_communicator_pull.models import Device, BasicPlan, MoisturePlan, TimePlan, WaterChart
+from gadget_communicator_pull.models.photo_module import PhotoModule
+
+CONTEXT_MIDDLEWARE = 'gadget_communicator_pull.middleware.RequestContextMiddleware'
+METRICS_MIDDLEWARE = 'gadget_communicator_pull.middleware.RequestMetricsMiddleware'
+
+
+class TestDeviceSync(TestCase):
+    """Test cases for the single round-trip sync endpoint."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device',
+            owner=self.user,
+            water_container_capacity=1500
+        )
+        self.url = reverse('gadget_communicator_pull:device-sync')
+
+    def test_sync_unknown_device(self):
+        """Test that unknown devices are rejected."""
+        response = self.client.get(self.url, {'device': 'UNKNOWN'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_sync_returns_all_pending_work(self):
+        """Test that plan, photo and water reset are handed out in one response."""
+        plan = BasicPlan.objects.create(name='Sync Plan', plan_type='basic', water_volume=100)
+        self.device.device_relation_b.add(plan)
+        photo = PhotoModule.objects.create(photo_status=PHOTO_CREATED, device=self.device)
+        self.device.water_reset = True
+        self.device.save()
+
+        response = self.client.get(self.url, {'device': self.device.device_id})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['plan']['name'], 'Sync Plan')
+        self.assertNotIn('has_been_executed', data['plan'])
+        self.assertEqual(data['photo']['photo_id'], str(photo.photo_id))
+        self.assertEqual(data['water'], 1500)
+        self.assertEqual(data['next_poll'], SYNC_NEXT_POLL_BUSY)
+
+        plan.refresh_from_db()
+        photo.refresh_from_db()
+        self.device.refresh_from_db()
+        self.assertTrue(plan.has_been_executed)
+        self.assertEqual(photo.photo_status, PHOTO_RUNNING)
+        self.assertFalse(self.device.water_reset)
+
+    def test_sync_idle_device(self):
+        """Test that an idle poll returns nothing and costs a fixed number of queries."""
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {'device': self.device.device_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'plan': None,
+            'photo': None,
+            'water': None,
+            'next_poll': SYNC_NEXT_POLL_IDLE,
+        })
+
+
+class TestGetPlanLongPoll(TestCase):
+    """Test cases for the long-polling variant of getPlan."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device'
+        )
+        self.url = reverse('gadget_communicator_pull:get-plan')
+        self.async_client = AsyncClient()
+
+    def create_plan(self):
+        plan = BasicPlan.objects.create(name='Long Poll Plan', plan_type='basic', water_volume=100)
+        self.device.device_relation_b.add(plan)
+        notify_plan_devices(plan)
+
+    def test_plain_poll_without_wait(self):
+        """Test that getPlan without wait keeps answering immediately."""
+        response = self.client.get(self.url, {'device': self.device.device_id})
+        self.assertEqual(response.status_code, 204)
+
+    async def test_long_poll_times_out(self):
+        """Test that an idle long poll ends with 204 after the wait period."""
+        started = time.monotonic()
+        response = await self.async_client.get(f'{self.url}?device={self.device.device_id}&wait=1')
+        self.assertEqual(response.status_code, 204)
+        self.assertGreaterEqual(time.monotonic() - started, 1)
+
+    async def test_long_poll_wakes_up_on_new_plan(self):
+        """Test that a parked poll returns as soon as a plan is created for the device."""
+        request = asyncio.ensure_future(
+            self.async_client.get(f'{self.url}?device={self.device.device_id}&wait=30'))
+        await asyncio.sleep(0.2)
+        self.assertFalse(request.done())
+
+        started = time.monotonic()
+        await sync_to_async(self.create_plan)()
+        response = await asyncio.wait_for(request, 5)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Long Poll Plan')
+
+
+class TestPlanNotifierFanOut(TestCase):
+    """Test cases for waking long polls parked in another process."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.fan_out_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.fan_out_dir, ignore_errors=True)
+        self.device = Device.objects.create(device_id='TEST_DEVICE_001', label='Test Device')
+        self.url = reverse('gadget_communicator_pull:get-plan')
+        self.async_client = AsyncClient()
+
+    def notify_from_other_process(self, device_guid):
+        script = ('import django; django.setup()\n'
+                  'from gadget_communicator_pull.helpers.plan_notifier import PlanNotifier\n'
+                  f'PlanNotifier({self.fan_out_dir!r}).notify([{device_guid!r}])\n')
+        subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, check=True,
+                       env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'pycharmtut.test_settings'})
+
+    async def test_only_devices_notified_are_woken(self):
+        """Test the device ids reach the waiters of another notifier through its socket."""
+        listener, sender = PlanNotifier(self.fan_out_dir), PlanNotifier(self.fan_out_dir)
+        self.addCleanup(listener.close)
+        waiter = listener.subscribe('TEST_DEVICE_001')
+        other = listener.subscribe('TEST_DEVICE_002')
+
+        sender.notify(['TEST_DEVICE_001'])
+
+        self.assertTrue(await waiter.wait(5))
+        self.assertFalse(await other.wait(0.2))
+
+    def test_stale_socket_removed(self):
+        """Test the socket left behind by a dead process is removed instead of failing the notify."""
+        stale_path = os.path.join(self.fan_out_dir, '999999-deadbeef.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(stale_path)
+        stale.close()
+
+        PlanNotifier(self.fan_out_dir).notify(['TEST_DEVICE_001'])
+
+        self.assertEqual(os.listdir(self.fan_out_dir), [])
+
+    async def test_plan_saved_by_other_process_wakes_long_poll(self):
+        """Test a parked poll returns as soon as another process reports a plan for the device."""
+        with mock.patch.object(plan_notifier, 'fan_out_dir', self.fan_out_dir):
+            self.addCleanup(plan_notifier.close)
+            request = asyncio.ensure_future(
+                self.async_client.get(f'{self.url}?device={self.device.device_id}&wait=30'))
+            await asyncio.sleep(0.2)
+            self.assertFalse(request.done())
+            self.assertEqual(len(os.listdir(self.fan_out_dir)), 1)
+
+            plan = await sync_to_async(BasicPlan.objects.create)(name='Other Worker Plan', plan_type='basic',
+                                                                 water_volume=100)
+            await sync_to_async(self.device.device_relation_b.add)(plan)
+            started = time.monotonic()
+            await sync_to_async(self.notify_from_other_process)(self.device.device_id)
+            response = await asyncio.wait_for(request, 10)
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Other Worker Plan')
+
+
+@modify_settings(MIDDLEWARE={'prepend': [CONTEXT_MIDDLEWARE, METRICS_MIDDLEWARE]})
+@override_settings(REQUEST_METRICS_SERVER_TIMING=True, REQUEST_METRICS_SUMMARY_INTERVAL=None)
+class TestGetPlanLongPollMiddleware(TestCase):
+    """Test the long poll stays on the event loop behind the request context and metrics middleware."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device'
+        )
+        self.url = reverse('gadget_communicator_pull:get-plan')
+        self.async_client = AsyncClient()
+
+    def test_middleware_chain_stays_async(self):
+        """Test the ASGI handler calls the middleware directly instead of through a thread."""
+        handler = ASGIHandler()
+
+        # the chain is wrapped by convert_exception_to_response, a sync middleware would be adapted first
+        self.assertTrue(asyncio.iscoroutinefunction(handler._middleware_chain))
+        self.assertIsInstance(handler._middleware_chain.__wrapped__, RequestContextMiddleware)
+
+    async def test_long_poll_parks_on_event_loop(self):
+        """Test the parked poll waits on the thread of the event loop and is still measured."""
+        subscribed_from = []
+        subscribe = plan_notifier.subscribe
+
+        def record_thread(device_guid):
+            subscribed_from.append(threading.get_ident())
+            return subscribe(device_guid)
+
+        with mock.patch.object(plan_notifier, 'subscribe', record_thread):
+            response = await self.async_client.get(f'{self.url}?device={self.device.device_id}&wait=1')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(subscribed_from, [threading.get_ident()])
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{16}$')
+        # the device lookup and the plan claims ran on worker threads and are still counted
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+
+class TestGetPlanClaim(TestCase):
+    """Test cases for plan claiming in getPlan."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device'
+        )
+        self.url = reverse('gadget_communicator_pull:get-plan')
+
+    def poll(self):
+        return self.client.get(self.url, {'device': self.device.device_id})
+
+    def test_claim_marks_plan_running(self):
+        """Test that a claimed moisture plan runs and stops the other running plans."""
+        old_plan = TimePlan.objects.create(name='Old Plan', plan_type='time_based', water_volume=100,
+                                           has_been_executed=True, is_running=True)
+        new_plan = MoisturePlan.objects.create(name='New Plan', plan_type='moisture', water_volume=100,
+                                               moisture_threshold=40, check_interval=10)
+        self.device.device_relation_t.add(old_plan)
+        self.device.device_relation_m.add(new_plan)
+
+        response = self.poll()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['name'], 'New Plan')
+        self.assertNotIn('is_running', data)
+        self.assertNotIn('has_been_executed', data)
+
+        old_plan.refresh_from_db()
+        new_plan.refresh_from_db()
+        self.assertFalse(old_plan.is_running)
+        self.assertTrue(new_plan.is_running)
+        self.assertTrue(new_plan.has_been_executed)
+        self.assertEqual(self.poll().status_code, 204)
+
+    def test_claim_stop_plan(self):
+        """Test that a stop request is delivered once and restores the plan type."""
+        plan = MoisturePlan.objects.create(name='Stop Plan', plan_type='delete', water_volume=100,
+                                           moisture_threshold=40, check_interval=10, is_running=True)
+        self.device.device_relation_m.add(plan)
+
+        response = self.poll()
+        self.assertEqual(response.json()['plan_type'], 'delete')
+        plan.refresh_from_db()
+        self.assertEqual(plan.plan_type, 'moisture')
+        self.assertFalse(plan.is_running)
+        self.assertTrue(plan.has_been_executed)
+
+    def test_plan_claimed_once(self):
+        """Test that a plan already claimed by another poll is not handed out again."""
+        plan = BasicPlan.objects.create(name='Basic Plan', plan_type='basic', water_volume=100)
+        self.device.device_relation_b.add(plan)
+        stale_plan = BasicPlan.objects.get(pk=plan.pk)
+
+        self.assertTrue(claim_plan(self.device, plan, 'basic'))
+        self.assertFalse(claim_plan(self.device, stale_plan, 'basic'))
+        self.assertEqual(self.poll().status_code, 204)
+
+
+class TestGetPlanConcurrency(TransactionTestCase):
+    """Test that parallel polls of one device never receive the same plan."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device'
+        )
+        for index in range(5):
+            plan = BasicPlan.objects.create(name=f'Plan {index}', plan_type='basic', water_volume=100)
+            self.device.device_relation_b.add(plan)
+        self.url = reverse('gadget_communicator_pull:get-plan')
+
+    def poll(self, _):
+        try:
+            response = Client().get(self.url, {'device': self.device.device_id})
+            return response.status_code, response.json()['name'] if response.status_code == 200 else None
+        finally:
+            connection.close()
+
+    def test_parallel_polls(self):
+        """Test that each plan is handed out exactly once."""
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(self.poll, range(20)))
+
+        delivered = [name for status_code, name in results if status_code == 200]
+        self.assertEqual(sorted(delivered), [f'Plan {index}' for index in range(5)])
+        self.assertEqual(sum(1 for status_code, _ in results if status_code == 204), 15)
+        self.assertFalse(BasicPlan.objects.filter(has_been_executed=False).exists())
+
+
+class TestPostReadings(TestCase):
+    """Test cases for the batched telemetry endpoint."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device'
+        )
+        self.other_device = Device.objects.create(
+            device_id='TEST_DEVICE_002',
+            label='Other Device'
+        )
+        self.url = reverse('gadget_communicator_pull:post-readings')
+
+    def post(self, readings):
+        return self.client.post(self.url, json.dumps(readings), content_type='application/json')
+
+    def water_readings(self, device_guid, count):
+        return [
+            {'device': device_guid, 'kind': 'water', 'value': 1000 - index,
+             'measured_at': f'2024-01-01T10:{index:02d}:00Z'}
+            for index in range(count)
+        ]
+
+    def test_batch_for_many_devices(self):
+        """Test that a batch stores every water reading and sets each device's newest levels."""
+        readings = self.water_readings('TEST_DEVICE_001', 3) + [
+            {'device': 'TEST_DEVICE_002', 'kind': 'water', 'value': 700},
+            {'device': 'TEST_DEVICE_002', 'kind': 'moisture', 'value': 55,
+             'measured_at': '2024-01-01T10:05:00Z'},
+            {'device': 'TEST_DEVICE_002', 'kind': 'moisture', 'value': 40,
+             'measured_at': '2024-01-01T09:05:00Z'},
+        ]
+
+        response = self.post(readings)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'readings': 6})
+
+        self.device.refresh_from_db()
+        self.other_device.refresh_from_db()
+        self.assertEqual(self.device.water_level, 998)
+        self.assertEqual(self.other_device.water_level, 700)
+        self.assertEqual(self.other_device.moisture_level, 55)
+        charts = self.device.water_charts.order_by('measured_at')
+        self.assertEqual([chart.water_chart for chart in charts], [1000, 999, 998])
+        self.assertEqual(charts[0].measured_at, datetime.datetime(2024, 1, 1, 10, 0, tzinfo=datetime.timezone.utc))
+        moisture = self.other_device.moisture_charts.order_by('measured_at')
+        self.assertEqual([chart.moisture for chart in moisture], [40, 55])
+
+    def test_query_count_independent_of_batch_size(self):
+        """Test that a batch costs the same number of queries whatever its size."""
+        with self.assertNumQueries(5):
+            self.post(self.water_readings('TEST_DEVICE_001', 2))
+        with self.assertNumQueries(5):
+            self.post(self.water_readings('TEST_DEVICE_001', 50))
+
+    def test_invalid_batch_is_rejected_whole(self):
+        """Test that one bad reading rejects the batch without storing anything."""
+        readings = self.water_readings('TEST_DEVICE_001', 2) + [
+            {'device': 'TEST_DEVICE_001', 'kind': 'light', 'value': 10}]
+        self.assertEqual(self.post(readings).status_code, 400)
+        self.assertEqual(self.post({'device': 'TEST_DEVICE_001'}).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post(self.water_readings('UNKNOWN', 1)).status_code, 403)
+        self.assertFalse(WaterChart.objects.exists())
+
+    def test_batch_size_limit(self):
+        """Test that oversized batches are rejected."""
+        readings = [{'device': 'TEST_DEVICE_001', 'kind': 'water', 'value': 10}] * (TELEMETRY_MAX_BATCH + 1)
+        self.assertEqual(self.post(readings).status_code, 400)
+
+
+class TestPostHeartbeat(TestCase):
+    """Test cases for the heartbeat fast path."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device',
+            owner=self.user
+        )
+        self.url = reverse('gadget_communicator_pull:post-heartbeat')
+
+    def heartbeat(self, device_guid='TEST_DEVICE_001'):
+        return self.client.post(self.url, json.dumps({'device': device_guid}), content_type='application/json')
+
+    def test_unknown_device(self):
+        """Test that heartbeats of unknown devices are rejected."""
+        self.assertEqual(self.heartbeat('UNKNOWN').status_code, 403)
+
+    def test_first_heartbeat_connects_device(self):
+        """Test that a heartbeat marks the device connected and stops plans left running."""
+        plan = MoisturePlan.objects.create(name='Running Plan', plan_type='moisture', water_volume=100,
+                                           moisture_threshold=40, check_interval=10, is_running=True)
+        self.device.device_relation_m.add(plan)
+
+        self.assertEqual(self.heartbeat().status_code, 200)
+
+        self.device.refresh_from_db()
+        plan.refresh_from_db()
+        self.assertTrue(self.device.is_connected)
+        self.assertIsNotNone(self.device.last_seen)
+        self.assertFalse(plan.is_running)
+
+    def test_fresh_heartbeat_writes_nothing(self):
+        """Test that a heartbeat right after another one does not write."""
+        self.heartbeat()
+        self.device.refresh_from_db()
+        last_seen = self.device.last_seen
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.heartbeat().status_code, 200)
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.last_seen, last_seen)
+
+    def test_stale_heartbeat_updates_last_seen(self):
+        """Test that a heartbeat after the minimum interval moves last_seen forward."""
+        last_seen = timezone.now() - datetime.timedelta(minutes=1)
+        Device.objects.filter(pk=self.device.pk).update(last_seen=last_seen, is_connected=True)
+
+        with self.assertNumQueries(2):
+            self.heartbeat()
+        self.device.refresh_from_db()
+        self.assertGreater(self.device.last_seen, last_seen)
+
+    def test_healthcheck_status_uses_heartbeat(self):
+        """Test that the healthcheck message of postStatus records a heartbeat without a HealthCheck row."""
+        response = self.client.post(reverse('gadget_communicator_pull:post-execution'), json.dumps({
+            'device': 'TEST_DEVICE_001', 'execution_status': True, 'message': 'healthcheck'}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.device.refresh_from_db()
+        self.assertTrue(self.device.is_connected)
+        self.assertIsNotNone(self.device.last_seen)
+        self.assertFalse(self.device.health_checks.exists())
+
+    def test_health_sweep_disconnects_silent_devices(self):
+        """Test that the health endpoint disconnects devices without a recent heartbeat."""
+        silent_device = Device.objects.create(device_id='TEST_DEVICE_002', label='Silent Device', is_connected=True,
+                                              last_seen=timezone.now() - datetime.timedelta(minutes=5))
+        self.heartbeat()
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('health-check'))
+        self.assertEqual(response.status_code, 200)
+        silent_device.refresh_from_db()
+        self.device.refresh_from_db()
+        self.assertFalse(silent_device.is_connected)
+        self.assertTrue(self.device.is_connected)
@@ -0,0 +1,237 @@
+"""
+Unit tests for the email outbox, its SMTP sender and notification digests.
+"""
+import datetime
+import json
+import socketserver
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from authentication.models import EmailOutbox, Notification, EMAIL_PENDING, EMAIL_SENT, EMAIL_FAILED
+from authentication.notifications import notify_device_owner, queue_digests, NOTIFY_CONNECTIVITY, NOTIFY_STATUS, \
+    NOTIFY_PHOTO
+from authentication.outbox import OutboxSender
+from authentication.water_email import WaterEmail
+from gadget_communicator_pull.models import Device
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages, stands in for the real mail server."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        sink = self.server
+        sink.connections += 1
+        self.reply('220 sink ready')
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 sink')
+            elif command == 'RCPT' and any(receiver in line for receiver in sink.rejected):
+                self.reply('550 no such user')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                data = []
+                for data_line in iter(self.rfile.readline, b'.\r\n'):
+                    data.append(data_line.decode())
+                sink.messages.append(''.join(data))
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.connections = 0
+        self.messages = []
+        self.rejected = set()
+
+
+class TestEmailOutbox(TestCase):
+    """Test cases for queuing and delivering outbox emails."""
+
+    def setUp(self):
+        """Start a local SMTP stand-in."""
+        self.sink = SMTPSink()
+        threading.Thread(target=self.sink.serve_forever, daemon=True).start()
+        self.sender = OutboxSender(host='127.0.0.1', port=self.sink.server_address[1], use_ssl=False,
+                                   username='sender@example.com', password=None, max_attempts=2, retry_delay=60)
+
+    def tearDown(self):
+        self.sender.close()
+        self.sink.shutdown()
+        self.sink.server_close()
+
+    def test_water_email_only_queues(self):
+        """Test that WaterEmail stores the email instead of sending it."""
+        self.assertTrue(WaterEmail().send_email(email_receiver='owner@example.com', subject='Subject',
+                                                message='Hello'))
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.status, EMAIL_PENDING)
+        self.assertEqual(self.sink.connections, 0)
+
+    def test_sender_reuses_one_connection(self):
+        """Test that all due emails go out over a single SMTP connection."""
+        for index in range(3):
+            WaterEmail().send_email(email_receiver=f'owner{index}@example.com', subject=f'Subject {index}',
+                                    message='Hello')
+
+        sent_before = REGISTRY.get_sample_value('water_emails_sent_total')
+        self.assertEqual(self.sender.send_pending(), 3)
+        self.assertEqual(self.sender.send_pending(), 0)
+        self.assertEqual(REGISTRY.get_sample_value('water_emails_sent_total'), sent_before + 3)
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(len(self.sink.messages), 3)
+        self.assertIn('Content-ID: <image1>', self.sink.messages[0])
+        self.assertEqual(EmailOutbox.objects.filter(status=EMAIL_SENT).count(), 3)
+
+    def test_rejected_email_is_retried_with_backoff(self):
+        """Test that a rejected email is retried later and given up after max_attempts."""
+        self.sink.rejected.add('bad@example.com')
+        WaterEmail().send_email(email_receiver='bad@example.com', subject='Subject', message='Hello')
+        WaterEmail().send_email(email_receiver='good@example.com', subject='Subject', message='Hello')
+        failed_before = REGISTRY.get_sample_value('water_emails_failed_total')
+
+        self.assertEqual(self.sender.send_pending(), 1)
+        self.assertEqual(REGISTRY.get_sample_value('water_emails_failed_total'), failed_before + 1)
+        email = EmailOutbox.objects.get(receiver='bad@example.com')
+        self.assertEqual(email.status, EMAIL_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now() + datetime.timedelta(seconds=50))
+
+        EmailOutbox.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(self.sender.send_pending(), 0)
+        email.refresh_from_db()
+        self.assertEqual(email.status, EMAIL_FAILED)
+        self.assertEqual(self.sink.connections, 1)
+
+    def test_unreachable_server_keeps_email(self):
+        """Test that emails stay queued while the SMTP server is down."""
+        self.sender.port = 1
+        WaterEmail().send_email(email_receiver='owner@example.com', subject='Subject', message='Hello')
+
+        self.assertEqual(self.sender.send_pending(), 0)
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.status, EMAIL_PENDING)
+        self.assertEqual(email.attempts, 1)
+
+
+class TestNotificationDigests(TestCase):
+    """Test cases for coalescing device notifications into digests."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.start = timezone.now()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        self.devices = [
+            Device.objects.create(device_id=f'TEST_DEVICE_{index:03d}', label='Test Device', owner=self.user,
+                                  send_email=True)
+            for index in range(3)
+        ]
+
+    def test_connectivity_rate_limit(self):
+        """Test that connectivity events of a device within the rate limit collapse into the latest one."""
+        self.assertTrue(notify_device_owner(self.devices[0], NOTIFY_CONNECTIVITY, 'Connected', 'up'))
+        self.assertTrue(notify_device_owner(self.devices[0], NOTIFY_CONNECTIVITY, 'Disconnected', 'down'))
+        self.assertFalse(notify_device_owner(self.devices[0], NOTIFY_CONNECTIVITY, 'Disconnected', 'down'))
+        self.assertTrue(notify_device_owner(self.devices[1], NOTIFY_CONNECTIVITY, 'Connected', 'up'))
+        self.assertTrue(notify_device_owner(self.devices[0], NOTIFY_STATUS, 'Status', 'watered'))
+        self.assertTrue(notify_device_owner(self.devices[0], NOTIFY_STATUS, 'Status', 'watered again'))
+        self.assertEqual(Notification.objects.count(), 4)
+        connectivity = Notification.objects.get(device_id=self.devices[0].device_id, kind=NOTIFY_CONNECTIVITY)
+        self.assertEqual((connectivity.subject, connectivity.message), ('Disconnected', 'down'))
+
+    def notify_at(self, minutes, subject, message, device=None):
+        with mock.patch.object(timezone, 'now', return_value=self.start + datetime.timedelta(minutes=minutes)):
+            return notify_device_owner(device or self.devices[0], NOTIFY_CONNECTIVITY, subject, message)
+
+    def digest_at(self, minutes):
+        return queue_digests(self.start + datetime.timedelta(minutes=minutes))
+
+    def test_reconnect_after_digest(self):
+        """Test that a reconnect following an already sent disconnect is delivered once the hour is over."""
+        self.notify_at(0, 'Disconnected', 'down')
+        self.assertEqual(self.digest_at(10), 1)
+
+        self.assertFalse(self.notify_at(15, 'Disconnected', 'down'))
+        self.assertTrue(self.notify_at(20, 'Connected', 'up'))
+
+        self.assertEqual(self.digest_at(30), 0)
+        self.assertEqual(self.digest_at(70), 1)
+        self.assertEqual([email.subject for email in EmailOutbox.objects.order_by('pk')], ['Disconnected', 'Connected'])
+
+    def test_flapping_connection_once_an_hour(self):
+        """Test that up and down cycles within an hour give one connectivity email per device."""
+        for minutes in range(0, 60, 5):
+            for device in self.devices[:2]:
+                self.notify_at(minutes, 'Disconnected', f'{device.device_id} down', device)
+                self.notify_at(minutes + 1, 'Connected', f'{device.device_id} up', device)
+            self.digest_at(minutes + 2)
+
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+        self.assertEqual(Notification.objects.filter(digested_at__isnull=False).count(), 2)
+        self.assertEqual(Notification.objects.filter(digested_at__isnull=True).count(), 2)
+
+        self.digest_at(75)
+        emails = list(EmailOutbox.objects.order_by('pk'))
+        self.assertEqual(len(emails), 2)
+        self.assertIn('TEST_DEVICE_000 up', emails[1].message)
+        self.assertIn('TEST_DEVICE_001 up', emails[1].message)
+
+    def test_devices_without_email(self):
+        """Test that devices which do not send emails record nothing."""
+        device = Device.objects.create(device_id='QUIET', label='Test Device', owner=self.user)
+        self.assertFalse(notify_device_owner(device, NOTIFY_STATUS, 'Status', 'watered'))
+        self.assertFalse(Notification.objects.exists())
+
+    def test_one_digest_per_user(self):
+        """Test that events of many devices become one email once the window has passed."""
+        for device in self.devices:
+            notify_device_owner(device, NOTIFY_CONNECTIVITY, 'Device Operation: Success', f'{device.device_id} up')
+
+        self.assertEqual(queue_digests(), 0)
+        self.assertFalse(EmailOutbox.objects.exists())
+
+        later = timezone.now() + datetime.timedelta(hours=1)
+        self.assertEqual(queue_digests(later), 1)
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.receiver, 'owner@example.com')
+        self.assertEqual(email.subject, '3 updates from your devices')
+        self.assertIn('TEST_DEVICE_002 up', email.message)
+        self.assertEqual(queue_digests(later), 0)
+
+    def test_single_notification_keeps_subject(self):
+        """Test that a digest of one event is sent as that event."""
+        notify_device_owner(self.devices[0], NOTIFY_PHOTO, 'Photo with id: 1', 'Photo taken successfully')
+        queue_digests(timezone.now() + datetime.timedelta(hours=1))
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.subject, 'Photo with id: 1')
+        self.assertEqual(email.message, 'Photo taken successfully')
+
+    def test_status_report_is_notified(self):
+        """Test that plan status reports are recorded as notifications instead of emails."""
+        response = self.client.post(reverse('gadget_communicator_pull:post-execution'), json.dumps({
+            'device': 'TEST_DEVICE_000', 'execution_status': True, 'message': 'watered'}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.kind, NOTIFY_STATUS)
+        self.assertFalse(EmailOutbox.objects.exists())
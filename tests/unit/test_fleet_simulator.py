@@ -0,0 +1,90 @@
+"""
+Unit tests for the simulated device fleet used for load testing.
+"""
+import asyncio
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, LiveServerTestCase, override_settings
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_READY
+from gadget_communicator_pull.helpers.fleet_simulator import FleetStats, TRANSPORT_ERROR, percentile, seed_fleet, \
+    remove_fleet, simulate_fleet
+from gadget_communicator_pull.models import Device, BasicPlan, PlanIndex
+from gadget_communicator_pull.models.photo_module import PhotoModule
+
+
+class TestFleetStats(TestCase):
+    """Test cases for the fleet report."""
+
+    def test_percentile(self):
+        """Test the nearest-rank percentile."""
+        values = list(range(1, 101))
+
+        self.assertEqual((percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99)), (50, 95, 99))
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_report(self):
+        """Test latencies, throughput and error rates are reported per endpoint."""
+        stats = FleetStats()
+        for latency in (0.010, 0.020, 0.030, 0.040):
+            stats.record('getPlan', 204, latency)
+        stats.record('postWater', 200, 0.005)
+        stats.record('postWater', 500, 0.050)
+        stats.record('postWater', TRANSPORT_ERROR, 0.100)
+
+        report = stats.report(elapsed=2.0)
+
+        self.assertEqual((report['requests'], report['errors'], report['throughput_rps']), (7, 2, 3.5))
+        self.assertEqual(report['endpoints']['getPlan'], {
+            'requests': 4, 'errors': 0, 'error_rate': 0.0, 'throughput_rps': 2.0,
+            'p50_ms': 20.0, 'p95_ms': 40.0, 'p99_ms': 40.0, 'max_ms': 40.0, 'statuses': {'204': 4},
+        })
+        self.assertEqual(report['endpoints']['postWater']['error_rate'], 0.6667)
+        self.assertEqual(report['endpoints']['postWater']['statuses'], {'200': 1, '500': 1, 'transport': 1})
+
+
+class TestSeedFleet(TestCase):
+    """Test cases for creating and removing the simulated devices."""
+
+    def test_remove_fleet(self):
+        """Test a new seed replaces the previous fleet and remove_fleet cleans up after it."""
+        seed_fleet(2)
+        seed_fleet(3, plans_per_device=2)
+        self.assertEqual((Device.objects.count(), BasicPlan.objects.count(), PlanIndex.objects.count()), (3, 6, 6))
+
+        remove_fleet()
+
+        self.assertEqual((Device.objects.count(), BasicPlan.objects.count(), PlanIndex.objects.count()), (0, 0, 0))
+        self.assertFalse(PhotoModule.objects.exists())
+
+
+class TestSimulateFleet(LiveServerTestCase):
+    """Test cases for a fleet run against a live server."""
+
+    def setUp(self):
+        """Keep uploaded photos in a temporary MEDIA_ROOT."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        derivatives = mock.patch('gadget_communicator_pull.views.devicecom.device_views.schedule_derivatives')
+        derivatives.start()
+        self.addCleanup(derivatives.stop)
+
+    def test_fleet_run(self):
+        """Test every device executes its plan, answers its photo request and reports without errors."""
+        device_guids = seed_fleet(3, plans_per_device=1, photos_per_device=1)
+
+        report = asyncio.run(simulate_fleet(self.live_server_url, device_guids, duration=0.5, interval=0.1, seed=1))
+
+        self.assertEqual((report['devices'], report['errors']), (3, 0))
+        self.assertEqual(set(report['endpoints']),
+                         {'getPlan', 'postStatus', 'postWater', 'postMoisture', 'getPhoto', 'postPhoto'})
+        self.assertEqual(report['endpoints']['getPlan']['statuses']['200'], 3)
+        self.assertEqual(report['endpoints']['postPhoto']['statuses'], {'200': 3})
+        self.assertFalse(BasicPlan.objects.filter(has_been_executed=False).exists())
+        self.assertEqual(PhotoModule.objects.filter(photo_status=PHOTO_READY).count(), 3)
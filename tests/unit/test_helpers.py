@@ -4,16 +4,28 @@ Unit tests for WaterPlantApp helpers.
 This module contains comprehensive unit tests for all helper modules
 in the WaterPlantApp Django application.
 """
+import io
+import time as time_module
+from concurrent.futures import ThreadPoolExecutor
 import pytest
 import json
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta
 from decimal import Decimal
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
 from unittest.mock import Mock, patch
 
+import numpy as np
+
 from gadget_communicator_pull.helpers.time_keeper import TimeKeeper
 from gadget_communicator_pull.helpers.helper import BitChoices, WEEKDAYS, WEEKDAYS_NUMERIC
 from gadget_communicator_pull.helpers.from_to_json_serializer import to_json_serializer, remove_device_field_from_json
+from gadget_communicator_pull.helpers.downsample import lttb
+from gadget_communicator_pull.helpers import level_buffer
+from gadget_communicator_pull.helpers.level_buffer import DeviceLevelBuffer, get_level_buffer
+from gadget_communicator_pull.helpers.liveness_monitor import DeviceLivenessMonitor
+from gadget_communicator_pull.models import Device
 
 
 class TestTimeKeeper(TestCase):
@@ -179,4 +191,170 @@ class TestHelperIntegration(TestCase):
         mock_serializer.data = {'test': 'data'}
         
         result = to_json_serializer(mock_serializer)
-        self.assertEqual(result, {'test': 'data'})
\ No newline at end of file
+        self.assertEqual(result, {'test': 'data'})
+
+class TestDeviceLevelBuffer(TestCase):
+    """Test cases for the write-behind device level buffer."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.devices = [
+            Device.objects.create(device_id=f'TEST_DEVICE_{index:03d}', label='Test Device')
+            for index in range(3)
+        ]
+
+    def test_coalesces_until_flush(self):
+        """Test that only the latest level per device is written, in one statement per field set."""
+        buffer = DeviceLevelBuffer(flush_interval=3600, flush_size=100)
+        for value in range(10):
+            buffer.record(self.devices[0].pk, 'water_level', value)
+            buffer.record(self.devices[1].pk, 'water_level', value * 2)
+        buffer.record(self.devices[2].pk, 'moisture_level', 42)
+
+        self.devices[0].refresh_from_db()
+        self.assertEqual(self.devices[0].water_level, 100)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(buffer.flush(), 3)
+        buffer.stop()
+
+        for device in self.devices:
+            device.refresh_from_db()
+        self.assertEqual(self.devices[0].water_level, 9)
+        self.assertEqual(self.devices[1].water_level, 18)
+        self.assertEqual(self.devices[2].moisture_level, 42)
+        self.assertEqual(self.devices[2].water_level, 100)
+
+    def test_flushes_at_size_threshold(self):
+        """Test that the buffer flushes by itself once enough devices are pending."""
+        buffer = DeviceLevelBuffer(flush_interval=3600, flush_size=2)
+        buffer.record(self.devices[0].pk, 'moisture_level', 10)
+        buffer.record(self.devices[1].pk, 'moisture_level', 20)
+        buffer.stop()
+
+        self.devices[1].refresh_from_db()
+        self.assertEqual(self.devices[1].moisture_level, 20)
+
+    def test_failed_flush_keeps_levels(self):
+        """Test that levels survive a failed flush and are written by the next one."""
+        buffer = DeviceLevelBuffer(flush_interval=3600, flush_size=100)
+        buffer.record(self.devices[0].pk, 'water_level', 5)
+        with patch.object(Device.objects, 'bulk_update', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+        buffer.stop()
+
+        self.devices[0].refresh_from_db()
+        self.assertEqual(self.devices[0].water_level, 5)
+
+    def test_failed_inline_flush_does_not_raise(self):
+        """Test that a flush failing while recording is logged and the levels stay buffered."""
+        buffer = DeviceLevelBuffer(flush_interval=0)
+        with patch.object(Device.objects, 'bulk_update', side_effect=RuntimeError('database down')):
+            with self.assertLogs('gadget_communicator_pull.helpers.level_buffer', 'ERROR'):
+                buffer.record(self.devices[0].pk, 'water_level', 5)
+        buffer.record(self.devices[1].pk, 'water_level', 6)
+
+        for device, level in zip(self.devices, (5, 6)):
+            device.refresh_from_db()
+            self.assertEqual(device.water_level, level)
+
+    def test_one_shared_buffer(self):
+        """Test that threads asking for the buffer at the same time all get the same one."""
+        def slow_buffer(**kwargs):
+            time_module.sleep(0.05)
+            return Mock()
+
+        with patch.object(level_buffer, '_level_buffer', None), \
+                patch.object(level_buffer, 'DeviceLevelBuffer', side_effect=slow_buffer) as create_buffer:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                buffers = list(executor.map(lambda _: get_level_buffer(), range(8)))
+
+        self.assertEqual(create_buffer.call_count, 1)
+        self.assertEqual(len(set(map(id, buffers))), 1)
+
+
+class TestDeviceLivenessMonitor(TestCase):
+    """Test cases for the heap-based device liveness monitor."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.now = timezone.now()
+        self.healthy = Device.objects.create(device_id='HEALTHY', label='Test Device', is_connected=True,
+                                             last_seen=self.now - timedelta(seconds=5))
+        self.silent = Device.objects.create(device_id='SILENT', label='Test Device', is_connected=True,
+                                            last_seen=self.now - timedelta(minutes=5))
+        self.never_seen = Device.objects.create(device_id='NEVER_SEEN', label='Test Device', is_connected=True)
+        self.offline = Device.objects.create(device_id='OFFLINE', label='Test Device', is_connected=False,
+                                             last_seen=self.now - timedelta(days=1))
+        self.disconnected = []
+
+    def test_disconnects_expired_devices(self):
+        """Test that only connected devices past their deadline are disconnected."""
+        monitor = DeviceLivenessMonitor(offline_after=30, on_disconnected=self.disconnected.extend)
+        next_deadline = monitor.tick(self.now)
+
+        self.assertAlmostEqual(next_deadline, 25)
+        self.assertEqual(sorted(device.device_id for device in self.disconnected), ['NEVER_SEEN', 'SILENT'])
+        connected = set(Device.objects.filter(is_connected=True).values_list('device_id', flat=True))
+        self.assertEqual(connected, {'HEALTHY'})
+
+    def test_idle_tick_costs_nothing(self):
+        """Test that a tick before the next deadline does not touch the database."""
+        monitor = DeviceLivenessMonitor(offline_after=30)
+        monitor.tick(self.now)
+        with self.assertNumQueries(0):
+            self.assertAlmostEqual(monitor.tick(self.now + timedelta(seconds=10)), 15)
+
+    def test_heartbeat_after_load_keeps_device(self):
+        """Test that a device which sent a heartbeat since it was loaded stays connected."""
+        monitor = DeviceLivenessMonitor(offline_after=30)
+        monitor.tick(self.now)
+        Device.objects.filter(pk=self.healthy.pk).update(last_seen=self.now + timedelta(seconds=20))
+
+        self.assertAlmostEqual(monitor.tick(self.now + timedelta(seconds=26)), 24)
+        self.healthy.refresh_from_db()
+        self.assertTrue(self.healthy.is_connected)
+
+    def test_batches(self):
+        """Test that more expired devices than fit in one batch are all disconnected."""
+        for index in range(5):
+            Device.objects.create(device_id=f'EXPIRED_{index}', label='Test Device', is_connected=True,
+                                  last_seen=self.now - timedelta(minutes=index + 1))
+        monitor = DeviceLivenessMonitor(offline_after=30, batch_size=2)
+        monitor.tick(self.now)
+        self.assertEqual(list(Device.objects.filter(is_connected=True).values_list('device_id', flat=True)),
+                         ['HEALTHY'])
+
+    def test_monitor_command(self):
+        """Test that the monitor_devices command runs a single tick with --once."""
+        call_command('monitor_devices', '--once', stdout=io.StringIO())
+        self.silent.refresh_from_db()
+        self.assertFalse(self.silent.is_connected)
+
+
+class TestLttb(TestCase):
+    """Test cases for Largest-Triangle-Three-Buckets downsampling."""
+
+    def test_short_series_unchanged(self):
+        """Test that series at or below the threshold keep every point."""
+        self.assertEqual(list(lttb([0, 1, 2], [5, 6, 7], 10)), [0, 1, 2])
+
+    def test_keeps_ends_and_peaks(self):
+        """Test that the first and last point and a lone spike survive."""
+        y = np.zeros(1000)
+        y[437] = 100
+        indices = lttb(np.arange(1000), y, 20)
+        self.assertEqual(len(indices), 20)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertIn(437, indices)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_large_series(self):
+        """Test that 100k points are reduced quickly."""
+        x = np.arange(100000, dtype=float)
+        y = np.sin(x / 1000) * 50 + 50
+        started = time_module.perf_counter()
+        indices = lttb(x, y, 1000)
+        self.assertLess(time_module.perf_counter() - started, 1)
+        self.assertEqual(len(indices), 1000)
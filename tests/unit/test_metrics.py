@@ -0,0 +1,114 @@
+"""
+Unit tests for the Prometheus metrics and the /metrics endpoint.
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase, modify_settings, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_CREATED
+from gadget_communicator_pull.models import Device, BasicPlan, TimePlan
+from gadget_communicator_pull.models.photo_module import PhotoModule
+
+METRICS_MIDDLEWARE = 'gadget_communicator_pull.middleware.RequestMetricsMiddleware'
+
+
+def sample_value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@modify_settings(MIDDLEWARE={'prepend': METRICS_MIDDLEWARE})
+class TestMetricsEndpoint(TestCase):
+    """Test cases for the text exposition served at /metrics."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(device_id='TEST_DEVICE_001', label='Test Device', owner=self.user,
+                                            is_connected=True)
+        Device.objects.create(device_id='TEST_DEVICE_002', label='Test Device', owner=self.user)
+
+    def test_database_gauges(self):
+        """Test connected devices, pending plans and pending photos are exposed."""
+        BasicPlan.objects.create(name='basic', plan_type='basic')
+        TimePlan.objects.create(name='time', plan_type='time_based')
+        TimePlan.objects.create(name='done', plan_type='time_based', has_been_executed=True)
+        PhotoModule.objects.create(device=self.device, photo_status=PHOTO_CREATED)
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('water_devices_connected 1.0', body)
+        self.assertIn('water_plans_pending{kind="basic"} 1.0', body)
+        self.assertIn('water_plans_pending{kind="time_based"} 1.0', body)
+        self.assertIn('water_plans_pending{kind="moisture"} 0.0', body)
+        self.assertIn('water_photos_pending 1.0', body)
+
+    def test_request_latency_by_url_name(self):
+        """Test each request is counted in the latency histogram of its URL name."""
+        labels = {'url_name': 'get-plan', 'method': 'GET'}
+        before = sample_value('water_http_request_duration_seconds_count', **labels)
+        served = sample_value('water_http_requests_total', status='2xx', **labels)
+
+        self.client.get(reverse('gadget_communicator_pull:get-plan'), {'device': self.device.device_id})
+        self.client.get(reverse('gadget_communicator_pull:get-plan'), {'device': self.device.device_id})
+
+        self.assertEqual(sample_value('water_http_request_duration_seconds_count', **labels), before + 2)
+        self.assertEqual(sample_value('water_http_requests_total', status='2xx', **labels), served + 2)
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('water_http_request_duration_seconds_bucket{le="0.005",method="GET",url_name="get-plan"}',
+                      body)
+
+    def test_unresolved_requests_share_one_label(self):
+        """Test requests outside the URL patterns do not create a label value each."""
+        before = sample_value('water_http_requests_total', url_name='unnamed', method='GET', status='4xx')
+
+        self.client.get('/no-such-page-1')
+        self.client.get('/no-such-page-2')
+
+        self.assertEqual(sample_value('water_http_requests_total', url_name='unnamed', method='GET', status='4xx'),
+                         before + 2)
+
+
+@override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'], METRICS_TOKEN='scrape-secret')
+class TestMetricsAccess(TestCase):
+    """Test cases for who may scrape /metrics."""
+
+    def setUp(self):
+        """Set up the URL."""
+        self.url = reverse('metrics')
+
+    def test_allowed_ip(self):
+        """Test a scraper from an allowed address needs no token."""
+        response = self.client.get(self.url, REMOTE_ADDR='10.0.0.5')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('water_devices_connected', response.content.decode())
+
+    def test_bearer_token(self):
+        """Test the token lets a scraper in from any address."""
+        response = self.client.get(self.url, REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer scrape-secret')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_others_not_found(self):
+        """Test other addresses, a wrong token and another scheme get a 404 without metrics."""
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}, {'HTTP_AUTHORIZATION': 'Basic scrape-secret'}):
+            with self.subTest(headers=headers):
+                response = self.client.get(self.url, REMOTE_ADDR='203.0.113.9', **headers)
+
+                self.assertEqual(response.status_code, 404)
+                self.assertNotIn(b'water_', response.content)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_no_token_configured(self):
+        """Test an empty METRICS_TOKEN never matches."""
+        response = self.client.get(self.url, REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer ')
+
+        self.assertEqual(response.status_code, 404)
@@ -2,7 +2,9 @@
 Simple unit tests for WaterPlantApp models that match the actual model structure.
 """
 import pytest
-from django.test import TestCase
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth.models import User
 
 from gadget_communicator_pull.models import (
@@ -190,3 +192,42 @@ class TestModelIntegration(TestCase):
         # Test that both objects were created
         self.assertEqual(device.device_id, 'TEST_DEVICE_001')
         self.assertEqual(status.message, 'Test status')
+
+
+class TestDeviceForeignKeyMigration(TransactionTestCase):
+    """Test cases for moving statuses and photos from many-to-many links to foreign keys."""
+
+    before = [('gadget_communicator_pull', '0011_status_created_at')]
+    after = [('gadget_communicator_pull', '0012_device_foreign_keys')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_links_become_foreign_keys(self):
+        """Test that every linked status and photo gets its device, unlinked ones stay empty."""
+        apps = self.migrate(self.before)
+        OldDevice = apps.get_model('gadget_communicator_pull', 'Device')
+        OldStatus = apps.get_model('gadget_communicator_pull', 'Status')
+        OldPhoto = apps.get_model('gadget_communicator_pull', 'PhotoModule')
+        first = OldDevice.objects.create(device_id='FIRST', label='First')
+        second = OldDevice.objects.create(device_id='SECOND', label='Second')
+        for index in range(3):
+            first.status_relation.add(OldStatus.objects.create(message=f'first {index}'))
+        second.status_relation.add(OldStatus.objects.create(message='second'))
+        OldStatus.objects.create(message='orphan')
+        photo = OldPhoto.objects.create()
+        second.photo_relation.add(photo)
+
+        apps = self.migrate(self.after)
+        Status = apps.get_model('gadget_communicator_pull', 'Status')
+        PhotoModule = apps.get_model('gadget_communicator_pull', 'PhotoModule')
+        devices = dict(Status.objects.values_list('message', 'device__device_id'))
+        self.assertEqual(devices, {'first 0': 'FIRST', 'first 1': 'FIRST', 'first 2': 'FIRST',
+                                   'second': 'SECOND', 'orphan': None})
+        self.assertEqual(PhotoModule.objects.get(pk=photo.pk).device.device_id, 'SECOND')
@@ -0,0 +1,169 @@
+"""
+Unit tests for keyset pagination of the list endpoints.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from importlib import import_module
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from gadget_communicator_pull.models import Device, Status, BasicPlan, TimePlan
+from gadget_communicator_pull.models.photo_module import PhotoModule
+
+
+class TestKeysetPagination(TestCase):
+    """Test cases for the limit and cursor parameters."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device',
+            owner=self.user
+        )
+        Status.objects.bulk_create([Status(message=f'status {index}', execution_status=True, device=self.device)
+                                    for index in range(25)])
+        self.status_url = reverse('gadget_communicator_pull:api_list_status', kwargs={'id': self.device.device_id})
+        self.client.force_login(self.user)
+
+    def fetch_all(self, url, limit):
+        pages = []
+        cursor = None
+        while True:
+            params = {'limit': limit}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append(data['results'])
+            cursor = data['next']
+            if cursor is None:
+                return pages
+
+    def test_status_pages(self):
+        """Test that statuses are paged newest first without gaps or repeats."""
+        pages = self.fetch_all(self.status_url, 10)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        messages = [status['message'] for page in pages for status in page]
+        self.assertEqual(messages, [f'status {index}' for index in reversed(range(25))])
+
+    def test_same_timestamp_pages(self):
+        """Test that statuses sharing created_at are split across pages by pk."""
+        Status.objects.update(created_at=timezone.now())
+        pages = self.fetch_all(self.status_url, 7)
+        self.assertEqual(len({status['status_id'] for page in pages for status in page}), 25)
+
+    def test_unpaged_list_unchanged(self):
+        """Test that requests without limit or cursor still get the plain list."""
+        response = self.client.get(self.status_url)
+        self.assertEqual(len(response.json()), 25)
+
+    def test_deep_page_is_a_range_scan(self):
+        """Test that later pages filter on the key instead of using OFFSET."""
+        first = self.client.get(self.status_url, {'limit': 5}).json()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.status_url, {'limit': 5, 'cursor': first['next']})
+        status_query = [query['sql'] for query in queries if 'gadget_communicator_pull_status' in query['sql']][0]
+        self.assertNotIn('OFFSET', status_query)
+        self.assertIn('LIMIT 6', status_query)
+
+    def test_bad_parameters(self):
+        """Test that invalid limits and cursors are refused."""
+        self.assertEqual(self.client.get(self.status_url, {'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get(self.status_url, {'limit': 1000}).status_code, 400)
+        self.assertEqual(self.client.get(self.status_url, {'cursor': 'not-a-cursor'}).status_code, 400)
+
+    def test_photo_pages(self):
+        """Test that photos are paged like statuses."""
+        for _ in range(3):
+            PhotoModule.objects.create(device=self.device)
+        url = reverse('gadget_communicator_pull:api_list_photos', kwargs={'id_d': self.device.device_id})
+        pages = self.fetch_all(url, 2)
+        self.assertEqual([len(page) for page in pages], [2, 1])
+
+    def test_plan_pages(self):
+        """Test that each plan kind is paged on its own inside the [basic, time, moisture] shape."""
+        for index in range(3):
+            self.device.device_relation_b.add(BasicPlan.objects.create(name=f'basic {index}', plan_type='basic'))
+        self.device.device_relation_t.add(TimePlan.objects.create(name='time', plan_type='time_based'))
+
+        for url in (reverse('gadget_communicator_pull:api_list_plans'),
+                    reverse('gadget_communicator_pull:api_get_plans_by_device_id',
+                            kwargs={'id': self.device.device_id})):
+            pages = self.fetch_all(url, 2)
+            self.assertEqual([[len(kind) for kind in page] for page in pages], [[2, 1, 0], [1, 0, 0]])
+            self.assertEqual([plan['name'] for page in pages for plan in page[0]], ['basic 0', 'basic 1', 'basic 2'])
+
+
+class TestStatusFilters(TestCase):
+    """Test cases for the since, until and execution_status filters of list_status."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device',
+            owner=self.user
+        )
+        start = datetime(2026, 3, 1, 12, tzinfo=dt_timezone.utc)
+        for index in range(6):
+            Status.objects.create(message=f'status {index}', execution_status=index % 2 == 0,
+                                  created_at=start + timedelta(days=index), device=self.device)
+        self.url = reverse('gadget_communicator_pull:api_list_status', kwargs={'id': self.device.device_id})
+        self.client.force_login(self.user)
+
+    def messages(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(status['message'] for status in response.json())
+
+    def test_time_range(self):
+        """Test that since is inclusive and until exclusive."""
+        self.assertEqual(self.messages(since='2026-03-02T12:00:00Z', until='2026-03-04T12:00:00Z'),
+                         ['status 1', 'status 2'])
+        self.assertEqual(self.messages(since='2026-03-05'), ['status 4', 'status 5'])
+
+    def test_execution_status(self):
+        """Test that execution_status filters in SQL and combines with the range and paging."""
+        self.assertEqual(self.messages(execution_status='false'), ['status 1', 'status 3', 'status 5'])
+        response = self.client.get(self.url, {'execution_status': 'true', 'since': '2026-03-02', 'limit': 1})
+        data = response.json()
+        self.assertEqual([status['message'] for status in data['results']], ['status 4'])
+        self.assertIsNotNone(data['next'])
+
+    def test_bad_filters(self):
+        """Test that unreadable filters are refused."""
+        self.assertEqual(self.client.get(self.url, {'since': 'last week'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'execution_status': 'maybe'}).status_code, 400)
+
+
+class TestStatusCreatedAtBackfill(TestCase):
+    """Test cases for rebuilding created_at from the HH:MM status_time strings."""
+
+    def test_days_roll_back_when_time_increases(self):
+        """Test that walking from newest to oldest moves a day back whenever the clock jumps forward."""
+        migration = import_module('gadget_communicator_pull.migrations.0011_status_created_at')
+        now = datetime(2026, 3, 10, 9, 30, tzinfo=dt_timezone.utc)
+        rows = [(6, '09:00'), (5, '08:15'), (4, ''), (3, '23:50'), (2, '10:00'), (1, '11:00')]
+        created = dict(migration.reconstruct_created_at(rows, now))
+        self.assertEqual(created[6], datetime(2026, 3, 10, 9, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(created[5], datetime(2026, 3, 10, 8, 15, tzinfo=dt_timezone.utc))
+        self.assertEqual(created[4], created[5])
+        self.assertEqual(created[3], datetime(2026, 3, 9, 23, 50, tzinfo=dt_timezone.utc))
+        self.assertEqual(created[2], datetime(2026, 3, 9, 10, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(created[1], datetime(2026, 3, 8, 11, 0, tzinfo=dt_timezone.utc))
@@ -0,0 +1,447 @@
+"""
+Unit tests for serving and receiving photo files.
+"""
+import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import urllib.request
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from gadget_communicator_pull.constants.photo_constants import PHOTO_READY, PHOTO_RUNNING
+from gadget_communicator_pull.helpers.photo_upload import start_upload, append_chunk, finalize_upload
+from gadget_communicator_pull.models import Device, PhotoUpload
+from gadget_communicator_pull.models.photo_module import PhotoModule
+from gadget_communicator_pull import storage
+from gadget_communicator_pull.storage import is_content_addressed
+
+try:
+    import boto3
+    from moto.server import ThreadedMotoServer
+except ImportError:
+    ThreadedMotoServer = None
+
+PHOTO_BYTES = bytes(range(256)) * 1024
+S3_BUCKET = 'water-photos'
+S3_CREDENTIALS = {'access_key': 'testing', 'secret_key': 'testing', 'region_name': 'us-east-1'}
+
+
+def hashed_name(content, extension='.jpg'):
+    digest = hashlib.sha256(content).hexdigest()
+    return f'photos/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+class PhotoFilesTestCase(TestCase):
+    """Keeps uploaded photos in a temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device',
+            owner=self.user
+        )
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_photo(self, content=PHOTO_BYTES):
+        photo = PhotoModule.objects.create(photo_status=PHOTO_READY, device=self.device)
+        photo.image.save('photo.jpg', ContentFile(content))
+        return photo
+
+
+class TestApiDownloadPhoto(PhotoFilesTestCase):
+    """Test cases for streaming photo downloads."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.photo = self.create_photo()
+        self.url = reverse('gadget_communicator_pull:api_download_photo_id', kwargs={'id': self.photo.photo_id})
+
+    def test_streams_whole_file(self):
+        """Test that the photo is streamed with validators."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), PHOTO_BYTES)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="{self.photo.photo_id}.jpg"')
+
+    def test_range_requests(self):
+        """Test that single byte ranges are answered with 206."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), PHOTO_BYTES[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(PHOTO_BYTES)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), PHOTO_BYTES[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(PHOTO_BYTES)}-')
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-0')
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_requests(self):
+        """Test that unchanged photos are answered with 304."""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_sendfile_offload(self):
+        """Test that the front proxy gets the file path instead of the content."""
+        with self.settings(PHOTO_SENDFILE_HEADER='X-Accel-Redirect', PHOTO_SENDFILE_ROOT='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.photo.image.name}')
+
+    def test_photo_of_other_user(self):
+        """Test that photos of other users' devices are not served."""
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client.force_login(other_user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class TestPhotoUpload(PhotoFilesTestCase):
+    """Test cases for the chunked, resumable photo upload."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.client.logout()
+        self.photo = PhotoModule.objects.create(photo_status=PHOTO_RUNNING, device=self.device)
+
+    def start(self, size=len(PHOTO_BYTES)):
+        return self.client.post(reverse('gadget_communicator_pull:photo-upload-start'), json.dumps({
+            'device_id': self.device.device_id, 'photo_id': str(self.photo.photo_id), 'size': size,
+            'filename': 'photo.jpg'}), content_type='application/json')
+
+    def put_chunk(self, upload_id, offset, chunk):
+        url = reverse('gadget_communicator_pull:photo-upload-chunk', kwargs={'upload_id': upload_id})
+        return self.client.put(f'{url}?offset={offset}', chunk, content_type='application/octet-stream')
+
+    def finalize(self, upload_id):
+        return self.client.post(reverse('gadget_communicator_pull:photo-upload-finalize',
+                                        kwargs={'upload_id': upload_id}))
+
+    def test_upload_in_chunks(self):
+        """Test that chunks are appended and finalize makes the photo Ready."""
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['upload_id']
+
+        chunk_size = 100 * 1024
+        for offset in range(0, len(PHOTO_BYTES), chunk_size):
+            response = self.put_chunk(upload_id, offset, PHOTO_BYTES[offset:offset + chunk_size])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['offset'], len(PHOTO_BYTES))
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 200)
+        self.photo.refresh_from_db()
+        self.assertEqual(self.photo.photo_status, PHOTO_READY)
+        self.assertEqual(self.photo.image.name, hashed_name(PHOTO_BYTES))
+        self.assertFalse(os.listdir(os.path.join(self.media_root, 'uploads')))
+        with self.photo.image.open('rb') as image:
+            self.assertEqual(image.read(), PHOTO_BYTES)
+        self.assertFalse(PhotoUpload.objects.exists())
+
+    def test_resume_after_broken_chunk(self):
+        """Test that a device can ask for the offset and continue from there."""
+        upload_id = self.start().json()['upload_id']
+        self.put_chunk(upload_id, 0, PHOTO_BYTES[:1000])
+
+        # starting again hands back the same session
+        response = self.start()
+        self.assertEqual(response.json(), {'upload_id': upload_id, 'offset': 1000, 'size': len(PHOTO_BYTES)})
+
+        response = self.put_chunk(upload_id, 0, PHOTO_BYTES[:1000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 1000)
+
+        self.assertEqual(self.finalize(upload_id).status_code, 409)
+        self.put_chunk(upload_id, 1000, PHOTO_BYTES[1000:])
+        self.assertEqual(self.finalize(upload_id).status_code, 200)
+
+    def test_size_limits(self):
+        """Test that uploads above the limit and chunks past the declared size are refused."""
+        with self.settings(PHOTO_UPLOAD_MAX_SIZE=1000):
+            self.assertEqual(self.start(size=1001).status_code, 413)
+        upload_id = self.start(size=10).json()['upload_id']
+        self.assertEqual(self.put_chunk(upload_id, 0, b'x' * 11).status_code, 413)
+        self.assertEqual(self.start(size=-1).status_code, 400)
+
+    def test_unknown_photo(self):
+        """Test that uploads for photos of other devices are refused."""
+        response = self.client.post(reverse('gadget_communicator_pull:photo-upload-start'), json.dumps({
+            'device_id': 'UNKNOWN', 'photo_id': str(self.photo.photo_id), 'size': 10}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_losing_chunk_keeps_winner(self):
+        """Test that a chunk losing the race for the offset does not touch the stored bytes."""
+        upload_id = self.start().json()['upload_id']
+        upload = PhotoUpload.objects.get(upload_id=upload_id)
+        stale_upload = PhotoUpload.objects.get(upload_id=upload_id)
+
+        self.assertEqual(append_chunk(upload, io.BytesIO(PHOTO_BYTES[:10]), 10), 10)
+        self.assertIsNone(append_chunk(stale_upload, io.BytesIO(b'x' * 20), 20))
+
+        with open(upload.temp_path, 'rb') as fh:
+            self.assertEqual(fh.read(), PHOTO_BYTES[:10])
+        self.assertEqual(os.listdir(os.path.dirname(upload.temp_path)), [os.path.basename(upload.temp_path)])
+
+    def test_finalize_twice(self):
+        """Test that a finalize losing the race against another one stores nothing."""
+        upload_id = self.start(size=10).json()['upload_id']
+        self.put_chunk(upload_id, 0, PHOTO_BYTES[:10])
+        stale_upload = PhotoUpload.objects.get(upload_id=upload_id)
+
+        self.assertEqual(self.finalize(upload_id).status_code, 200)
+        self.assertIsNone(finalize_upload(stale_upload))
+        self.assertEqual(self.finalize(upload_id).status_code, 404)
+
+    def test_expire_uploads(self):
+        """Test that abandoned uploads and stray upload files are deleted."""
+        old_id = self.start(size=10).json()['upload_id']
+        old_upload = PhotoUpload.objects.get(upload_id=old_id)
+        PhotoUpload.objects.filter(pk=old_upload.pk).update(created_at=timezone.now() - datetime.timedelta(days=2))
+        upload_dir = os.path.dirname(old_upload.temp_path)
+        stray_path = os.path.join(upload_dir, 'abandoned.part.0123')
+        open(stray_path, 'wb').close()
+        os.utime(stray_path, (0, 0))
+        other_photo = PhotoModule.objects.create(photo_status=PHOTO_RUNNING, device=self.device)
+        recent_upload = start_upload(other_photo, 'photo.jpg', 10)
+
+        call_command('expire_photo_uploads', stdout=io.StringIO())
+
+        self.assertEqual(list(PhotoUpload.objects.all()), [recent_upload])
+        self.assertEqual(os.listdir(upload_dir), [os.path.basename(recent_upload.temp_path)])
+
+
+class TestPhotoDerivatives(PhotoFilesTestCase):
+    """Test cases for photo thumbnails and medium-size copies."""
+
+    def jpeg_bytes(self, size=(2000, 1500)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color=(30, 120, 60)).save(buffer, 'JPEG')
+        return buffer.getvalue()
+
+    def post_photo(self, photo):
+        return self.client.post(reverse('gadget_communicator_pull:post-photo'), {
+            'device_id': self.device.device_id,
+            'photo_id': str(photo.photo_id),
+            'image_file': SimpleUploadedFile('photo.jpg', self.jpeg_bytes(), content_type='image/jpeg'),
+        })
+
+    def test_post_photo_renders_variants(self):
+        """Test that a posted photo gets a WebP thumbnail and medium copy next to the original."""
+        photo = PhotoModule.objects.create(photo_status=PHOTO_RUNNING, device=self.device)
+
+        self.assertEqual(self.post_photo(photo).status_code, 200)
+        photo.refresh_from_db()
+        self.assertTrue(is_content_addressed(photo.thumbnail.name))
+        self.assertTrue(photo.thumbnail.name.endswith('.webp'))
+        self.assertTrue(is_content_addressed(photo.medium.name))
+        self.assertNotEqual(photo.thumbnail.name, photo.medium.name)
+        with Image.open(photo.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.format, 'WEBP')
+            self.assertEqual(thumbnail.size, (320, 240))
+        with Image.open(photo.medium.path) as medium:
+            self.assertEqual(medium.size, (1280, 960))
+
+    def test_variant_urls_and_download(self):
+        """Test that photo listings link the variants and the download endpoint serves them."""
+        photo = PhotoModule.objects.create(photo_status=PHOTO_RUNNING, device=self.device)
+        self.post_photo(photo)
+
+        response = self.client.get(reverse('gadget_communicator_pull:api_get_photo_by_id',
+                                           kwargs={'id': photo.photo_id}))
+        data = response.json()
+        self.assertTrue(data['thumbnail_url'].endswith('/download?variant=thumbnail'))
+        self.assertTrue(data['medium_url'].endswith('/download?variant=medium'))
+
+        response = self.client.get(data['thumbnail_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertLess(len(b''.join(response.streaming_content)), 10 * 1024)
+
+        response = self.client.get(f"{data['thumbnail_url'].split('?')[0]}?variant=huge")
+        self.assertEqual(response.status_code, 400)
+
+    def test_photo_without_variants(self):
+        """Test that photos without rendered variants have no variant URLs."""
+        photo = self.create_photo()
+        response = self.client.get(reverse('gadget_communicator_pull:api_list_photos',
+                                           kwargs={'id_d': self.device.device_id}))
+        self.assertEqual(response.json()[0]['thumbnail_url'], None)
+        self.assertEqual(response.json()[0]['medium_url'], None)
+        response = self.client.get(reverse('gadget_communicator_pull:api_download_photo_id',
+                                           kwargs={'id': photo.photo_id}), {'variant': 'thumbnail'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TestContentAddressedStorage(PhotoFilesTestCase):
+    """Test cases for the content-addressed photo layout."""
+
+    def test_sharded_name(self):
+        """Test that photos are stored under their hash in two fan-out directories."""
+        photo = self.create_photo()
+        self.assertEqual(photo.image.name, hashed_name(PHOTO_BYTES))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, hashed_name(PHOTO_BYTES))))
+
+    def test_identical_photos_stored_once(self):
+        """Test that saving the same content twice reuses the stored file."""
+        first = self.create_photo()
+        second = self.create_photo()
+        self.assertEqual(first.image.name, second.image.name)
+        shard = os.path.dirname(os.path.join(self.media_root, first.image.name))
+        self.assertEqual(len(os.listdir(shard)), 1)
+
+        third = self.create_photo(content=PHOTO_BYTES[:1000])
+        self.assertNotEqual(third.image.name, first.image.name)
+
+    def test_relocate_photos(self):
+        """Test that relocate_photos moves legacy files into the hashed layout."""
+        legacy_path = os.path.join(self.media_root, 'images', 'legacy.jpg')
+        os.makedirs(os.path.dirname(legacy_path))
+        with open(legacy_path, 'wb') as legacy:
+            legacy.write(PHOTO_BYTES)
+        photo = PhotoModule.objects.create(photo_status=PHOTO_READY, image='images/legacy.jpg')
+
+        out = io.StringIO()
+        call_command('relocate_photos', '--dry-run', stdout=out)
+        self.assertIn('would move 1 files', out.getvalue())
+        self.assertTrue(os.path.exists(legacy_path))
+
+        call_command('relocate_photos', '--batch-size', '1', stdout=io.StringIO())
+        photo.refresh_from_db()
+        self.assertEqual(photo.image.name, hashed_name(PHOTO_BYTES))
+        self.assertFalse(os.path.exists(legacy_path))
+        with photo.image.open('rb') as image:
+            self.assertEqual(image.read(), PHOTO_BYTES)
+
+
+@unittest.skipIf(ThreadedMotoServer is None or not hasattr(storage, 'ContentAddressedS3Storage'),
+                 'needs django-storages[s3] and moto[server]')
+class TestContentAddressedS3Storage(PhotoFilesTestCase):
+    """Test cases for the content-addressed photo layout in an S3 stand-in served by moto."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.s3_server = ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+        cls.s3_server.start()
+        cls.endpoint_url = 'http://{}:{}'.format(*cls.s3_server.get_host_and_port())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.s3_server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        """Point the photo fields to a fresh bucket."""
+        super().setUp()
+        self.s3 = boto3.client('s3', endpoint_url=self.endpoint_url, aws_access_key_id='testing',
+                               aws_secret_access_key='testing', region_name='us-east-1')
+        self.s3.create_bucket(Bucket=S3_BUCKET)
+        self.addCleanup(self.empty_bucket)
+        self.storage = storage.ContentAddressedS3Storage(bucket_name=S3_BUCKET, endpoint_url=self.endpoint_url,
+                                                         **S3_CREDENTIALS)
+        # the fields resolve PHOTO_STORAGE once, when the model is defined
+        for field in ('image', 'thumbnail', 'medium'):
+            field_storage = mock.patch.object(PhotoModule._meta.get_field(field), 'storage', self.storage)
+            field_storage.start()
+            self.addCleanup(field_storage.stop)
+
+    def empty_bucket(self):
+        for stored in self.s3.list_objects_v2(Bucket=S3_BUCKET).get('Contents', []):
+            self.s3.delete_object(Bucket=S3_BUCKET, Key=stored['Key'])
+        self.s3.delete_bucket(Bucket=S3_BUCKET)
+
+    def stored_keys(self):
+        return [stored['Key'] for stored in self.s3.list_objects_v2(Bucket=S3_BUCKET).get('Contents', [])]
+
+    def test_sharded_name(self):
+        """Test that photos are stored under their hash in two fan-out prefixes."""
+        photo = self.create_photo()
+
+        self.assertEqual(photo.image.name, hashed_name(PHOTO_BYTES))
+        self.assertEqual(self.stored_keys(), [hashed_name(PHOTO_BYTES)])
+        stored = self.s3.get_object(Bucket=S3_BUCKET, Key=hashed_name(PHOTO_BYTES))
+        self.assertEqual(stored['Body'].read(), PHOTO_BYTES)
+
+    def test_identical_photos_stored_once(self):
+        """Test that saving the same content twice finds the stored object and uploads nothing."""
+        first = self.create_photo()
+        with mock.patch.object(storage.S3Boto3Storage, '_save', autospec=True,
+                               side_effect=storage.S3Boto3Storage._save) as upload:
+            second = self.create_photo()
+            third = self.create_photo(content=PHOTO_BYTES[:1000])
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(third.image.name, first.image.name)
+        self.assertEqual(upload.call_count, 1)
+        self.assertEqual(sorted(self.stored_keys()), sorted([hashed_name(PHOTO_BYTES), third.image.name]))
+
+    def test_relocate_photos(self):
+        """Test that relocate_photos moves legacy objects into the hashed layout."""
+        self.s3.put_object(Bucket=S3_BUCKET, Key='images/legacy.jpg', Body=PHOTO_BYTES)
+        photo = PhotoModule.objects.create(photo_status=PHOTO_READY, image='images/legacy.jpg')
+
+        call_command('relocate_photos', stdout=io.StringIO())
+
+        photo.refresh_from_db()
+        self.assertEqual(photo.image.name, hashed_name(PHOTO_BYTES))
+        self.assertEqual(self.stored_keys(), [hashed_name(PHOTO_BYTES)])
+        with photo.image.open('rb') as image:
+            self.assertEqual(image.read(), PHOTO_BYTES)
+
+    def test_download_redirects(self):
+        """Test that a photo without a local path is downloaded from the object storage."""
+        photo = self.create_photo()
+
+        response = self.client.get(reverse('gadget_communicator_pull:api_download_photo_id',
+                                           kwargs={'id': photo.photo_id}))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(f'{self.endpoint_url}/{S3_BUCKET}/photos/'))
+        with urllib.request.urlopen(response['Location']) as redirected:
+            self.assertEqual(redirected.read(), PHOTO_BYTES)
@@ -0,0 +1,217 @@
+"""
+Unit tests for looking plans up by name through the plan index.
+"""
+import json
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from gadget_communicator_pull.models import Device, BasicPlan, TimePlan, MoisturePlan, PlanIndex, WaterTime
+
+# session, user, then per kind the plans and their devices, plus the weekday times of time plans
+PLAN_LIST_QUERIES = 9
+
+
+class TestPlanIndex(TestCase):
+    """Test cases for the plan API views backed by the plan index."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.devices = Device.objects.bulk_create([
+            Device(device_id=f'TEST_DEVICE_{index:03}', label='Test Device', owner=self.user)
+            for index in range(50)
+        ])
+        self.device = self.devices[0]
+        self.client.force_login(self.user)
+
+    def create_plan(self, name, plan_type='basic', **fields):
+        data = {'name': name, 'plan_type': plan_type, 'water_volume': 100,
+                'devices': [{'device_id': self.device.device_id}], **fields}
+        return self.client.post(reverse('gadget_communicator_pull:api_create_plan'), json.dumps(data),
+                                content_type='application/json')
+
+    def test_create_plan_indexes_name(self):
+        """Test a created plan is registered under its owner."""
+        response = self.create_plan('Morning')
+
+        self.assertEqual(response.status_code, 200)
+        plan = BasicPlan.objects.get(name='Morning')
+        entry = PlanIndex.objects.get(owner=self.user, name='Morning')
+        self.assertEqual((entry.plan_kind, entry.plan_id), ('basic', plan.pk))
+
+    def test_duplicate_name_across_plan_kinds(self):
+        """Test a name already used by a plan of another kind is refused."""
+        self.create_plan('Morning')
+
+        response = self.create_plan('Morning', plan_type='moisture', moisture_threshold=40, check_interval=60)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['duplicate_plan'], 'Morning')
+        self.assertFalse(MoisturePlan.objects.exists())
+
+    def test_duplicate_check_does_not_grow_with_devices(self):
+        """Test the duplicate check is one query however many devices the user owns."""
+        self.create_plan('Morning')
+
+        with self.assertNumQueries(3):
+            # session, user and the plan index lookup
+            response = self.create_plan('Morning')
+        self.assertEqual(response.status_code, 403)
+
+    def test_name_taken_by_concurrent_create(self):
+        """Test a create losing the race for the name is answered 409 and leaves no plan behind."""
+        PlanIndex.objects.create(owner=self.user, name='Morning', plan_kind='basic', plan_id=0)
+
+        with mock.patch('gadget_communicator_pull.views.api.plan.create_plan.is_plan_name_taken', return_value=False):
+            response = self.create_plan('Morning')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['duplicate_plan'], 'Morning')
+        self.assertFalse(BasicPlan.objects.exists())
+
+    def test_refused_plan_releases_name(self):
+        """Test a plan refused halfway leaves neither the plan nor its name reservation."""
+        response = self.create_plan('Morning', water_volume=5)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BasicPlan.objects.exists())
+        self.assertFalse(PlanIndex.objects.exists())
+
+    def test_devices_notified_on_commit(self):
+        """Test waiting devices are only woken once the plan is committed."""
+        with mock.patch('gadget_communicator_pull.views.api.plan.create_plan.notify_plan_devices') as notify:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                self.create_plan('Morning')
+                notify.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        notify.assert_called_once_with(BasicPlan.objects.get(name='Morning'))
+
+    def test_update_plan_by_name(self):
+        """Test a plan found through the index is updated."""
+        self.create_plan('Morning')
+
+        response = self.client.post(reverse('gadget_communicator_pull:api_update_plan'),
+                                    json.dumps({'name': 'Morning', 'plan_type': 'basic', 'water_volume': 300}),
+                                    content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(BasicPlan.objects.get(name='Morning').water_volume, 300)
+
+    def test_delete_plan_removes_index_entry(self):
+        """Test deleting a plan frees its name."""
+        self.create_plan('Morning')
+
+        response = self.client.delete(reverse('gadget_communicator_pull:api_delete_plan', kwargs={'id': 'Morning'}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(BasicPlan.objects.exists())
+        self.assertFalse(PlanIndex.objects.exists())
+
+    def test_other_owner_plan_not_found(self):
+        """Test the plan of another user is not found by name."""
+        self.create_plan('Morning')
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_login(other)
+
+        response = self.client.delete(reverse('gadget_communicator_pull:api_delete_plan', kwargs={'id': 'Morning'}))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(BasicPlan.objects.exists())
+
+    def test_delete_device_prunes_orphaned_plans(self):
+        """Test deleting the only device of a plan forgets its name."""
+        self.create_plan('Morning')
+
+        self.client.delete(reverse('gadget_communicator_pull:api_delete_device', kwargs={'id': self.device.device_id}))
+
+        self.assertFalse(PlanIndex.objects.exists())
+
+
+class TestPlanIndexBackfill(TestCase):
+    """Test cases for indexing the plans that existed before the plan index."""
+
+    def test_index_existing_plans(self):
+        """Test plans attached to owned devices are indexed, the first of a shared name wins."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        device = Device.objects.create(device_id='TEST_DEVICE_001', label='Test Device', owner=user)
+        orphan = Device.objects.create(device_id='TEST_DEVICE_002', label='Test Device')
+        basic = BasicPlan.objects.create(name='Morning', plan_type='basic')
+        time = TimePlan.objects.create(name='Evening', plan_type='time_based')
+        moisture = MoisturePlan.objects.create(name='Morning', plan_type='moisture')
+        device.device_relation_b.add(basic)
+        device.device_relation_t.add(time)
+        device.device_relation_m.add(moisture)
+        orphan.device_relation_t.add(TimePlan.objects.create(name='Night', plan_type='time_based'))
+        migration = import_module('gadget_communicator_pull.migrations.0013_plan_index')
+
+        migration.index_existing_plans(apps, None)
+
+        entries = PlanIndex.objects.order_by('name').values_list('owner', 'name', 'plan_kind', 'plan_id')
+        self.assertEqual(list(entries), [(user.pk, 'Evening', 'time_based', time.pk),
+                                         (user.pk, 'Morning', 'basic', basic.pk)])
+
+
+class TestPlanListQueryBudget(TestCase):
+    """Test cases for the number of queries the plan lists take."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(device_id='TEST_DEVICE_001', label='Test Device', owner=self.user)
+        self.client.force_login(self.user)
+
+    def add_plans(self, count):
+        start = BasicPlan.objects.count()
+        second = Device.objects.create(device_id=f'TEST_DEVICE_{start + 2:03}', label='Test Device', owner=self.user)
+        for index in range(start, start + count):
+            basic = BasicPlan.objects.create(name=f'basic {index}', plan_type='basic')
+            moisture = MoisturePlan.objects.create(name=f'moisture {index}', plan_type='moisture')
+            time = TimePlan.objects.create(name=f'time {index}', plan_type='time_based')
+            time.water_times.add(WaterTime.objects.create(weekday=1, time_water='08:00'),
+                                 WaterTime.objects.create(weekday=3, time_water='20:00'))
+            self.device.device_relation_b.add(basic)
+            self.device.device_relation_m.add(moisture)
+            self.device.device_relation_t.add(time)
+            second.device_relation_t.add(time)
+
+    def assert_query_budget(self, url, budget):
+        for count in (1, 20):
+            self.add_plans(count)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_list_plans(self):
+        """Test listing plans takes the same queries for 1 and 21 plans of each kind."""
+        plans = self.assert_query_budget(reverse('gadget_communicator_pull:api_list_plans'), PLAN_LIST_QUERIES)
+
+        self.assertEqual(len(plans[0]), 21)
+        self.assertEqual(len(plans[1][0]['weekday_times']), 2)
+
+    def test_list_plans_paged(self):
+        """Test a page of plans takes the same queries whatever the page size."""
+        self.assert_query_budget(reverse('gadget_communicator_pull:api_list_plans') + '?limit=50', PLAN_LIST_QUERIES)
+
+    def test_get_plans_by_device(self):
+        """Test the plans of a device take the same queries for 1 and 21 plans of each kind."""
+        url = reverse('gadget_communicator_pull:api_get_plans_by_device_id', kwargs={'id': self.device.device_id})
+
+        plans = self.assert_query_budget(url, PLAN_LIST_QUERIES)
+
+        self.assertEqual(len(plans[1]), 21)
+        self.assertEqual(len(plans[1][0]['devices']), 2)
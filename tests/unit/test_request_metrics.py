@@ -0,0 +1,82 @@
+"""
+Unit tests for the per-request query and timing metrics.
+"""
+import json
+import re
+
+from django.contrib.auth.models import User
+from django.test import TestCase, modify_settings, override_settings
+from django.urls import reverse
+
+from gadget_communicator_pull.helpers.request_metrics import EndpointStats, RequestSample
+from gadget_communicator_pull.models import Device
+
+METRICS_MIDDLEWARE = 'gadget_communicator_pull.middleware.RequestMetricsMiddleware'
+
+
+@modify_settings(MIDDLEWARE={'prepend': METRICS_MIDDLEWARE})
+@override_settings(REQUEST_METRICS_SERVER_TIMING=True, REQUEST_METRICS_SAMPLE_RATE=0.0,
+                   REQUEST_METRICS_SUMMARY_INTERVAL=None)
+class TestRequestMetricsMiddleware(TestCase):
+    """Test cases for RequestMetricsMiddleware."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(device_id='TEST_DEVICE_001', label='Test Device', owner=self.user)
+        self.client.force_login(self.user)
+        self.url = reverse('gadget_communicator_pull:api_list_plans')
+
+    def test_server_timing_header(self):
+        """Test the queries, database time, view time and size are returned in Server-Timing."""
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=\d+\.\d\d;desc="5 queries", view;dur=\d+\.\d\d, size;desc="\d+ bytes"$')
+        size = int(re.search(r'size;desc="(\d+) bytes"', timing).group(1))
+        self.assertEqual(size, len(response.content))
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """Test no Server-Timing header is sent when it is switched off."""
+        response = self.client.get(self.url)
+
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=False, REQUEST_METRICS_SAMPLE_RATE=1.0)
+    def test_sampled_log_line(self):
+        """Test a sampled request is logged as one JSON line."""
+        with self.assertLogs('gadget_communicator_pull.helpers.request_metrics', 'INFO') as logs:
+            self.client.get(self.url)
+
+        lines = [record.getMessage() for record in logs.records if record.msg.startswith('request ')]
+        self.assertEqual(len(lines), 1)
+        logged = json.loads(lines[0][len('request '):])
+        self.assertEqual(logged['endpoint'], 'gadget_communicator_pull:api_list_plans')
+        self.assertEqual((logged['method'], logged['status'], logged['queries']), ('GET', 200, 5))
+
+
+class TestEndpointStats(TestCase):
+    """Test cases for the per-endpoint aggregation."""
+
+    def test_summary(self):
+        """Test requests are averaged per endpoint and the totals reset after a summary."""
+        stats = EndpointStats()
+        stats.add(RequestSample('plans', 'GET', 200, queries=4, db_ms=2.0, view_ms=10.0, size=100))
+        stats.add(RequestSample('plans', 'GET', 500, queries=8, db_ms=4.0, view_ms=30.0, size=None))
+        stats.add(RequestSample('status', 'GET', 200, queries=3, db_ms=1.0, view_ms=5.0, size=50))
+
+        self.assertIsNone(stats.pop_summary(3600))
+        summary = stats.pop_summary(0)
+
+        self.assertEqual(summary['plans'], {
+            'requests': 2, 'errors': 1, 'avg_queries': 6.0, 'max_queries': 8,
+            'avg_db_ms': 3.0, 'avg_view_ms': 20.0, 'max_view_ms': 30.0, 'avg_bytes': 50,
+        })
+        self.assertEqual(summary['status']['requests'], 1)
+        self.assertEqual(stats.pop_summary(0), {})
@@ -0,0 +1,148 @@
+"""
+Unit tests for the correlation ids, debug rate limit and queued JSON log handler.
+"""
+import io
+import json
+import logging
+import queue
+import sys
+
+from django.test import TestCase, modify_settings
+from django.urls import reverse
+
+from gadget_communicator_pull.helpers.structured_logging import CorrelationFilter, DebugRateLimitFilter, \
+    JsonFormatter, AsyncQueueHandler, request_id_var, device_id_var, NO_CONTEXT
+
+CONTEXT_MIDDLEWARE = 'gadget_communicator_pull.middleware.RequestContextMiddleware'
+DEVICE_VIEWS_LOGGER = 'gadget_communicator_pull.views.devicecom.device_views'
+
+
+class CaptureHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_record(level=logging.DEBUG, msg='polled %s', args=('device',)):
+    return logging.LogRecord('test', level, __file__, 1, msg, args, None)
+
+
+@modify_settings(MIDDLEWARE={'prepend': CONTEXT_MIDDLEWARE})
+class TestRequestContextMiddleware(TestCase):
+    """Test cases for RequestContextMiddleware."""
+
+    def setUp(self):
+        """Set up a handler on the device views logger."""
+        self.handler = CaptureHandler()
+        self.handler.addFilter(CorrelationFilter())
+        self.logger = logging.getLogger(DEVICE_VIEWS_LOGGER)
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        self.url = reverse('gadget_communicator_pull:get-plan')
+
+    def test_request_id_generated(self):
+        """Test a request without X-Request-ID gets a fresh one."""
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+
+        self.assertRegex(first['X-Request-ID'], r'^[0-9a-f]{16}$')
+        self.assertNotEqual(first['X-Request-ID'], second['X-Request-ID'])
+
+    def test_request_id_kept(self):
+        """Test the X-Request-ID of the caller is returned and attached to the log records."""
+        response = self.client.get(self.url, {'device': 'UNKNOWN_DEVICE'}, HTTP_X_REQUEST_ID='proxy-42')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['X-Request-ID'], 'proxy-42')
+        warnings = [record for record in self.handler.records if record.levelno == logging.WARNING]
+        self.assertEqual(len(warnings), 1)
+        self.assertEqual((warnings[0].request_id, warnings[0].device_id), ('proxy-42', 'UNKNOWN_DEVICE'))
+
+    def test_context_reset(self):
+        """Test the ids do not leak out of the request."""
+        before = (request_id_var.get(), device_id_var.get())
+        self.client.get(self.url, {'device': 'UNKNOWN_DEVICE'})
+
+        self.assertEqual((request_id_var.get(), device_id_var.get()), before)
+
+
+class TestDebugRateLimitFilter(TestCase):
+    """Test cases for DebugRateLimitFilter."""
+
+    def test_debug_limited_per_call_site(self):
+        """Test only burst debug records of one message pass, other messages and levels are unaffected."""
+        rate_limit = DebugRateLimitFilter(burst=3, interval=60)
+
+        passed = [rate_limit.filter(make_record()) for _ in range(5)]
+        self.assertEqual(passed, [True, True, True, False, False])
+        self.assertTrue(rate_limit.filter(make_record(msg='other %s')))
+        self.assertTrue(rate_limit.filter(make_record(level=logging.WARNING)))
+
+    def test_window_resets(self):
+        """Test debug records pass again once the interval is over."""
+        rate_limit = DebugRateLimitFilter(burst=1, interval=0)
+
+        self.assertTrue(rate_limit.filter(make_record()))
+        self.assertTrue(rate_limit.filter(make_record()))
+
+
+class TestAsyncQueueHandler(TestCase):
+    """Test cases for AsyncQueueHandler."""
+
+    def test_json_lines(self):
+        """Test records are written by the writer thread as JSON lines."""
+        stream = io.StringIO()
+        handler = AsyncQueueHandler(stream=stream)
+        handler.addFilter(CorrelationFilter())
+        handler.setFormatter(JsonFormatter())
+        token = device_id_var.set('TEST_DEVICE_001')
+        try:
+            handler.handle(make_record(level=logging.INFO))
+        finally:
+            device_id_var.reset(token)
+        handler.close()
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual((entry['level'], entry['message']), ('INFO', 'polled device'))
+        self.assertEqual((entry['request_id'], entry['device_id']), (NO_CONTEXT, 'TEST_DEVICE_001'))
+
+    def test_prepare_resolves_args_and_traceback(self):
+        """Test the message and traceback are fixed when the record is queued, not when it is written."""
+        stream = io.StringIO()
+        handler = AsyncQueueHandler(stream=stream)
+        handler.setFormatter(JsonFormatter())
+        handler.stop()
+        readings = [1, 2]
+        try:
+            raise ValueError('bad reading')
+        except ValueError:
+            record = logging.LogRecord('test', logging.ERROR, __file__, 1, 'readings %s', (readings,), sys.exc_info())
+
+        handler.handle(record)
+        readings.append(3)
+        queued = handler.queue.get_nowait()
+        handler.target.handle(queued)
+        handler.close()
+
+        self.assertEqual((queued.msg, queued.args, queued.exc_info), ('readings [1, 2]', None, None))
+        self.assertEqual((record.msg, record.exc_info[0]), ('readings %s', ValueError))
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry['message'], 'readings [1, 2]')
+        self.assertIn('ValueError: bad reading', entry['exception'])
+
+    def test_full_queue_drops(self):
+        """Test records are dropped instead of blocking while the writer is behind."""
+        handler = AsyncQueueHandler(stream=io.StringIO(), maxsize=2)
+        handler.stop()
+
+        for _ in range(5):
+            handler.handle(make_record(level=logging.INFO))
+
+        self.assertEqual(handler.dropped, 3)
+        self.assertEqual(handler.queue.qsize(), 2)
+        with self.assertRaises(queue.Full):
+            handler.queue.put_nowait(make_record())
+        handler.close()
@@ -0,0 +1,244 @@
+"""
+Unit tests for the telemetry rollups and the chart API.
+"""
+import io
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from django.utils import timezone
+
+from gadget_communicator_pull.constants.water_constants import TELEMETRY_WATER, TELEMETRY_MOISTURE, \
+    TELEMETRY_RESOLUTION_HOUR, TELEMETRY_RESOLUTION_DAY
+from gadget_communicator_pull.helpers.telemetry_rollup import roll_up, prune_telemetry
+from gadget_communicator_pull.models import Device, WaterChart, MoistureChart, TelemetryRollup
+
+START = datetime(2026, 3, 1, tzinfo=dt_timezone.utc)
+
+
+class TelemetryTestCase(TestCase):
+    """Creates a device with a few days of water readings every 20 minutes."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.device = Device.objects.create(
+            device_id='TEST_DEVICE_001',
+            label='Test Device',
+            owner=self.user
+        )
+        self.client.force_login(self.user)
+
+    def add_readings(self, values, start=START, step=timedelta(minutes=20)):
+        WaterChart.objects.bulk_create([
+            WaterChart(water_chart=value, device_relation=self.device, measured_at=start + index * step)
+            for index, value in enumerate(values)
+        ])
+
+    def add_moisture(self, values, start=START, step=timedelta(minutes=20)):
+        MoistureChart.objects.bulk_create([
+            MoistureChart(moisture=value, device_relation=self.device, measured_at=start + index * step)
+            for index, value in enumerate(values)
+        ])
+
+    def roll_up_all(self, metric=TELEMETRY_WATER):
+        # the first run only records the watermark
+        while roll_up(metric) or roll_up(metric):
+            pass
+
+
+class TestTelemetryRollup(TelemetryTestCase):
+    """Test cases for the hourly and daily rollups."""
+
+    def test_hourly_and_daily_buckets(self):
+        """Test that min, avg and max are computed per hour and per day."""
+        self.add_readings([10, 20, 60] * 48)
+        self.roll_up_all()
+
+        hours = TelemetryRollup.objects.filter(resolution=TELEMETRY_RESOLUTION_HOUR).order_by('bucket_start')
+        self.assertEqual(hours.count(), 48)
+        first = hours[0]
+        self.assertEqual((first.bucket_start, first.min_value, first.avg_value, first.max_value, first.samples),
+                         (START, 10, 30, 60, 3))
+        days = TelemetryRollup.objects.filter(resolution=TELEMETRY_RESOLUTION_DAY).order_by('bucket_start')
+        self.assertEqual([(day.bucket_start, day.samples, day.avg_value) for day in days],
+                         [(START, 72, 30), (START + timedelta(days=1), 72, 30)])
+
+    def test_incremental_and_late_readings(self):
+        """Test that later runs only fold in new rows and late readings update their old bucket."""
+        self.add_readings([10, 20, 30])
+        self.roll_up_all()
+        self.add_readings([90], start=START + timedelta(minutes=50))
+        self.roll_up_all()
+
+        hour = TelemetryRollup.objects.get(resolution=TELEMETRY_RESOLUTION_HOUR, bucket_start=START)
+        self.assertEqual((hour.samples, hour.avg_value, hour.max_value), (4, 37.5, 90))
+        day = TelemetryRollup.objects.get(resolution=TELEMETRY_RESOLUTION_DAY, bucket_start=START)
+        self.assertEqual((day.samples, day.avg_value), (4, 37.5))
+        self.assertEqual(TelemetryRollup.objects.count(), 2)
+
+    def test_uncommitted_rows_wait_one_run(self):
+        """Test that rows newer than the previous run's watermark are left for the next run."""
+        self.add_readings([10])
+        self.assertEqual(roll_up(TELEMETRY_WATER), 0)
+        self.assertEqual(roll_up(TELEMETRY_WATER), 1)
+
+    def test_rollup_command(self):
+        """Test that rollup_telemetry --once rolls up everything there is."""
+        self.add_readings([10, 20, 30])
+        call_command('rollup_telemetry', '--once', stdout=io.StringIO())
+        self.assertEqual(TelemetryRollup.objects.filter(resolution=TELEMETRY_RESOLUTION_HOUR).count(), 1)
+
+
+class TestDeviceWaterChartRange(TelemetryTestCase):
+    """Test cases for the from/to/resolution parameters of the water chart API."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.add_readings([10, 20, 60] * 24 * 90)
+        self.roll_up_all()
+        self.url = reverse('gadget_communicator_pull:api_get_device_charts', kwargs={'id': self.device.device_id})
+
+    def get_chart(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_auto_picks_tier(self):
+        """Test that short ranges return raw readings and long ranges rollups."""
+        response = self.get_chart(**{'from': '2026-03-01T00:00:00Z', 'to': '2026-03-01T02:00:00Z'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['resolution'], 'raw')
+        self.assertEqual([point['water_chart'] for point in data['points']], [10, 20, 60, 10, 20, 60])
+
+        data = self.get_chart(**{'from': '2026-03-01', 'to': '2026-03-11'}).json()
+        self.assertEqual(data['resolution'], 'hour')
+        self.assertEqual(len(data['points']), 240)
+
+        data = self.get_chart(**{'from': '2026-03-01', 'to': '2026-05-30'}).json()
+        self.assertEqual(data['resolution'], 'day')
+        self.assertEqual(len(data['points']), 90)
+        self.assertEqual(data['points'][0], {'measured_at': '2026-03-01T00:00:00+00:00', 'water_chart': 30.0,
+                                             'min': 10.0, 'max': 60.0, 'samples': 72})
+
+    def test_long_range_does_not_scan_raw_rows(self):
+        """Test that a rollup tier is served from the rollup table alone."""
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_chart(**{'from': '2026-03-01', 'to': '2026-05-30', 'resolution': 'day'}).json()
+        self.assertEqual(len(data['points']), 90)
+        self.assertFalse([query for query in queries if WaterChart._meta.db_table in query['sql']])
+
+    def test_explicit_resolution_and_errors(self):
+        """Test that an explicit resolution wins and bad parameters are refused."""
+        data = self.get_chart(**{'from': '2026-03-01', 'to': '2026-03-02', 'resolution': 'hour'}).json()
+        self.assertEqual(data['resolution'], 'hour')
+        self.assertEqual(len(data['points']), 24)
+        self.assertEqual(self.get_chart(resolution='minute').status_code, 400)
+        self.assertEqual(self.get_chart(**{'from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.get_chart(**{'from': '2026-03-02', 'to': '2026-03-01'}).status_code, 400)
+
+
+class TestDeviceWaterChartReadOnly(TelemetryTestCase):
+    """Test cases for the chart endpoint never writing and downsampling long series."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.url = reverse('gadget_communicator_pull:api_get_device_charts', kwargs={'id': self.device.device_id})
+
+    def test_pads_in_response_only(self):
+        """Test that a short history is padded without inserting rows."""
+        self.add_readings([40, 30])
+        response = self.client.get(self.url)
+        self.assertEqual(response.json(), [{'water_chart': 100}] * 8 + [{'water_chart': 40}, {'water_chart': 30}])
+        self.assertEqual(WaterChart.objects.count(), 2)
+
+    def test_latest_ten_by_time(self):
+        """Test that the last ten readings by measured_at are returned oldest first."""
+        self.add_readings(list(range(15)))
+        self.assertEqual([point['water_chart'] for point in self.client.get(self.url).json()], list(range(5, 15)))
+
+    def test_downsampled_range(self):
+        """Test that the points parameter reduces the series and keeps its extremes."""
+        values = [50] * 500
+        values[123] = 0
+        self.add_readings(values, step=timedelta(minutes=1))
+        data = self.client.get(self.url, {'from': '2026-03-01', 'to': '2026-03-02', 'points': 50}).json()
+        self.assertEqual(data['resolution'], 'raw')
+        self.assertEqual(len(data['points']), 50)
+        self.assertIn(0, [point['water_chart'] for point in data['points']])
+        self.assertEqual(self.client.get(self.url, {'points': 2}).status_code, 400)
+
+
+class TestMoistureHistory(TelemetryTestCase):
+    """Test cases for recording and charting moisture readings."""
+
+    def test_post_moisture_appends_reading(self):
+        """Test that postMoisture keeps every reading and the latest level."""
+        for level in (30, 45):
+            response = self.client.post(reverse('gadget_communicator_pull:post-moisture'),
+                                        {'device': self.device.device_id, 'moisture_level': level},
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.device.moisture_charts.order_by('pk').values_list('moisture', flat=True)),
+                         [30, 45])
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.moisture_level, 45)
+
+    def test_moisture_chart_range(self):
+        """Test that list_device_moisture serves raw readings and rollups of moisture only."""
+        self.add_moisture([20, 40, 60] * 24 * 10)
+        self.add_readings([90] * 30)
+        self.roll_up_all(TELEMETRY_MOISTURE)
+        url = reverse('gadget_communicator_pull:api_get_device_moisture', kwargs={'id': self.device.device_id})
+
+        data = self.client.get(url, {'from': '2026-03-01T00:00:00Z', 'to': '2026-03-01T01:00:00Z'}).json()
+        self.assertEqual(data, {'resolution': 'raw', 'points': [
+            {'measured_at': '2026-03-01T00:00:00+00:00', 'moisture': 20},
+            {'measured_at': '2026-03-01T00:20:00+00:00', 'moisture': 40},
+            {'measured_at': '2026-03-01T00:40:00+00:00', 'moisture': 60},
+        ]})
+        data = self.client.get(url, {'from': '2026-03-01', 'to': '2026-03-11', 'resolution': 'day'}).json()
+        self.assertEqual([(point['moisture'], point['samples']) for point in data['points']], [(40, 72)] * 10)
+        data = self.client.get(url, {'from': '2026-03-01', 'to': '2026-03-11', 'points': 24}).json()
+        self.assertEqual(len(data['points']), 24)
+
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class TestTelemetryRetention(TelemetryTestCase):
+    """Test cases for pruning old readings and hourly rollups."""
+
+    @override_settings(TELEMETRY_RAW_RETENTION_DAYS=30, TELEMETRY_HOURLY_RETENTION_DAYS=60)
+    def test_prunes_rolled_up_rows_only(self):
+        """Test that expired raw rows go once rolled up, and daily rollups stay."""
+        old = (timezone.now() - timedelta(days=90)).replace(minute=0, second=0, microsecond=0)
+        recent = timezone.now() - timedelta(days=1)
+        # rolled up before they expired
+        with override_settings(TELEMETRY_RAW_RETENTION_DAYS=None):
+            self.add_moisture([10, 20, 30], start=old)
+            self.roll_up_all(TELEMETRY_MOISTURE)
+        self.add_moisture([40], start=recent)
+        self.add_moisture([50], start=old - timedelta(days=1))
+
+        self.assertEqual(prune_telemetry(TELEMETRY_MOISTURE), 3 + 1)
+        self.assertEqual(sorted(MoistureChart.objects.values_list('moisture', flat=True)), [40, 50])
+        self.assertEqual(TelemetryRollup.objects.filter(resolution=TELEMETRY_RESOLUTION_DAY).count(), 1)
+
+        # the late reading is past the raw retention and is not rolled up
+        self.roll_up_all(TELEMETRY_MOISTURE)
+        day = TelemetryRollup.objects.get(resolution=TELEMETRY_RESOLUTION_DAY,
+                                          bucket_start__lt=timezone.now() - timedelta(days=30))
+        self.assertEqual(day.samples, 3)
+        self.assertEqual(prune_telemetry(TELEMETRY_MOISTURE), 1)